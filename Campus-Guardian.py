@@ -6,23 +6,225 @@
 #Created by: Boranno Golder
 
 
-import cv2
-import face_recognition
+import time
+# Start of the startup time measured by the service mode
+STARTED_AT = time.perf_counter()
+import numpy as np
 import os
-from datetime import datetime
-import pandas as pd
-
-import pyttsx3
+import json
+import hashlib
+import sqlite3
+import heapq
+import csv
+import itertools
+from datetime import datetime, timedelta
+import importlib
+import signal
 import shutil
-import time
+import sys
 import getpass
-import bcrypt
+import argparse
+import threading
+from collections import deque
+import multiprocessing
+from multiprocessing import shared_memory, resource_tracker
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+import tempfile
+import platform
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Class to stand in for a module that is imported on first attribute access
+class LazyModule:
+    def __init__(self, name):
+        self.name = name
+        self.module = None
 
-# Global variables to store intruder face data and camera assignments
-intruder_data = []
+    def __getattr__(self, attribute):
+        if self.module is None:
+            self.module = importlib.import_module(self.name)
+        return getattr(self.module, attribute)
+
+# Heavy libraries (dlib models, pandas, the TTS engine) are only loaded when first used, so
+# commands that do not need them start quickly
+cv2 = LazyModule("cv2")
+face_recognition = LazyModule("face_recognition")
+pd = LazyModule("pandas")
+pyttsx3 = LazyModule("pyttsx3")
+bcrypt = LazyModule("bcrypt")
+
+# Global variables to store camera assignments
 camera_roles = {"entry gate": [], "exit gate": [], "restricted area": [], "classroom": [], "ordinary camera": []}
 role_map = {1: "entry gate", 2: "exit gate", 3: "restricted area", 4: "classroom", 5: "ordinary camera"}
 
+# Face categories under known_faces and the on-disk encoding cache inside it. A person is
+# either one image (students/Alice.jpg) or a directory of reference images (students/Alice/).
+FACE_CATEGORIES = ["students", "admins", "teachers", "guests"]
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+ENCODING_CACHE_DIR = ".encodings"
+ENCODING_INDEX_FILE = "index.json"
+ENCODING_LOCK_FILE = "cache.lock"
+ENCODING_SIZE = 128
+
+# Face matching settings. "auto" switches to the cluster index for large rosters.
+MATCH_TOLERANCE = 0.6
+MATCHER_INDEX = "auto"
+CLUSTER_INDEX_MIN_FACES = 20000
+CLUSTER_INDEX_PROBES = 8
+
+# Capture pipeline settings: frames queued per camera, recognition worker processes, frames
+# of one camera recognized at the same time and how often per-camera frame rate and queue
+# depth are printed (seconds)
+CAPTURE_QUEUE_SIZE = 2
+RECOGNITION_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+RECOGNITION_IN_FLIGHT = 2
+CAMERA_STATS_INTERVAL = 10
+
+# Entry/exit records backend ("sqlite" append-only event log or legacy "excel")
+RECORDS_BACKEND = "sqlite"
+RECORDS_DB = "entry_exit_records.db"
+
+# Columnar archive of finished days (Parquet partitioned by day, needs pyarrow)
+ARCHIVE_DIR = "records_archive"
+ARCHIVE_MANIFEST = "_manifest.json"
+
+# Attendance analytics: sessions of closed days are cached here, headcount is sampled per interval
+ANALYTICS_CACHE_DIR = "analytics_cache"
+HEADCOUNT_INTERVAL = "15min"
+
+# Face detection settings per camera role. Detection runs on a copy resized by "scale",
+# optionally grayscale and cropped to "roi" (left, top, right, bottom as fractions of the
+# frame); boxes are mapped back to full resolution. "upsample" and "model" ("hog" or "cnn")
+# are passed to face_recognition.face_locations.
+DEFAULT_DETECTION_SETTINGS = {"scale": 1.0, "upsample": 1, "model": "hog", "grayscale": False, "roi": None}
+DETECTION_SETTINGS = {
+    "entry gate": {"scale": 0.5, "upsample": 1, "model": "hog"},
+    "exit gate": {"scale": 0.5, "upsample": 1, "model": "hog"},
+    "restricted area": {"scale": 0.5, "upsample": 2, "model": "hog"},
+    "classroom": {"scale": 0.5, "upsample": 2, "model": "hog"},
+    "ordinary camera": {"scale": 0.25, "upsample": 1, "model": "hog", "grayscale": True},
+}
+
+# Face quality gate between detection and encoding. Faces smaller than "min_size" pixels,
+# outside the "brightness" range, blurrier than "min_sharpness" (variance of the Laplacian) or
+# turned further than "max_yaw" (0 frontal, 1 profile, from eye and nose landmarks) are dropped.
+# The others are scored from 0 to 1; faces below "encode_score" wait for a better frame, for at
+# most "max_wait" seconds, before they are encoded anyway.
+FACE_QUALITY_GATE = True
+DEFAULT_QUALITY_SETTINGS = {"min_size": 40, "good_size": 90, "min_sharpness": 15, "good_sharpness": 120,
+                            "brightness": (40, 220), "max_yaw": 0.6, "encode_score": 0.5, "max_wait": 1.5}
+QUALITY_SETTINGS = {
+    "restricted area": {"encode_score": 0.3, "max_wait": 0.5},
+    "ordinary camera": {"min_size": 50, "encode_score": 0.6, "max_wait": 3.0},
+}
+
+# Motion gating: a small grayscale copy of every frame is compared with a running background.
+# Static frames skip detection and reuse the last result (at most every "keyframe_seconds" a
+# full detection runs anyway); otherwise detection is limited to the changed region plus
+# "margin". A frame is static when less than "min_changed" of its pixels differ by more than
+# "threshold" grey levels.
+MOTION_GATING = True
+DEFAULT_MOTION_SETTINGS = {"width": 160, "threshold": 25, "min_changed": 0.002, "margin": 0.1,
+                           "learning_rate": 0.05, "keyframe_seconds": 5.0}
+MOTION_SETTINGS = {
+    "restricted area": {"threshold": 15, "min_changed": 0.0005, "keyframe_seconds": 2.0},
+    "ordinary camera": {"min_changed": 0.005, "keyframe_seconds": 10.0},
+}
+
+# Load shedding. Every role has a priority (0 is never shed), a target latency from capture to
+# processed frame in seconds and, for roles above LOW_PRIORITY, a processed frame rate to keep
+# up. While a role misses a target the shedding level goes up one step every
+# SHED_ADJUST_SECONDS, and back down once all roles are well within target:
+# level 1 lowers the detection resolution of shed roles, level 2 and up also process only every
+# 2nd, 4th, ... frame of low-priority roles, and level 3 defers encoding of their new faces.
+LOAD_SHEDDING = True
+ROLE_PRIORITIES = {"restricted area": 0, "entry gate": 1, "exit gate": 1, "classroom": 2, "ordinary camera": 3}
+ROLE_TARGET_LATENCY = {"restricted area": 0.3, "entry gate": 0.5, "exit gate": 0.5, "classroom": 1.0, "ordinary camera": 2.0}
+ROLE_TARGET_FPS = {"restricted area": 10, "entry gate": 8, "exit gate": 8}
+LOW_PRIORITY = 2
+SHED_ADJUST_SECONDS = 2.0
+SHED_DETECTION_SCALE = 0.7
+SHED_MAX_LEVEL = 4
+
+# Tracking mode: full detection and encoding only every TRACKING_DETECT_INTERVAL frames or
+# when a track is lost. Boxes are carried between detections by the first available OpenCV
+# tracker (KCF needs opencv-contrib-python) and simply held in place without one.
+TRACKING_MODE = True
+TRACKING_DETECT_INTERVAL = 5
+TRACKING_IOU_THRESHOLD = 0.3
+TRACKER_TYPES = ["KCF"]
+
+# Batch processing of recorded footage: file extensions picked up from directories and
+# frames per parallel chunk
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov", ".m4v")
+BATCH_CHUNK_FRAMES = 1500
+
+# Presence debouncing: frames an identity must be seen in before it counts as present,
+# and seconds it must be absent before it can trigger another event on the same camera
+PRESENCE_ENTER_FRAMES = 3
+PRESENCE_LEAVE_SECONDS = 5.0
+
+# Profiling: latency samples kept per pipeline stage and frames replayed by the benchmark
+STAGE_SAMPLES = 10000
+BENCHMARK_FRAMES = 100
+
+# Intruder registry: repeat sightings of an unknown face within INTRUDER_TOLERANCE are merged
+# into one entry; entries unseen for INTRUDER_TTL_HOURS expire and the least recently seen
+# entry is evicted beyond INTRUDER_MAX_ENTRIES
+INTRUDER_DIR = "intruder"
+INTRUDER_TOLERANCE = 0.6
+INTRUDER_TTL_HOURS = 24
+INTRUDER_MAX_ENTRIES = 2000
+# Changes to the registry are written by a background thread at most every INTRUDER_FLUSH_SECONDS
+INTRUDER_FLUSH_SECONDS = 10
+
+# Intruder snapshots are JPEG-encoded on a thread pool; at most SNAPSHOT_QUEUE_SIZE wait to be
+# written. Snapshots go to one directory per day and every snapshot gets a row in the index.
+SNAPSHOT_WORKERS = 2
+SNAPSHOT_QUEUE_SIZE = 64
+SNAPSHOT_DAILY_DIRS = True
+SNAPSHOT_INDEX_FILE = "index.csv"
+SNAPSHOT_INDEX_FIELDS = ["time", "file", "intruder", "camera", "role", "distance", "top", "right", "bottom", "left"]
+
+# Camera service: every assigned camera is owned by one process that publishes its frames
+# into a shared-memory ring of FRAME_BUS_SLOTS frames for all consumers
+CAMERA_SERVICE = True
+FRAME_BUS_SLOTS = 8
+CAMERA_SERVICE_TIMEOUT = 10
+
+# Camera inventory: device indices 0..CAMERA_PROBE_INDICES-1 and any stream URLs or files
+# added to it are probed in parallel, each for at most CAMERA_PROBE_TIMEOUT seconds. Probed
+# devices, role assignments and restricted-area access are kept in CAMERA_CONFIG_FILE.
+CAMERA_CONFIG_FILE = "cameras.json"
+CAMERA_PROBE_INDICES = 8
+CAMERA_PROBE_TIMEOUT = 3
+
+# Watchlist of people tracked across cameras and their last known location
+WATCHLIST_FILE = "watchlist.json"
+# Seconds between writes of the last-seen times while a tracked person stays at one camera
+WATCHLIST_SAVE_SECONDS = 5
+
+# Seconds between checks of known_faces/ for added, changed or deleted images while running
+ROSTER_POLL_SECONDS = 2
+
+# Live view: "mosaic" shows all cameras downscaled in one window refreshed at most MOSAIC_FPS
+# times per second, with boxes drawn on the tiles only when it is redrawn, "windows" one
+# full-size annotated window per camera, "off" no window and no annotation
+DISPLAY_MODE = "mosaic"
+MOSAIC_WIDTH = 1280
+MOSAIC_FPS = 5
+
+# Metrics: a JSON snapshot is written to METRICS_FILE every METRICS_INTERVAL seconds while
+# recognition runs; with METRICS_PORT set the same metrics are served on localhost in the
+# Prometheus text format at /metrics (and as JSON at /metrics.json)
+METRICS_FILE = "metrics.json"
+METRICS_INTERVAL = 5
+METRICS_PORT = None
+
+# Service mode: configuration file of `serve` and the log its startup times are appended to
+SERVICE_CONFIG_FILE = "guardian.json"
+STARTUP_LOG_FILE = "startup_times.log"
+
 # Access control for restricted areas
 restricted_area_access = {
     "student": False,
@@ -31,8 +233,18 @@ restricted_area_access = {
     "guest": False
 }
 
-# Initialize the pyttsx3 engine
-engine = pyttsx3.init()
+# Alert settings. Lower priority numbers are spoken first; an identical message is merged
+# while queued and dropped if it was raised within ALERT_MESSAGE_INTERVAL seconds, and a
+# camera raises at most one alert of each priority every ALERT_CAMERA_INTERVAL seconds, so a
+# low-priority announcement never holds back an intruder alert.
+ALERT_PRIORITY_HIGH = 0
+ALERT_PRIORITY_NORMAL = 1
+ALERT_PRIORITY_LOW = 2
+ALERT_QUEUE_SIZE = 16
+ALERT_MESSAGE_INTERVAL = 10
+ALERT_CAMERA_INTERVAL = 3
+ALERT_SINKS = ["tts", "console", "file"]
+ALERT_LOG_FILE = "alerts.log"
 
 
 
@@ -77,200 +289,3277 @@ def print_centered_text(text):
 
 
 
-# Function to play a warning message
-def play_warning(message):
-    engine.setProperty('rate', 150)  # Speed percent (can go over 100)
-    engine.setProperty('volume', 1)  # Volume 0-1
-    engine.say(message)
-    engine.runAndWait()
+# Class to collect per-stage latencies of the recognition pipeline. Worker processes have
+# their own instance whose samples are drained and merged into the main one.
+class StageTimer:
+    def __init__(self, size=None):
+        self.size = size
+        self.samples = {}
+
+    def add(self, stage, seconds):
+        samples = self.samples.get(stage)
+        if samples is None:
+            # The module-level timer exists before the service configuration is applied
+            size = STAGE_SAMPLES if self.size is None else self.size
+            samples = self.samples.setdefault(stage, deque(maxlen=size))
+        samples.append(seconds)
+
+    @contextmanager
+    def measure(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    # Function to take all samples collected so far
+    def drain(self):
+        samples, self.samples = self.samples, {}
+        return {stage: list(values) for stage, values in samples.items()}
+
+    def merge(self, samples):
+        for stage, values in samples.items():
+            for seconds in values:
+                self.add(stage, seconds)
+
+    # Function to summarize the samples as count, mean and percentiles in milliseconds
+    def summary(self):
+        summary = {}
+        for stage, values in list(self.samples.items()):
+            values = np.array(values) * 1000
+            if len(values):
+                summary[stage] = {
+                    "count": len(values),
+                    "mean_ms": round(float(values.mean()), 3),
+                    "p50_ms": round(float(np.percentile(values, 50)), 3),
+                    "p95_ms": round(float(np.percentile(values, 95)), 3),
+                    "p99_ms": round(float(np.percentile(values, 99)), 3)
+                }
+        return summary
+
+stage_timer = StageTimer()
+
+# Class to speak alerts with pyttsx3. The engine is created on the alert thread that uses it.
+class TTSAlertSink:
+    def __init__(self):
+        self.engine = None
+
+    def send(self, alert):
+        if self.engine is None:
+            self.engine = pyttsx3.init()
+            self.engine.setProperty('rate', 150)  # Speed percent (can go over 100)
+            self.engine.setProperty('volume', 1)  # Volume 0-1
+        self.engine.say(alert["message"])
+        self.engine.runAndWait()
+
+# Class to print alerts to the console
+class ConsoleAlertSink:
+    def send(self, alert):
+        repeats = f" (x{alert['count']})" if alert["count"] > 1 else ""
+        print(f"ALERT [{alert['camera'] or 'system'}] {alert['message']}{repeats}")
+
+# Class to append alerts as JSON lines to a file, a stand-in for a webhook
+class FileAlertSink:
+    def __init__(self, path=None):
+        path = ALERT_LOG_FILE if path is None else path
+        self.path = path
+
+    def send(self, alert):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps({
+                "time": datetime.fromtimestamp(alert["created"]).strftime("%Y-%m-%d %H:%M:%S"),
+                "camera": alert["camera"],
+                "priority": alert["priority"],
+                "message": alert["message"],
+                "count": alert["count"]
+            }) + "\n")
+
+ALERT_SINK_TYPES = {"tts": TTSAlertSink, "console": ConsoleAlertSink, "file": FileAlertSink}
+
+# Class to deliver alerts to the sinks on its own thread, so the vision loop never waits
+# on audio. Alerts wait in a bounded priority queue; when it is full the least urgent
+# alert is dropped.
+class AlertDispatcher(threading.Thread):
+    def __init__(self, sinks, queue_size=None):
+        queue_size = ALERT_QUEUE_SIZE if queue_size is None else queue_size
+        super().__init__(daemon=True, name="alerts")
+        self.sinks = sinks
+        self.queue_size = queue_size
+        self.queue = []
+        self.queued = {}
+        self.last_message = {}
+        self.last_camera = {}
+        self.sequence = 0
+        self.dropped = 0
+        self.rate_limited = 0
+        self.condition = threading.Condition()
+        self.stopped = False
+
+    # Function to queue an alert, returns False if it was merged, rate-limited or dropped
+    def submit(self, message, camera=None, priority=ALERT_PRIORITY_NORMAL):
+        now = time.time()
+        with self.condition:
+            if message in self.queued:
+                self.queued[message]["count"] += 1
+                return False
+            if now - self.last_message.get(message, -ALERT_MESSAGE_INTERVAL) < ALERT_MESSAGE_INTERVAL:
+                self.rate_limited += 1
+                return False
+            if camera is not None and now - self.last_camera.get((camera, priority), -ALERT_CAMERA_INTERVAL) < ALERT_CAMERA_INTERVAL:
+                self.rate_limited += 1
+                return False
 
-# Function to create Excel file name based on the current date
-def get_excel_file():
-    now = datetime.now()
+            if len(self.queue) >= self.queue_size:
+                worst = max(self.queue)
+                if worst[0] <= priority:
+                    self.dropped += 1
+                    return False
+                self.queue.remove(worst)
+                heapq.heapify(self.queue)
+                del self.queued[worst[2]["message"]]
+                self.dropped += 1
+
+            alert = {"message": message, "camera": camera, "priority": priority, "created": now, "count": 1}
+            self.sequence += 1
+            heapq.heappush(self.queue, (priority, self.sequence, alert))
+            self.queued[message] = alert
+            self.last_message[message] = now
+            if camera is not None:
+                self.last_camera[camera, priority] = now
+            self.condition.notify()
+            return True
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.queue and not self.stopped:
+                    self.condition.wait()
+                if self.stopped:
+                    return
+                _, _, alert = heapq.heappop(self.queue)
+                del self.queued[alert["message"]]
+            for sink in self.sinks:
+                try:
+                    sink.send(alert)
+                except Exception as e:
+                    print(f"Error: Alert sink {type(sink).__name__} failed: {e}")
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+
+alert_dispatcher = None
+
+# Function to return the alert dispatcher, started on first use
+def get_alert_dispatcher():
+    global alert_dispatcher
+    if alert_dispatcher is None:
+        alert_dispatcher = AlertDispatcher([ALERT_SINK_TYPES[sink]() for sink in ALERT_SINKS])
+        alert_dispatcher.start()
+    return alert_dispatcher
+
+# Function to play a warning message without blocking the caller
+def play_warning(message, camera=None, priority=ALERT_PRIORITY_NORMAL):
+    with stage_timer.measure("alert"):
+        return get_alert_dispatcher().submit(message, camera, priority)
+
+# Function to create Excel file name based on the current date (or the given datetime)
+def get_excel_file(date=None):
+    now = date or datetime.now()
     date_str = now.strftime("%d-%m-%Y")
     return f'entry_exit_records_{date_str}.xlsx'
 
-# Function to recognize faces
-def recognize_face(face_encoding, known_face_encodings, known_face_names, known_face_designations):
-    matches = face_recognition.compare_faces(known_face_encodings, face_encoding)
-    name = "Unknown"
-    designation = ""
+# Function to return the day (YYYY-MM-DD) of a daily entry/exit workbook, None for other files
+def excel_workbook_day(excel_file):
+    filename = os.path.basename(excel_file)
+    if not (filename.startswith("entry_exit_records_") and filename.endswith(".xlsx")):
+        return None
+    try:
+        return datetime.strptime(filename[len("entry_exit_records_"):-5], "%d-%m-%Y").strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
+# Class to build a coarse inverted-file index over the known encodings. Encodings are
+# grouped around k-means centroids and a query only scans the few nearest groups.
+class ClusterIndex:
+    def __init__(self, encodings, clusters=None, probes=None, iterations=10, seed=0):
+        probes = CLUSTER_INDEX_PROBES if probes is None else probes
+        count = len(encodings)
+        if clusters is None:
+            clusters = max(1, int(np.sqrt(count)))
+        clusters = min(clusters, count)
+        rng = np.random.default_rng(seed)
+
+        # Train the centroids on a sample, then assign every encoding in chunks
+        sample = encodings[rng.choice(count, min(count, clusters * 64), replace=False)]
+        centroids = sample[rng.choice(len(sample), clusters, replace=False)].copy()
+        for _ in range(iterations):
+            labels = self.nearest_centroids(sample, centroids, 1)[:, 0]
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            sizes = np.bincount(labels, minlength=clusters)
+            filled = sizes > 0
+            centroids[filled] = sums[filled] / sizes[filled, None]
+
+        labels = np.concatenate([
+            self.nearest_centroids(encodings[start:start + 8192], centroids, 1)[:, 0]
+            for start in range(0, count, 8192)
+        ])
+        self.centroids = centroids
+        self.probes = min(probes, clusters)
+        self.order = np.argsort(labels, kind='stable')
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=clusters))])
+
+    @staticmethod
+    def nearest_centroids(points, centroids, k):
+        distances = (
+            np.einsum('ij,ij->i', points, points)[:, None]
+            + np.einsum('ij,ij->i', centroids, centroids)[None, :]
+            - 2 * points @ centroids.T
+        )
+        if k >= centroids.shape[0]:
+            return np.argsort(distances, axis=1)
+        nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        return nearest
+
+    # Function to return the candidate rows to scan for a single query
+    def candidates(self, probes):
+        return np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in probes])
+
+# Class to match face encodings against the known faces. The known encodings are held
+# as one contiguous float32 matrix and every face in a frame is matched in one go.
+class FaceMatcher:
+    def __init__(self, known_face_encodings, known_face_names, known_face_designations,
+                 tolerance=None, index=None):
+        tolerance = MATCH_TOLERANCE if tolerance is None else tolerance
+        index = MATCHER_INDEX if index is None else index
+        self.encodings = np.ascontiguousarray(
+            np.asarray(known_face_encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE))
+        self.squared_norms = np.einsum('ij,ij->i', self.encodings, self.encodings)
+        self.names = list(known_face_names)
+        self.designations = list(known_face_designations)
+        self.tolerance = tolerance
+
+        if index == "auto":
+            index = "cluster" if len(self.encodings) >= CLUSTER_INDEX_MIN_FACES else "exact"
+        self.index = None
+        if index == "cluster" and len(self.encodings):
+            self.index = ClusterIndex(self.encodings)
 
-    if True in matches:
-        first_match_index = matches.index(True)
-        name = known_face_names[first_match_index]
-        designation = known_face_designations[first_match_index]
+    def __len__(self):
+        return len(self.encodings)
 
-    return name, designation
+    # Function to compute the distances from every query face to every known face
+    def distances(self, face_encodings):
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+        squared = (
+            np.einsum('ij,ij->i', queries, queries)[:, None]
+            + self.squared_norms[None, :]
+            - 2 * queries @ self.encodings.T
+        )
+        return np.sqrt(np.maximum(squared, 0))
 
-# Function to save intruder face data
-def save_intruder_face(frame, top, right, bottom, left, face_encoding):
-    now = datetime.now()
-    timestamp = now.strftime("%Y-%m-%d-%H-%M-%S")
+    # Function to find the closest known face for each query, returns (rows, distances)
+    def nearest(self, face_encodings):
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+        if self.index is None:
+            distances = self.distances(queries)
+            rows = np.argmin(distances, axis=1)
+            return rows, distances[np.arange(len(queries)), rows]
+
+        probes = ClusterIndex.nearest_centroids(queries, self.index.centroids, self.index.probes)
+        rows = np.empty(len(queries), dtype=np.int64)
+        best = np.empty(len(queries), dtype=np.float32)
+        for i, query in enumerate(queries):
+            candidates = self.index.candidates(probes[i])
+            squared = self.squared_norms[candidates] - 2 * self.encodings[candidates] @ query + query @ query
+            j = np.argmin(squared)
+            rows[i] = candidates[j]
+            best[i] = np.sqrt(max(squared[j], 0))
+        return rows, best
+
+    # Function to recognize every face in a frame, returns (name, designation, distance) per face
+    def match(self, face_encodings):
+        if len(face_encodings) == 0:
+            return []
+        if len(self.encodings) == 0:
+            return [("Unknown", "", float('inf'))] * len(face_encodings)
+
+        with stage_timer.measure("match"):
+            rows, distances = self.nearest(face_encodings)
+        results = []
+        for row, distance in zip(rows, distances):
+            if distance <= self.tolerance:
+                results.append((self.names[row], self.designations[row], float(distance)))
+            else:
+                results.append(("Unknown", "", float(distance)))
+        return results
+
+# Function to measure the per-frame matching cost for different roster sizes
+def benchmark_matcher(roster_sizes=(100, 10000, 100000), faces_per_frame=4, frames=50):
+    rng = np.random.default_rng(0)
+    print(f"{'identities':>10} {'index':>8} {'build ms':>9} {'frame ms':>9} {'top-1 agree':>12}")
+    for size in roster_sizes:
+        known = rng.normal(0, 0.09, (size, ENCODING_SIZE)).astype(np.float32)
+        names = [f"person-{i}" for i in range(size)]
+        picks = rng.integers(0, size, (frames, faces_per_frame))
+        queries = known[picks] + rng.normal(0, 0.02, (frames, faces_per_frame, ENCODING_SIZE)).astype(np.float32)
+
+        exact_rows = None
+        for index in ("exact", "cluster"):
+            start = time.perf_counter()
+            matcher = FaceMatcher(known, names, ["Student"] * size, index=index)
+            build_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            rows = [matcher.nearest(frame)[0] for frame in queries]
+            frame_ms = (time.perf_counter() - start) * 1000 / frames
+
+            rows = np.array(rows)
+            if exact_rows is None:
+                exact_rows = rows
+            agree = np.mean(rows == exact_rows) * 100
+            print(f"{size:>10} {index:>8} {build_ms:>9.1f} {frame_ms:>9.3f} {agree:>11.1f}%")
+
+# Class to write intruder snapshots in the background. Crops are handed over with their
+# metadata, get a collision-free name straight away and are encoded and written on a thread
+# pool; each written snapshot is appended to an index CSV so the history can be searched
+# without scanning the folder.
+class SnapshotWriter:
+    def __init__(self, directory=None, workers=None, queue_size=None, daily_dirs=None):
+        directory = INTRUDER_DIR if directory is None else directory
+        workers = SNAPSHOT_WORKERS if workers is None else workers
+        queue_size = SNAPSHOT_QUEUE_SIZE if queue_size is None else queue_size
+        daily_dirs = SNAPSHOT_DAILY_DIRS if daily_dirs is None else daily_dirs
+        self.directory = directory
+        self.daily_dirs = daily_dirs
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="snapshots")
+        self.slots = threading.BoundedSemaphore(queue_size)
+        self.index_lock = threading.Lock()
+        self.sequence = itertools.count(1)
+        self.dropped = 0
+
+    # Function to build a unique snapshot path for a capture time
+    def snapshot_path(self, captured_at):
+        directory = self.directory
+        if self.daily_dirs:
+            directory = os.path.join(directory, captured_at.strftime("%Y-%m-%d"))
+        timestamp = captured_at.strftime("%Y-%m-%d-%H-%M-%S-%f")
+        return os.path.join(directory, f"Intruder-{timestamp}-{os.getpid()}-{next(self.sequence)}.jpg")
+
+    # Function to queue a crop, returns its future file name or None if the queue is full
+    def submit(self, crop, captured_at, metadata):
+        if not self.slots.acquire(blocking=False):
+            self.dropped += 1
+            return None
+        filename = self.snapshot_path(captured_at)
+        row = dict(metadata, time=captured_at.strftime("%Y-%m-%d %H:%M:%S.%f"), file=filename)
+        self.pool.submit(self.write, filename, crop.copy(), row)
+        return filename
+
+    def write(self, filename, crop, row):
+        try:
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            if not cv2.imwrite(filename, crop):
+                print(f"Error: Could not write intruder snapshot {filename}")
+                return
+            index_path = os.path.join(self.directory, SNAPSHOT_INDEX_FILE)
+            with self.index_lock:
+                new_index = not os.path.exists(index_path)
+                with open(index_path, 'a', newline='') as f:
+                    writer = csv.DictWriter(f, fieldnames=SNAPSHOT_INDEX_FIELDS, extrasaction='ignore')
+                    if new_index:
+                        writer.writeheader()
+                    writer.writerow(row)
+        except Exception as e:
+            print(f"Error: Could not write intruder snapshot {filename}: {e}")
+        finally:
+            self.slots.release()
+
+    # Function to wait until every queued snapshot has been written
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+snapshot_writer = None
+
+# Function to return the snapshot writer, created on first use
+def get_snapshot_writer():
+    global snapshot_writer
+    if snapshot_writer is None:
+        snapshot_writer = SnapshotWriter()
+    return snapshot_writer
+
+# Function to wait for pending snapshots and shut the snapshot writer down
+def close_snapshot_writer():
+    global snapshot_writer
+    if snapshot_writer is not None:
+        snapshot_writer.close()
+        snapshot_writer = None
+
+# Function to save intruder face data, returns the snapshot file name. The snapshot is
+# written in the background.
+def save_intruder_face(frame, top, right, bottom, left, face_encoding=None, camera=None, role=None,
+                       distance=None, captured_at=None, intruder_id=None):
     face_image = frame[top:bottom, left:right]
-    filename = f"intruder/Intruder-{timestamp}.jpg"
-    if not os.path.exists('intruder'):
-        os.makedirs('intruder')
-    cv2.imwrite(filename, face_image)
-    print(f"Intruder detected. Saved as {filename}")
-    intruder_data.append((face_encoding, filename))
+    metadata = {
+        "intruder": intruder_id,
+        "camera": camera,
+        "role": role,
+        "distance": None if distance is None else round(distance, 4),
+        "top": top, "right": right, "bottom": bottom, "left": left
+    }
+    filename = get_snapshot_writer().submit(face_image, captured_at or datetime.now(), metadata)
+    if filename:
+        print(f"Intruder detected. Saved as {filename}")
+    return filename
+
+# Class to remember unknown faces across sightings and restarts. Encodings live in one
+# contiguous matrix that is searched in a single vectorized operation; every entry keeps its
+# first and last sighting, a sighting count and the largest crop saved so far.
+class IntruderRegistry:
+    def __init__(self, directory=None, max_entries=None, ttl_hours=None):
+        directory = INTRUDER_DIR if directory is None else directory
+        max_entries = INTRUDER_MAX_ENTRIES if max_entries is None else max_entries
+        ttl_hours = INTRUDER_TTL_HOURS if ttl_hours is None else ttl_hours
+        self.directory = directory
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_hours * 3600
+        self.encodings = np.zeros((max_entries, ENCODING_SIZE), dtype=np.float32)
+        self.last_seen = np.zeros(max_entries)
+        self.entries = []
+        self.next_id = 1
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.dirty = False
+        self.stopped = threading.Event()
+        self.flusher = None
+        self.load()
+
+    def matrix_path(self):
+        return os.path.join(self.directory, "registry.npy")
+
+    def index_path(self):
+        return os.path.join(self.directory, "registry.json")
+
+    def load(self):
+        if not os.path.exists(self.index_path()):
+            return
+        try:
+            with open(self.index_path(), 'r') as f:
+                index = json.load(f)
+            encodings = np.load(self.matrix_path())
+        except (OSError, ValueError):
+            print("Intruder registry is unreadable, starting a new one.")
+            return
+        entries = index["entries"][-self.max_entries:]
+        encodings = encodings[-self.max_entries:]
+        self.entries = entries
+        self.encodings[:len(entries)] = encodings
+        self.last_seen[:len(entries)] = [entry["last_seen"] for entry in entries]
+        self.next_id = index["next_id"]
+
+    # Function to write the registry if it changed; the state is copied under the lock and
+    # written outside it, so sightings are not held up by the disk
+    def save(self):
+        with self.save_lock:
+            with self.lock:
+                if not self.dirty:
+                    return
+                encodings = self.encodings[:len(self.entries)].copy()
+                index = json.dumps({"next_id": self.next_id, "entries": self.entries})
+                self.dirty = False
+            if not os.path.exists(self.directory):
+                os.makedirs(self.directory)
+            with open(self.matrix_path() + ".tmp", 'wb') as f:
+                np.save(f, encodings)
+            with open(self.index_path() + ".tmp", 'w') as f:
+                f.write(index)
+            os.replace(self.matrix_path() + ".tmp", self.matrix_path())
+            os.replace(self.index_path() + ".tmp", self.index_path())
+
+    # Function to mark the registry changed and start the background flush on first use.
+    # Called with the lock held.
+    def mark_dirty(self):
+        self.dirty = True
+        if self.flusher is None:
+            self.flusher = threading.Thread(target=self.flush_loop, daemon=True, name="intruder-registry")
+            self.flusher.start()
+
+    def flush_loop(self):
+        while not self.stopped.wait(INTRUDER_FLUSH_SECONDS):
+            try:
+                self.save()
+            except OSError as e:
+                print(f"Error: Could not save the intruder registry: {e}")
+
+    # Function to stop the background flush and write pending changes
+    def close(self):
+        self.stopped.set()
+        if self.flusher is not None:
+            self.flusher.join()
+        self.save()
+
+    # Function to remove an entry by moving the last row into its place
+    def remove(self, row):
+        last = len(self.entries) - 1
+        self.encodings[row] = self.encodings[last]
+        self.last_seen[row] = self.last_seen[last]
+        self.entries[row] = self.entries[last]
+        self.entries.pop()
+
+    def expire(self, now):
+        for row in sorted(np.nonzero(self.last_seen[:len(self.entries)] < now - self.ttl_seconds)[0], reverse=True):
+            self.remove(row)
+
+    # Function to return the row of the closest known intruder, None if there is none in tolerance
+    def lookup(self, face_encoding):
+        count = len(self.entries)
+        if count == 0:
+            return None
+        distances = np.linalg.norm(self.encodings[:count] - np.asarray(face_encoding, dtype=np.float32), axis=1)
+        row = int(np.argmin(distances))
+        return row if distances[row] <= INTRUDER_TOLERANCE else None
+
+    # Function to register a sighting, returns (entry, True if this is a new intruder)
+    def sight(self, face_encoding, seen_at):
+        with self.lock:
+            self.expire(seen_at)
+            row = self.lookup(face_encoding)
+            if row is not None:
+                entry = self.entries[row]
+                entry["count"] += 1
+                entry["last_seen"] = seen_at
+                self.last_seen[row] = seen_at
+                # Keep the entry encoding at the mean of its sightings
+                self.encodings[row] += (np.asarray(face_encoding, dtype=np.float32) - self.encodings[row]) / entry["count"]
+                self.mark_dirty()
+                return entry, False
+
+            if len(self.entries) >= self.max_entries:
+                self.remove(int(np.argmin(self.last_seen[:len(self.entries)])))
+            row = len(self.entries)
+            entry = {
+                "id": f"intruder-{self.next_id}",
+                "first_seen": seen_at,
+                "last_seen": seen_at,
+                "count": 1,
+                "best_crop": None,
+                "crop_score": 0
+            }
+            self.next_id += 1
+            self.entries.append(entry)
+            self.encodings[row] = face_encoding
+            self.last_seen[row] = seen_at
+            self.mark_dirty()
+            return entry, True
+
+    # Function to keep the crop as the entry's best one when its quality score is higher than
+    # that of the current one
+    def offer_crop(self, entry, crop_score):
+        return crop_score > entry.get("crop_score", 0)
+
+    def set_crop(self, entry, filename, crop_score):
+        with self.lock:
+            entry["best_crop"] = filename
+            entry["crop_score"] = crop_score
+            self.mark_dirty()
+
+intruder_registry = None
+
+# Function to return the intruder registry, loaded on first use
+def get_intruder_registry():
+    global intruder_registry
+    if intruder_registry is None:
+        intruder_registry = IntruderRegistry()
+    return intruder_registry
+
+# Function to write pending intruder registry changes and stop its background flush
+def close_intruder_registry():
+    global intruder_registry
+    if intruder_registry is not None:
+        intruder_registry.close()
+        intruder_registry = None
+
+# Class to keep entry and exit records in the daily Excel file directly. Every event re-reads
+# and rewrites the whole workbook, so it is only kept for setups that rely on that behaviour.
+class ExcelRecordStore:
+    def record_entry(self, name, designation, enter_time):
+        self.update(name, designation, enter_time)
+
+    def record_exit(self, name, designation, exit_time):
+        self.update(name, designation, None, exit_time)
+
+    # Function to write an entry or exit into the workbook of the day the event happened on
+    def update(self, name, designation, enter_time, exit_time=None):
+        event_time = exit_time if exit_time else enter_time
+        excel_file = get_excel_file(None if pd.isnull(event_time) else pd.Timestamp(event_time).to_pydatetime())
+
+        if not os.path.exists(excel_file):
+            df = pd.DataFrame(columns=['Name', 'Designation', 'Enter Time', 'Exit Time'])
+        else:
+            df = pd.read_excel(excel_file)
+
+        if pd.isnull(enter_time):
+            enter_time_str = "Unknown"
+        else:
+            enter_time_str = pd.Timestamp(enter_time).strftime("%Y-%m-%d %H:%M:%S")
+
+        if exit_time:
+            exit_time_str = pd.Timestamp(exit_time).strftime("%Y-%m-%d %H:%M:%S")
+            df['Exit Time'] = df['Exit Time'].astype('object')
+            df.loc[(df['Name'] == name) & (df['Designation'] == designation) & (df['Exit Time'].isnull()), 'Exit Time'] = exit_time_str
+        else:
+            existing_entries = df[(df['Name'] == name) & (df['Designation'] == designation) & (df['Exit Time'].isnull())]
+            if existing_entries.empty:
+                new_entry = pd.DataFrame({'Name': [name], 'Designation': [designation], 'Enter Time': [enter_time_str], 'Exit Time': [pd.NaT]})
+                df = pd.concat([df, new_entry], ignore_index=True)
+
+        df.to_excel(excel_file, index=False)
+
+    # Function to record an event from a recording, skipped when the same event is already in
+    # the workbook within PRESENCE_LEAVE_SECONDS
+    def record_replayed(self, kind, name, designation, event_time):
+        excel_file = get_excel_file(datetime.strptime(event_time[:10], "%Y-%m-%d"))
+        if os.path.exists(excel_file):
+            df = pd.read_excel(excel_file)
+            column = "Enter Time" if kind == "entry" else "Exit Time"
+            times = pd.to_datetime(df[column].where(df[column] != "Unknown"), errors="coerce")
+            same = (df["Name"] == name) & (df["Designation"] == designation)
+            if ((times[same] - pd.Timestamp(event_time)).abs() <= pd.Timedelta(seconds=PRESENCE_LEAVE_SECONDS)).any():
+                return False
+        if kind == "entry":
+            self.record_entry(name, designation, event_time)
+        else:
+            self.record_exit(name, designation, event_time)
+        return True
+
+    def export_excel(self, date=None):
+        return get_excel_file(date)
+
+    # Function to return a version per day in [start_day, end_day] that has a workbook. The
+    # workbooks are listed rather than probed day by day, so open-ended ranges work as well.
+    def day_versions(self, start_day, end_day):
+        versions = {}
+        for excel_file in os.listdir(os.path.dirname(get_excel_file()) or "."):
+            day = excel_workbook_day(excel_file)
+            if day is not None and start_day <= day <= end_day:
+                stat = os.stat(get_excel_file(datetime.strptime(day, "%Y-%m-%d")))
+                versions[day] = (stat.st_mtime_ns, stat.st_size)
+        return versions
+
+    # Function to turn the workbooks of the given days into entry and exit events
+    def events(self, days):
+        frames = [excel_events(get_excel_file(datetime.strptime(day, "%Y-%m-%d")), day) for day in days]
+        if not frames:
+            return pd.DataFrame(columns=["id", "day", "kind", "name", "designation", "time"])
+        return pd.concat(frames, ignore_index=True)
+
+# Function to read a daily entry/exit workbook as entry and exit events
+def excel_events(excel_file, day):
+    df = pd.read_excel(excel_file)
+    frames = []
+    for kind, column in (("entry", "Enter Time"), ("exit", "Exit Time")):
+        times = pd.to_datetime(df[column].where(df[column] != "Unknown"), errors="coerce")
+        frames.append(pd.DataFrame({"id": df.index * 2 + (kind == "exit"), "day": day, "kind": kind,
+                                    "name": df["Name"], "designation": df["Designation"],
+                                    "time": times})[times.notnull()])
+    return pd.concat(frames, ignore_index=True)
+
+# Class to keep entry and exit records as an append-only event log in SQLite (WAL mode).
+# Open sessions (entered, not yet exited) of the current day are indexed in memory, so an
+# entry or exit is a dictionary lookup plus at most one INSERT.
+class SQLiteRecordStore:
+    def __init__(self, path=None):
+        path = RECORDS_DB if path is None else path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            "id INTEGER PRIMARY KEY, day TEXT, kind TEXT, name TEXT, designation TEXT, time TEXT)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS events_day ON events (day)")
+        self.conn.commit()
+        self.lock = threading.Lock()
+        self.day = None
+        self.open_sessions = {}
+
+    # Function to switch the open-session index to the day of the event. The report of the
+    # previous day is written once its last event has been recorded.
+    def load_day(self, day):
+        if day == self.day:
+            return
+        previous = self.day
+        self.day = day
+        self.open_sessions = {}
+        for kind, name, designation, event_time in self.conn.execute(
+                "SELECT kind, name, designation, time FROM events WHERE day = ? ORDER BY time, id", (day,)):
+            if kind == "entry":
+                self.open_sessions.setdefault((name, designation), event_time)
+            else:
+                self.open_sessions.pop((name, designation), None)
+        if previous is not None and previous < day:
+            self.export_excel(datetime.strptime(previous, "%Y-%m-%d"))
+
+    def append(self, kind, name, designation, event_time):
+        self.conn.execute(
+            "INSERT INTO events (day, kind, name, designation, time) VALUES (?, ?, ?, ?, ?)",
+            (event_time[:10], kind, name, designation, event_time))
+        self.conn.commit()
+
+    def record_entry(self, name, designation, enter_time):
+        with self.lock:
+            self.load_day(enter_time[:10])
+            if (name, designation) in self.open_sessions:
+                return False
+            self.append("entry", name, designation, enter_time)
+            self.open_sessions[(name, designation)] = enter_time
+            return True
+
+    def record_exit(self, name, designation, exit_time):
+        with self.lock:
+            self.load_day(exit_time[:10])
+            if (name, designation) not in self.open_sessions:
+                return False
+            self.append("exit", name, designation, exit_time)
+            del self.open_sessions[(name, designation)]
+            return True
+
+    # Function to record an event from a recording. Recordings may cover a day that was already
+    # recorded live, and entry and exit footage may be processed in separate runs, so the event
+    # is stored as it happened and is only skipped when the same event is already logged within
+    # PRESENCE_LEAVE_SECONDS. Sessions are paired in time order afterwards.
+    def record_replayed(self, kind, name, designation, event_time):
+        at = datetime.strptime(event_time, "%Y-%m-%d %H:%M:%S")
+        window = timedelta(seconds=PRESENCE_LEAVE_SECONDS)
+        with self.lock:
+            duplicate = self.conn.execute(
+                "SELECT 1 FROM events WHERE day = ? AND kind = ? AND name = ? AND designation = ? AND time BETWEEN ? AND ? LIMIT 1",
+                (event_time[:10], kind, name, designation, (at - window).strftime("%Y-%m-%d %H:%M:%S"),
+                 (at + window).strftime("%Y-%m-%d %H:%M:%S"))).fetchone()
+            if duplicate:
+                return False
+            self.append(kind, name, designation, event_time)
+            if event_time[:10] == self.day:
+                # Rebuild the open sessions of the day, the event may precede logged ones
+                self.day = None
+                self.load_day(event_time[:10])
+            return True
+
+    # Function to pair the events of a day into (name, designation, enter time, exit time) rows
+    def sessions(self, day):
+        rows = []
+        open_rows = {}
+        for kind, name, designation, event_time in self.conn.execute(
+                "SELECT kind, name, designation, time FROM events WHERE day = ? ORDER BY time, id", (day,)):
+            if kind == "entry":
+                open_rows[(name, designation)] = len(rows)
+                rows.append([name, designation, event_time, pd.NaT])
+            elif (name, designation) in open_rows:
+                rows[open_rows.pop((name, designation))][3] = event_time
+        return rows
+
+    # Function to return (event count, last event id) per day in [start_day, end_day]
+    def day_versions(self, start_day, end_day):
+        with self.lock:
+            return {day: (count, last_id) for day, count, last_id in self.conn.execute(
+                "SELECT day, COUNT(*), MAX(id) FROM events WHERE day BETWEEN ? AND ? GROUP BY day",
+                (start_day, end_day))}
+
+    # Function to load the events of the given days as a DataFrame in one query
+    def events(self, days):
+        days = sorted(days)
+        with self.lock:
+            df = pd.read_sql_query(
+                "SELECT id, day, kind, name, designation, time FROM events WHERE day BETWEEN ? AND ?",
+                self.conn, params=(days[0], days[-1]))
+        df = df[df["day"].isin(days)].copy()
+        df["time"] = pd.to_datetime(df["time"], format="%Y-%m-%d %H:%M:%S", errors="coerce")
+        return df
+
+    # Function to write the Excel report of a day from the event log
+    def export_excel(self, date=None):
+        date = date or datetime.now()
+        rows = self.sessions(date.strftime("%Y-%m-%d"))
+        df = pd.DataFrame(rows, columns=['Name', 'Designation', 'Enter Time', 'Exit Time'])
+        excel_file = get_excel_file(date)
+        df.to_excel(excel_file, index=False)
+        return excel_file
+
+RECORD_BACKENDS = {"sqlite": SQLiteRecordStore, "excel": ExcelRecordStore}
+record_store = None
+
+# Function to return the configured records backend, created on first use
+def get_record_store():
+    global record_store
+    if record_store is None:
+        record_store = RECORD_BACKENDS[RECORDS_BACKEND]()
+    return record_store
 
 # Function to update entry and exit records
-def update_entry_exit_records(name, designation, enter_time, exit_time=None):
-    excel_file = get_excel_file()
+def update_entry_exit_records(name, designation, enter_time, exit_time=None, replayed=False):
+    store = get_record_store()
+    with stage_timer.measure("record"):
+        if replayed:
+            store.record_replayed("exit" if exit_time else "entry", name, designation, exit_time or enter_time)
+        elif exit_time:
+            store.record_exit(name, designation, exit_time)
+        else:
+            store.record_entry(name, designation, enter_time)
 
-    if not os.path.exists(excel_file):
-        df = pd.DataFrame(columns=['Name', 'Designation', 'Enter Time', 'Exit Time'])
-    else:
-        df = pd.read_excel(excel_file)
+# Function to write the Excel report for a day (today by default)
+def export_excel_report(date=None):
+    excel_file = get_record_store().export_excel(date)
+    print(f"Entry/exit report written to {excel_file}")
+    return excel_file
 
-    if pd.isnull(enter_time):
-        enter_time_str = "Unknown"
-    else:
-        enter_time_str = pd.Timestamp(enter_time).strftime("%Y-%m-%d %H:%M:%S")
+# Function to import pyarrow, which only the records archive needs
+def load_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.dataset
+    except ImportError:
+        print("Error: The records archive needs pyarrow (pip install pyarrow).")
+        return None
+    return pyarrow
 
-    if exit_time:
-        exit_time_str = pd.Timestamp(exit_time).strftime("%Y-%m-%d %H:%M:%S")
-        df['Exit Time'] = df['Exit Time'].astype('object')
-        df.loc[(df['Name'] == name) & (df['Designation'] == designation) & (df['Exit Time'].isnull()), 'Exit Time'] = exit_time_str
-    else:
-        existing_entries = df[(df['Name'] == name) & (df['Designation'] == designation) & (df['Exit Time'].isnull())]
-        if existing_entries.empty:
-            new_entry = pd.DataFrame({'Name': [name], 'Designation': [designation], 'Enter Time': [enter_time_str], 'Exit Time': [pd.NaT]})
-            df = pd.concat([df, new_entry], ignore_index=True)
+# Class to keep finished days of entry/exit events as Parquet files partitioned by day
+# (records_archive/day=YYYY-MM-DD/part-0.parquet). Events do not record the camera that saw
+# them, so there is no role to partition by beyond the event kind, which is a column. Names,
+# designations and event kinds are dictionary-encoded, and range queries only open the
+# partitions and columns they need. The manifest records the source and version of every
+# archived day.
+class RecordsArchive:
+    def __init__(self, path=None):
+        path = ARCHIVE_DIR if path is None else path
+        self.path = path
+        self.manifest_path = os.path.join(path, ARCHIVE_MANIFEST)
+        self.days = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r') as f:
+                self.days = json.load(f)
+
+    def save_manifest(self):
+        with open(self.manifest_path + ".tmp", 'w') as f:
+            json.dump(self.days, f, indent=1, sort_keys=True)
+        os.replace(self.manifest_path + ".tmp", self.manifest_path)
+
+    # Function to replace the archived days of the given events, `versions` maps day to the
+    # version of the day in its source
+    def write_days(self, events, source, versions):
+        pa = load_pyarrow()
+        if pa is None:
+            return 0
+        if not os.path.exists(self.path):
+            os.makedirs(self.path)
+        events = events.dropna(subset=["time"])
+        table = pa.table({
+            "id": pa.array(events["id"].to_numpy(dtype=np.int64)),
+            "time": pa.array(pd.to_datetime(events["time"]).to_numpy(dtype="datetime64[s]")),
+            "kind": pa.array(events["kind"].astype(str).tolist()).dictionary_encode(),
+            "name": pa.array(events["name"].astype(str).tolist()).dictionary_encode(),
+            "designation": pa.array(events["designation"].astype(str).tolist()).dictionary_encode(),
+            "day": pa.array(events["day"].astype(str).tolist())
+        })
+        for day in versions:
+            shutil.rmtree(os.path.join(self.path, f"day={day}"), ignore_errors=True)
+        pa.dataset.write_dataset(table, self.path, format="parquet", partitioning=["day"],
+                                 partitioning_flavor="hive", basename_template="part-{i}.parquet",
+                                 existing_data_behavior="overwrite_or_ignore")
+        rows = events["day"].astype(str).value_counts()
+        for day, version in versions.items():
+            self.days[day] = {"source": source, "version": list(version), "rows": int(rows.get(day, 0))}
+        self.save_manifest()
+        return len(events)
+
+    # Function to read the archived events of days in [start_day, end_day], restricted to the
+    # given columns and event kinds
+    def query(self, start_day, end_day, columns=None, kinds=None):
+        pa = load_pyarrow()
+        days = [day for day in self.days if start_day <= day <= end_day]
+        if pa is None or not days:
+            return pd.DataFrame(columns=columns or ["id", "time", "kind", "name", "designation", "day"])
+        dataset = pa.dataset.dataset(self.path, format="parquet", partitioning="hive")
+        condition = (pa.dataset.field("day") >= start_day) & (pa.dataset.field("day") <= end_day)
+        if kinds:
+            condition = condition & pa.dataset.field("kind").isin(list(kinds))
+        return dataset.to_table(columns=columns, filter=condition).to_pandas()
+
+    def day_versions(self, start_day, end_day):
+        return {day: ("archive", *info["version"]) for day, info in self.days.items() if start_day <= day <= end_day}
+
+    # Function to load the archived events of the given days, as SQLiteRecordStore.events does
+    def events(self, days):
+        days = sorted(days)
+        df = self.query(days[0], days[-1], ["id", "day", "kind", "name", "designation", "time"])
+        return df[df["day"].isin(days)]
+
+# Function to archive the finished days of the records store that are new or changed since
+# they were last archived. All of them are loaded in one query.
+def archive_records(store=None, archive=None):
+    store = store or get_record_store()
+    archive = archive or RecordsArchive()
+    yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+    versions = store.day_versions("0000-00-00", yesterday)
+    stale = {day: version for day, version in versions.items()
+             if archive.days.get(day, {}).get("version") != list(version)}
+    if not stale:
+        print("Records archive is up to date.")
+        return 0
+    rows = archive.write_days(store.events(list(stale)), RECORDS_BACKEND, stale)
+    print(f"Archived {len(stale)} days ({rows} events) to {archive.path}")
+    return len(stale)
+
+# Function to import existing entry_exit_records_DD-MM-YYYY.xlsx workbooks (files or
+# directories) into the archive. Days already archived from the records store and today's
+# unfinished workbook are skipped.
+def import_excel_records(paths, archive=None):
+    archive = archive or RecordsArchive()
+    today = datetime.now().strftime("%Y-%m-%d")
+    workbooks = {}
+    for path in paths:
+        files = [os.path.join(path, filename) for filename in sorted(os.listdir(path))] if os.path.isdir(path) else [path]
+        for excel_file in files:
+            day = excel_workbook_day(excel_file)
+            if day is None:
+                continue
+            if day < today and archive.days.get(day, {}).get("source", "excel") == "excel":
+                workbooks[day] = excel_file
+
+    versions = {}
+    frames = []
+    for day, excel_file in sorted(workbooks.items()):
+        stat = os.stat(excel_file)
+        if archive.days.get(day, {}).get("version") == [stat.st_mtime_ns, stat.st_size]:
+            continue
+        try:
+            frames.append(excel_events(excel_file, day))
+            versions[day] = (stat.st_mtime_ns, stat.st_size)
+        except Exception as e:
+            print(f"Error: Could not read {excel_file}: {e}")
+    if frames:
+        archive.write_days(pd.concat(frames, ignore_index=True), "excel", versions)
+    print(f"Imported {len(versions)} workbooks into {archive.path}")
+    return len(versions)
+
+# Function to print the number of archived events per day and kind in a date range, reading
+# only the day partition and the kind column
+def show_archive(start, end):
+    df = RecordsArchive().query(start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"), ["day", "kind"])
+    if df.empty:
+        print("No archived events in this range.")
+        return
+    print(df.groupby(["day", "kind"], observed=True).size().unstack(fill_value=0).to_string())
+
+# Function to pair entry and exit events into sessions with vectorized operations. Every
+# entry is closed by the next event of the same person on the same day if that is an exit;
+# returns (sessions, unmatched exits). Sessions without an exit have a NaT exit time.
+def pair_sessions(events):
+    events = events.dropna(subset=["time"]).sort_values(["day", "name", "designation", "time", "id"])
+    for column in ("day", "kind", "name", "designation"):
+        events[column] = events[column].astype("category")
+    grouped = events.groupby(["day", "name", "designation"], observed=True, sort=False)
+    next_kind = grouped["kind"].shift(-1).astype(object)
+    next_time = grouped["time"].shift(-1)
+    previous_kind = grouped["kind"].shift(1).astype(object)
+    is_entry = (events["kind"] == "entry").to_numpy()
+
+    sessions = events.loc[is_entry, ["day", "name", "designation", "time"]].rename(columns={"time": "enter"})
+    sessions["exit"] = next_time[is_entry].where(next_kind[is_entry] == "exit")
+    sessions["dwell"] = sessions["exit"] - sessions["enter"]
+    unmatched_exits = events.loc[~is_entry & (previous_kind != "entry").to_numpy(), ["day", "name", "designation", "time"]]
+    return sessions.reset_index(drop=True), unmatched_exits.reset_index(drop=True)
+
+# Function to load the sessions of all days in [start, end] from the records store. Days before
+# today are closed and cached in ANALYTICS_CACHE_DIR; a cached day is reused while its version
+# in the store (event count and last event id) is unchanged. Days missing from the store are
+# read from the records archive. All other days are loaded in a
+# single query and paired in one pass.
+def load_attendance(start, end, store=None, cache_dir=None):
+    cache_dir = ANALYTICS_CACHE_DIR if cache_dir is None else cache_dir
+    store = store or get_record_store()
+    archive = RecordsArchive()
+    today = datetime.now().strftime("%Y-%m-%d")
+    # Days that are only in the archive (e.g. imported workbooks) are read from there
+    versions = archive.day_versions(start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"))
+    store_versions = store.day_versions(start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"))
+    versions.update(store_versions)
+
+    sessions, unmatched_exits, stale = [], [], []
+    for day, version in sorted(versions.items()):
+        cache_file = os.path.join(cache_dir, f"{day}.pkl")
+        cached = None
+        if day < today and os.path.exists(cache_file):
+            try:
+                cached = pd.read_pickle(cache_file)
+            except Exception:
+                cached = None
+        if cached is not None and tuple(cached["version"]) == tuple(version):
+            sessions.append(cached["sessions"])
+            unmatched_exits.append(cached["unmatched_exits"])
+        else:
+            stale.append(day)
 
-    df.to_excel(excel_file, index=False)
+    if stale:
+        stale_events = []
+        for source, days in ((store, [day for day in stale if day in store_versions]),
+                             (archive, [day for day in stale if day not in store_versions])):
+            if days:
+                stale_events.append(source.events(days))
+        day_sessions, day_unmatched = pair_sessions(pd.concat(stale_events, ignore_index=True))
+        sessions.append(day_sessions)
+        unmatched_exits.append(day_unmatched)
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        for day in stale:
+            if day < today:
+                pd.to_pickle({
+                    "version": versions[day],
+                    "sessions": day_sessions[day_sessions["day"] == day],
+                    "unmatched_exits": day_unmatched[day_unmatched["day"] == day]
+                }, os.path.join(cache_dir, f"{day}.pkl"))
+
+    columns = ["day", "name", "designation"]
+    # Empty results keep the datetime and timedelta dtypes so the summaries work on them too
+    sessions.append(pd.DataFrame({column: pd.Series(dtype=object) for column in columns}).assign(
+        enter=pd.Series(dtype="datetime64[ns]"), exit=pd.Series(dtype="datetime64[ns]"),
+        dwell=pd.Series(dtype="timedelta64[ns]")))
+    unmatched_exits.append(pd.DataFrame({column: pd.Series(dtype=object) for column in columns}).assign(
+        time=pd.Series(dtype="datetime64[ns]")))
+    sessions = pd.concat(sessions, ignore_index=True)
+    unmatched_exits = pd.concat(unmatched_exits, ignore_index=True)
+    for df in (sessions, unmatched_exits):
+        for column in columns:
+            df[column] = df[column].astype(str).astype("category")
+    return sessions, unmatched_exits
+
+# Function to return when each session ended. A session without an exit counts until the end
+# of its day (or until now for today).
+def session_ends(sessions):
+    day_end = pd.to_datetime(sessions["day"].astype(str)) + pd.Timedelta(days=1)
+    return sessions["exit"].fillna(day_end.clip(upper=pd.Timestamp.now()))
+
+# Function to aggregate sessions into per-person daily rows (first in, last out, time on campus)
+# and a per-person summary over the whole period. Times on campus are in hours; open sessions
+# count until the end of their day, as in headcount_over_time.
+def summarize_attendance(sessions):
+    sessions = sessions.assign(hours=(session_ends(sessions) - sessions["enter"]).dt.total_seconds() / 3600)
+    daily = sessions.groupby(["day", "name", "designation"], observed=True).agg(
+        first_in=("enter", "min"), last_out=("exit", "max"), sessions=("enter", "size"),
+        hours=("hours", "sum"))
+    daily = daily.reset_index()
+    first_in = daily["first_in"] - daily["first_in"].dt.normalize()
+    last_out = daily["last_out"] - daily["last_out"].dt.normalize()
+    summary = daily.assign(first_in=first_in, last_out=last_out).groupby(["name", "designation"], observed=True).agg(
+        days=("day", "size"), hours=("hours", "sum"), mean_hours=("hours", "mean"),
+        mean_first_in=("first_in", "mean"), mean_last_out=("last_out", "mean"))
+    for column in ("mean_first_in", "mean_last_out"):
+        summary[column] = (pd.Timestamp(0) + summary[column]).dt.strftime("%H:%M")
+    return daily, summary.reset_index().round(2)
+
+# Function to compute the peak number of people on campus per interval. A session without an
+# exit counts until the end of its day (or until now for today).
+def headcount_over_time(sessions, interval=None):
+    interval = HEADCOUNT_INTERVAL if interval is None else interval
+    if sessions.empty:
+        return pd.Series(dtype=int, name="headcount")
+    ends = session_ends(sessions)
+    changes = pd.concat([pd.Series(1, index=sessions["enter"].to_numpy()),
+                         pd.Series(-1, index=ends.to_numpy())]).sort_index(kind="stable")
+    level = changes.cumsum().groupby(level=0).last()
+    carried = level.resample(interval).last().ffill().shift(1).fillna(0)
+    peak = level.resample(interval).max()
+    return pd.concat([peak, carried], axis=1).max(axis=1).astype(int).rename("headcount")
+
+# Function to print and optionally write the attendance report for a date range
+def attendance_report(start, end, output=None, interval=None):
+    interval = HEADCOUNT_INTERVAL if interval is None else interval
+    started = time.perf_counter()
+    sessions, unmatched_exits = load_attendance(start, end)
+    daily, summary = summarize_attendance(sessions)
+    headcount = headcount_over_time(sessions, interval)
+    today = datetime.now().strftime("%Y-%m-%d")
+    unmatched_entries = sessions[sessions["exit"].isnull() & (sessions["day"].astype(str) < today)]
+
+    print(f"Attendance {start:%d-%m-%Y} to {end:%d-%m-%Y}: {len(sessions)} sessions, {len(summary)} people "
+          f"({time.perf_counter() - started:.2f}s)")
+    if not summary.empty:
+        print(summary.to_string(index=False))
+    if not headcount.empty:
+        print(f"Peak headcount {headcount.max()} at {headcount.idxmax():%d-%m-%Y %H:%M}")
+    print(f"Unmatched entries: {len(unmatched_entries)}, unmatched exits: {len(unmatched_exits)}")
+
+    if output:
+        with pd.ExcelWriter(output) as writer:
+            summary.to_excel(writer, sheet_name="Summary", index=False)
+            daily.round({"hours": 2}).to_excel(writer, sheet_name="Daily", index=False)
+            sessions.drop(columns="dwell").to_excel(writer, sheet_name="Sessions", index=False)
+            headcount.to_frame().to_excel(writer, sheet_name="Headcount", index_label="time")
+            unmatched_entries.drop(columns=["exit", "dwell"]).to_excel(writer, sheet_name="Unmatched entries", index=False)
+            unmatched_exits.to_excel(writer, sheet_name="Unmatched exits", index=False)
+        print(f"Attendance report written to {output}")
+    return summary
+
+# Class to debounce sightings on one camera into presence transitions. An identity has to
+# be seen in PRESENCE_ENTER_FRAMES frames before it counts as present, and it has to be
+# absent for PRESENCE_LEAVE_SECONDS before it can produce another event. Unknown faces are
+# told apart by comparing them with the unknown faces currently present on this camera.
+class PresenceTracker:
+    def __init__(self, enter_frames=None, leave_seconds=None):
+        enter_frames = PRESENCE_ENTER_FRAMES if enter_frames is None else enter_frames
+        leave_seconds = PRESENCE_LEAVE_SECONDS if leave_seconds is None else leave_seconds
+        self.enter_frames = enter_frames
+        self.leave_seconds = leave_seconds
+        self.tracks = {}
+        self.unknown_count = 0
+
+    # Function to return the track key of a sighting
+    def identify(self, name, designation, face_encoding):
+        if name != "Unknown":
+            return (name, designation)
+        unknown_keys = [key for key in self.tracks if key[0] == "Unknown"]
+        if unknown_keys:
+            distances = face_recognition.face_distance([self.tracks[key]["encoding"] for key in unknown_keys], face_encoding)
+            nearest = int(np.argmin(distances))
+            if distances[nearest] <= MATCH_TOLERANCE:
+                return unknown_keys[nearest]
+        self.unknown_count += 1
+        return ("Unknown", self.unknown_count)
+
+    # Function to register the sightings of one frame, returns the keys that became present
+    def update(self, sightings, seen_at):
+        arrivals = []
+        for key, face_encoding in sightings:
+            track = self.tracks.setdefault(key, {"seen": 0, "present": False})
+            track["seen"] += 1
+            track["last_seen"] = seen_at
+            track["encoding"] = face_encoding
+            if not track["present"] and track["seen"] >= self.enter_frames:
+                track["present"] = True
+                arrivals.append(key)
+
+        for key in [key for key, track in self.tracks.items() if seen_at - track["last_seen"] > self.leave_seconds]:
+            del self.tracks[key]
+        return arrivals
+
+# Function to feed the faces of one frame to a presence tracker, returns the indices of the
+# faces whose identity just became present
+def presence_arrivals(presence, captured_at, face_encodings, matches):
+    sightings = []
+    faces = {}
+    for i, (face_encoding, (name, designation, _)) in enumerate(zip(face_encodings, matches)):
+        key = presence.identify(name, designation, face_encoding)
+        sightings.append((key, face_encoding))
+        faces[key] = i
+    return [faces[key] for key in presence.update(sightings, captured_at.timestamp())]
+
+# Function to write records, save intruder snapshots and raise warnings for an identity that
+# became present on a camera
+def handle_presence_event(frame, camera, role, captured_at, name, designation, box, face_encoding, distance=None,
+                          replayed=False):
+    top, right, bottom, left = box
+    now = captured_at.strftime("%Y-%m-%d %H:%M:%S")
+
+    if role == "entry gate" and name != "Unknown":
+        update_entry_exit_records(name, designation, now, replayed=replayed)
+    elif role == "exit gate" and name != "Unknown":
+        update_entry_exit_records(name, designation, None, now, replayed=replayed)
+    elif role == "restricted area":
+        if name == "Unknown" or not restricted_area_access.get(designation.lower(), False):
+            print(f"Warning: Unauthorized access attempt by {name} ({designation})")
+            play_warning(f"You are unauthorized to enter this section, {name}", camera, ALERT_PRIORITY_HIGH)
+    if name == "Unknown":
+        registry = get_intruder_registry()
+        entry, is_new = registry.sight(face_encoding, captured_at.timestamp())
+        # Boxes can reach past the frame edge; a face with nothing left inside gets no snapshot
+        if frame is not None:
+            height, width = frame.shape[:2]
+            top, right, bottom, left = max(top, 0), min(right, width), min(bottom, height), max(left, 0)
+        if frame is None or bottom <= top or right <= left:
+            crop_score = None
+        else:
+            crop_score, _ = face_quality(cv2.cvtColor(frame[top:bottom, left:right], cv2.COLOR_BGR2GRAY),
+                                         settings=dict(DEFAULT_QUALITY_SETTINGS, min_size=1, min_sharpness=0, brightness=(0, 255)))
+            # Larger crops win between crops of equal quality
+            crop_score += min(bottom - top, right - left) * 1e-6
+        if crop_score is not None and registry.offer_crop(entry, crop_score):
+            filename = save_intruder_face(frame, top, right, bottom, left, face_encoding, camera, role,
+                                          distance, captured_at, entry["id"])
+            if filename:
+                registry.set_crop(entry, filename, crop_score)
+        if is_new:
+            pipeline_metrics.count_intruder()
+            play_warning("Intruder Detected", camera, ALERT_PRIORITY_HIGH)
+
+# Function to act on the faces recognized in one frame and annotate the frame. Records,
+# intruder snapshots and warnings only fire when an identity becomes present on the camera.
+def handle_recognized_faces(frame, camera, role, captured_at, face_locations, face_encodings, matcher, presence, matches=None,
+                            annotate=True):
+    if matches is None:
+        matches = matcher.match(face_encodings)
+    pipeline_metrics.count_faces(camera, matches)
+
+    # Events run before annotation so intruder snapshots are taken from the clean frame
+    for i in presence_arrivals(presence, captured_at, face_encodings, matches):
+        name, designation, distance = matches[i]
+        handle_presence_event(frame, camera, role, captured_at, name, designation, face_locations[i], face_encodings[i], distance)
+
+    if not annotate:
+        return matches
+    with stage_timer.measure("annotate"):
+        for (top, right, bottom, left), (name, designation, _) in zip(face_locations, matches):
+            cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
+            cv2.putText(frame, f"{name} ({designation})", (left + 6, bottom - 6), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+    return matches
 
 # Function to process frames and perform face recognition
-def process_frames(cap, role, known_face_encodings, known_face_names, known_face_designations):
+def process_frames(cap, role, matcher):
+    presence = PresenceTracker()
     while True:
         ret, frame = cap.read()
+        captured_at = datetime.now()
         if not ret:
             print(f"Error: Failed to capture frame from {role}. VideoCapture status:", cap.isOpened())
             break
 
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        face_locations = face_recognition.face_locations(rgb_frame)
-        face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
-
-        for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
-            name, designation = recognize_face(face_encoding, known_face_encodings, known_face_names, known_face_designations)
-            cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
-            cv2.putText(frame, f"{name} ({designation})", (left + 6, bottom - 6), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
-
-            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-            if role == "entry gate" and name != "Unknown":
-                update_entry_exit_records(name, designation, now)
-            elif role == "exit gate" and name != "Unknown":
-                update_entry_exit_records(name, designation, None, now)
-            elif role == "restricted area":
-                if name == "Unknown" or not restricted_area_access.get(designation.lower(), False):
-                    play_warning(f"You are unauthorized to enter this section, {name}")
-                    save_intruder_face(frame, top, right, bottom, left, face_encoding)
-            if name == "Unknown" and not any(face_recognition.compare_faces([data[0] for data in intruder_data], face_encoding)):
-                save_intruder_face(frame, top, right, bottom, left, face_encoding)
-                play_warning("Intruder Detected")
+        face_locations, face_encodings, _, _ = detect_and_encode(frame, None, get_detection_settings(role))
+        handle_recognized_faces(frame, role, role, captured_at, face_locations, face_encodings, matcher, presence)
         window_name = f'Face Recognition - {role}'
         cv2.imshow(window_name, frame)
 
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break
 
+# Function to compute the intersection over union of two (top, right, bottom, left) boxes
+def box_iou(a, b):
+    top, right, bottom, left = max(a[0], b[0]), min(a[1], b[1]), min(a[2], b[2]), max(a[3], b[3])
+    intersection = max(0, right - left) * max(0, bottom - top)
+    union = (a[1] - a[3]) * (a[2] - a[0]) + (b[1] - b[3]) * (b[2] - b[0]) - intersection
+    return intersection / union if union > 0 else 0.0
+
+# Function to pair detected boxes with tracked boxes greedily by IoU, returns the tracked
+# index for every detection (None for new faces)
+def associate_boxes(face_locations, tracked_boxes, threshold=None):
+    threshold = TRACKING_IOU_THRESHOLD if threshold is None else threshold
+    pairs = sorted(
+        ((box_iou(location, box), i, j)
+         for i, location in enumerate(face_locations)
+         for j, box in enumerate(tracked_boxes) if box is not None),
+        reverse=True)
+    assignments = [None] * len(face_locations)
+    used = set()
+    for iou, i, j in pairs:
+        if iou < threshold:
+            break
+        if assignments[i] is None and j not in used:
+            assignments[i] = j
+            used.add(j)
+    return assignments
+
+# Function to return the detection settings of a camera role
+def get_detection_settings(role):
+    settings = dict(DEFAULT_DETECTION_SETTINGS)
+    settings.update(DETECTION_SETTINGS.get(role, {}))
+    if FACE_QUALITY_GATE:
+        settings["quality"] = dict(DEFAULT_QUALITY_SETTINGS, **QUALITY_SETTINGS.get(role, {}))
+    return settings
+
+# Function to score a face crop (grayscale) from 0 to 1 on size, sharpness, brightness and, when
+# landmarks are given, pose. Returns (score, reason) where reason says why the face is dropped.
+def face_quality(gray_crop, landmarks=None, settings=None):
+    settings = DEFAULT_QUALITY_SETTINGS if settings is None else settings
+    size = min(gray_crop.shape[:2])
+    if size < settings["min_size"]:
+        return 0.0, "too small"
+    brightness = float(gray_crop.mean())
+    low, high = settings["brightness"]
+    if not low <= brightness <= high:
+        return 0.0, "too dark" if brightness < low else "too bright"
+    sharpness = cv2.Laplacian(cv2.resize(gray_crop, (96, 96), interpolation=cv2.INTER_AREA), cv2.CV_64F).var()
+    if sharpness < settings["min_sharpness"]:
+        return 0.0, "blurred"
+
+    scores = [
+        (size - settings["min_size"]) / max(settings["good_size"] - settings["min_size"], 1),
+        (sharpness - settings["min_sharpness"]) / max(settings["good_sharpness"] - settings["min_sharpness"], 1),
+        1 - abs(brightness - (low + high) / 2) / ((high - low) / 2)
+    ]
+    if landmarks and landmarks.get("nose_tip") and landmarks.get("left_eye") and landmarks.get("right_eye"):
+        left_eye = np.mean([x for x, _ in landmarks["left_eye"]])
+        right_eye = np.mean([x for x, _ in landmarks["right_eye"]])
+        nose = np.mean([x for x, _ in landmarks["nose_tip"]])
+        span = abs(right_eye - left_eye)
+        yaw = min(1.0, abs((nose - min(left_eye, right_eye)) / span - 0.5) * 2) if span > 0 else 1.0
+        if yaw > settings["max_yaw"]:
+            return 0.0, "turned away"
+        scores.append(1 - yaw / settings["max_yaw"])
+    return float(np.mean(np.clip(scores, 0, 1))), None
+
+# Class to remember the faces that wait for a better frame on one camera, so a face that never
+# gets good enough is encoded anyway once it has waited for max_wait seconds
+class DeferredFaces:
+    def __init__(self):
+        self.waiting = []
+
+    # Function to replace the waiting faces with those of the latest detection
+    def update(self, boxes, now):
+        waiting = []
+        for box in boxes:
+            since = now
+            for previous, previous_since in self.waiting:
+                if box_iou(box, previous) >= TRACKING_IOU_THRESHOLD:
+                    since = min(since, previous_since)
+            waiting.append((box, since))
+        self.waiting = waiting
+
+    # Function to return the boxes of faces that have waited long enough
+    def due(self, now, max_wait):
+        return [box for box, since in self.waiting if now - since >= max_wait]
+
+# Function to return the motion gating settings of a camera role
+def get_motion_settings(role):
+    settings = dict(DEFAULT_MOTION_SETTINGS)
+    settings.update(MOTION_SETTINGS.get(role, {}))
+    return settings
+
+# Function to intersect two (left, top, right, bottom) regions given as fractions of the frame
+def intersect_roi(a, b):
+    if a is None or b is None:
+        return a or b
+    roi = (max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3]))
+    return roi if roi[0] < roi[2] and roi[1] < roi[3] else None
+
+# Class to decide per frame whether face detection has to run, by differencing a downscaled
+# grayscale copy against a running-average background. Runs on the main thread, so it has to
+# stay far cheaper than detection.
+class MotionGate:
+    def __init__(self, settings=None):
+        settings = DEFAULT_MOTION_SETTINGS if settings is None else settings
+        self.settings = settings
+        self.background = None
+        self.last_detection = 0
+
+    # Function to return (run detection, region of interest or None for the whole frame). The
+    # region always covers `boxes`, the faces currently known on this camera, so a person
+    # standing still is not lost while someone else moves.
+    def check(self, frame, now, boxes=()):
+        settings = self.settings
+        height, width = frame.shape[:2]
+        small_width = min(width, settings["width"])
+        small = cv2.resize(frame, (small_width, max(1, height * small_width // width)), interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        if self.background is None:
+            self.background = gray.astype(np.float32)
+            self.last_detection = now
+            return True, None
+
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self.background))
+        cv2.accumulateWeighted(gray, self.background, settings["learning_rate"])
+        changed = diff > settings["threshold"]
+        if np.count_nonzero(changed) < settings["min_changed"] * changed.size:
+            if now - self.last_detection < settings["keyframe_seconds"]:
+                return False, None
+            self.last_detection = now
+            return True, None
+
+        self.last_detection = now
+        rows = np.flatnonzero(changed.any(axis=1))
+        columns = np.flatnonzero(changed.any(axis=0))
+        small_height, small_width = changed.shape
+        margin = settings["margin"]
+        left, top = columns[0] / small_width, rows[0] / small_height
+        right, bottom = (columns[-1] + 1) / small_width, (rows[-1] + 1) / small_height
+        for box_top, box_right, box_bottom, box_left in boxes:
+            left, top = min(left, box_left / width), min(top, box_top / height)
+            right, bottom = max(right, box_right / width), max(bottom, box_bottom / height)
+        roi = (max(0.0, left - margin), max(0.0, top - margin), min(1.0, right + margin), min(1.0, bottom + margin))
+        # Detection on most of the frame is not worth cropping for
+        if (roi[2] - roi[0]) * (roi[3] - roi[1]) > 0.6:
+            return True, None
+        return True, roi
+
+# Function to detect faces on a reduced copy of the frame, boxes are returned in full-resolution
+# (top, right, bottom, left) coordinates
+def detect_faces(rgb_frame, settings=None):
+    settings = DEFAULT_DETECTION_SETTINGS if settings is None else settings
+    height, width = rgb_frame.shape[:2]
+    image = rgb_frame
+    offset_x, offset_y = 0, 0
+    if settings.get("roi"):
+        left, top, right, bottom = settings["roi"]
+        offset_x, offset_y = int(left * width), int(top * height)
+        image = image[offset_y:int(bottom * height), offset_x:int(right * width)]
+
+    scale = settings.get("scale", 1.0)
+    if scale != 1.0:
+        image = cv2.resize(image, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    if settings.get("grayscale"):
+        image = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+
+    with stage_timer.measure("detect"):
+        face_locations = face_recognition.face_locations(
+            image, number_of_times_to_upsample=settings.get("upsample", 1), model=settings.get("model", "hog"))
+
+    return [
+        (max(0, int(top / scale) + offset_y), min(width, int(right / scale) + offset_x),
+         min(height, int(bottom / scale) + offset_y), max(0, int(left / scale) + offset_x))
+        for top, right, bottom, left in face_locations
+    ]
+
+# Function to run the 5-point landmark predictor once for the given faces. The raw shapes serve
+# both the pose check and the encoder, which would otherwise run the predictor again. None if
+# this face_recognition does not expose them.
+def raw_face_landmarks(rgb_frame, face_locations):
+    api = getattr(face_recognition, "api", None)
+    if api is None or not hasattr(api, "_raw_face_landmarks"):
+        return None
+    return list(api._raw_face_landmarks(rgb_frame, face_locations, model="small"))
+
+# Function to convert a raw 5-point shape to the dict face_landmarks(model="small") returns
+def small_face_landmarks(shape):
+    points = [(point.x, point.y) for point in shape.parts()]
+    return {"nose_tip": [points[4]], "left_eye": points[2:4], "right_eye": points[0:2]}
+
+# Function to encode faces from their raw landmark shapes, as face_encodings does
+def encode_face_shapes(rgb_frame, shapes):
+    encoder = face_recognition.api.face_encoder
+    return [np.array(encoder.compute_face_descriptor(rgb_frame, shape, 1)) for shape in shapes]
+
+# Function to decide for every new face whether to encode it now, let it wait for a better
+# frame or drop it. Faces overlapping one of settings["force"] have waited long enough.
+# `shapes` are the raw landmarks of the faces if they were already computed.
+def gate_face_quality(rgb_frame, face_locations, settings, shapes=None):
+    with stage_timer.measure("quality"):
+        gray = cv2.cvtColor(rgb_frame, cv2.COLOR_RGB2GRAY)
+        if shapes is None:
+            landmarks = face_recognition.face_landmarks(rgb_frame, face_locations, model="small")
+        else:
+            landmarks = [small_face_landmarks(shape) for shape in shapes]
+        decisions = []
+        for location, face_landmarks in zip(face_locations, landmarks):
+            top, right, bottom, left = location
+            score, reason = face_quality(gray[top:bottom, left:right], face_landmarks, settings["quality"])
+            if reason is not None:
+                decisions.append("drop")
+            elif score >= settings["quality"]["encode_score"] or any(
+                    box_iou(location, box) >= TRACKING_IOU_THRESHOLD for box in settings.get("force", [])):
+                decisions.append("encode")
+            else:
+                decisions.append("wait")
+    return decisions
+
+# Function to detect and encode the faces in a BGR frame, runs inside the recognition workers.
+# Faces that overlap one of tracked_boxes keep their track and are not encoded again. New faces
+# that fail the quality gate are left out; the boxes of those that wait for a better frame
+# are returned as the fourth item. With the quality gate on, the landmarks of a new face are
+# computed once and used for both the gate and the encoding.
+def detect_and_encode(frame, tracked_boxes=None, settings=None):
+    settings = DEFAULT_DETECTION_SETTINGS if settings is None else settings
+    with stage_timer.measure("convert"):
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    face_locations = detect_faces(rgb_frame, settings)
+    assignments = associate_boxes(face_locations, tracked_boxes or [])
+    waiting = []
+    new_faces = [location for location, assigned in zip(face_locations, assignments) if assigned is None]
+    shapes = None
+    if new_faces and settings.get("quality"):
+        with stage_timer.measure("landmarks"):
+            shapes = raw_face_landmarks(rgb_frame, new_faces)
+        decisions = iter(gate_face_quality(rgb_frame, new_faces, settings, shapes))
+        new_shapes = iter(shapes if shapes is not None else [None] * len(new_faces))
+        kept = []
+        for location, assigned in zip(face_locations, assignments):
+            decision, shape = (next(decisions), next(new_shapes)) if assigned is None else ("encode", None)
+            if decision == "wait":
+                waiting.append(location)
+            if decision == "encode":
+                kept.append((location, assigned, shape))
+        face_locations = [location for location, _, _ in kept]
+        assignments = [assigned for _, assigned, _ in kept]
+        new_faces = [location for location, assigned, _ in kept if assigned is None]
+        if shapes is not None:
+            shapes = [shape for _, assigned, shape in kept if assigned is None]
+    with stage_timer.measure("encode"):
+        if not new_faces:
+            new_encodings = iter([])
+        elif shapes is not None:
+            new_encodings = iter(encode_face_shapes(rgb_frame, shapes))
+        else:
+            new_encodings = iter(face_recognition.face_encodings(rgb_frame, new_faces))
+    face_encodings = [next(new_encodings) if assigned is None else None for assigned in assignments]
+    return face_locations, face_encodings, assignments, waiting
+
+# Function to start a recognition worker with empty stage timings (forked workers inherit them)
+def init_recognition_worker():
+    stage_timer.drain()
+
+worker_buses = {}
+
+# Function to run detect_and_encode in a recognition worker, the worker's stage timings are
+# returned along with the result. The frame is either an array or a (bus info, sequence)
+# reference into the camera's frame bus. The slot is copied once at the start (still without
+# pickling the frame through the pipe), so slow jobs are not lost when the ring wraps; the
+# result is None only if the frame was overwritten before it could be copied.
+def recognition_job(frame, tracked_boxes, settings):
+    if isinstance(frame, tuple):
+        info, seq = frame
+        bus = worker_buses.get(info[0])
+        if bus is None:
+            bus = worker_buses[info[0]] = FrameBus(info[1], info[2], name=info[0])
+        frame = bus.view(seq)
+        if frame is None:
+            return None, stage_timer.drain()
+        frame = frame.copy()
+        if not bus.valid(seq):
+            return None, stage_timer.drain()
+        return detect_and_encode(frame, tracked_boxes, settings), stage_timer.drain()
+    return detect_and_encode(frame, tracked_boxes, settings), stage_timer.drain()
+
+# Function to create the OpenCV tracker used between detections, None if unavailable
+def create_box_tracker():
+    for name in TRACKER_TYPES:
+        for module in (cv2, getattr(cv2, "legacy", None)):
+            factory = getattr(module, f"Tracker{name}_create", None)
+            if factory is not None:
+                return factory()
+    return None
+
+# Class to keep the faces of one camera between full detections. Detection and encoding run
+# every TRACKING_DETECT_INTERVAL frames or when a track is lost; in between, boxes are
+# propagated with an OpenCV tracker (or held) and each track keeps the identity it was given.
+class FaceTracks:
+    def __init__(self, detect_interval=None):
+        detect_interval = TRACKING_DETECT_INTERVAL if detect_interval is None else detect_interval
+        self.detect_interval = detect_interval
+        self.tracks = []
+        self.frames_since_detection = 0
+        self.lost = True
+
+    def needs_detection(self):
+        return self.lost or self.frames_since_detection >= self.detect_interval
+
+    # Function to return the boxes worth keeping; unknown faces are encoded again on every detection
+    def tracked_boxes(self):
+        return [track["box"] if track["match"][0] != "Unknown" else None for track in self.tracks]
+
+    # Function to replace the tracks with those of a detection. `assignments` index into the
+    # tracks the detection was submitted with, which are passed as `previous` when other
+    # detections have been applied since.
+    def apply_detections(self, frame, face_locations, face_encodings, assignments, matcher, previous=None):
+        previous = self.tracks if previous is None else previous
+        tracks = []
+        for location, face_encoding, assigned in zip(face_locations, face_encodings, assignments):
+            track = previous[assigned] if assigned is not None else {"match": None}
+            track["box"] = location
+            if face_encoding is not None:
+                track["encoding"] = face_encoding
+                track["match"] = None
+            tracks.append(track)
+
+        unmatched = [track for track in tracks if track["match"] is None]
+        for track, match in zip(unmatched, matcher.match([track["encoding"] for track in unmatched])):
+            track["match"] = match
+
+        for track in tracks:
+            track["tracker"] = create_box_tracker()
+            if track["tracker"] is not None:
+                top, right, bottom, left = track["box"]
+                track["tracker"].init(frame, (left, top, right - left, bottom - top))
+
+        self.tracks = tracks
+        self.frames_since_detection = 0
+        self.lost = False
+
+    # Function to move the tracks to the new frame; boxes are clipped to the frame and a box
+    # that moved out of it counts as a lost track
+    def propagate(self, frame):
+        self.frames_since_detection += 1
+        height, width = frame.shape[:2]
+        for track in self.tracks:
+            if track["tracker"] is None:
+                continue
+            ok, (x, y, w, h) = track["tracker"].update(frame)
+            top, right, bottom, left = max(int(y), 0), min(int(x + w), width), min(int(y + h), height), max(int(x), 0)
+            if ok and bottom > top and right > left:
+                track["box"] = (top, right, bottom, left)
+            else:
+                self.lost = True
+
+    # Function to return the locations, encodings and matches of the current tracks
+    def faces(self):
+        return ([track["box"] for track in self.tracks],
+                [track["encoding"] for track in self.tracks],
+                [track["match"] for track in self.tracks])
+
+# Function to compare CPU per frame and identities of full per-frame recognition against
+# tracking mode on a recorded video
+def benchmark_tracking(video_path, role="entry gate", known_faces_dir='known_faces', detect_interval=None):
+    detect_interval = TRACKING_DETECT_INTERVAL if detect_interval is None else detect_interval
+    matcher = FaceMatcher(*load_known_faces(known_faces_dir))
+    settings = get_detection_settings(role)
+    results = {}
+    for mode in ("every frame", "tracking"):
+        cap = cv2.VideoCapture(video_path)
+        tracks = FaceTracks(detect_interval) if mode == "tracking" else None
+        cpu_times = []
+        identities = []
+        encoded = 0
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            start = time.process_time()
+            if tracks is not None and not tracks.needs_detection():
+                tracks.propagate(frame)
+                _, _, matches = tracks.faces()
+            else:
+                face_locations, face_encodings, assignments, _ = detect_and_encode(frame, tracks.tracked_boxes() if tracks else None, settings)
+                encoded += sum(face_encoding is not None for face_encoding in face_encodings)
+                if tracks is not None:
+                    tracks.apply_detections(frame, face_locations, face_encodings, assignments, matcher)
+                    _, _, matches = tracks.faces()
+                else:
+                    matches = matcher.match(face_encodings)
+            cpu_times.append(time.process_time() - start)
+            identities.append(sorted(name for name, _, _ in matches))
+        cap.release()
+        results[mode] = (cpu_times, identities, encoded)
+
+    baseline = results["every frame"][1]
+    print(f"{'mode':>12} {'frames':>7} {'cpu ms/frame':>13} {'p95 ms':>8} {'encodings':>10} {'identity agree':>15}")
+    for mode, (cpu_times, identities, encoded) in results.items():
+        if not cpu_times:
+            print(f"Error: No frames could be read from {video_path}")
+            return
+        agree = np.mean([a == b for a, b in zip(identities, baseline)]) * 100
+        cpu_ms = np.array(cpu_times) * 1000
+        print(f"{mode:>12} {len(cpu_ms):>7} {cpu_ms.mean():>13.2f} {np.percentile(cpu_ms, 95):>8.2f} {encoded:>10} {agree:>14.1f}%")
+
+# Class to keep the frame counters of a camera feed
+class CameraCounters:
+    def init_counters(self):
+        self.captured = 0
+        self.processed = 0
+        self.dropped = 0
+        self.skipped = 0
+        self.shed = 0
+        self.last_counts = (time.monotonic(), 0, 0)
+
+    # Function to return (capture fps, processed fps) since the previous call
+    def rates(self):
+        now = time.monotonic()
+        then, captured, processed = self.last_counts
+        self.last_counts = (now, self.captured, self.processed)
+        elapsed = max(now - then, 1e-6)
+        return (self.captured - captured) / elapsed, (self.processed - processed) / elapsed
+
+# Class to read one camera on its own thread into a bounded queue. When the queue is full
+# the oldest frame is dropped, so a slow consumer always gets recent frames.
+class CameraReader(threading.Thread, CameraCounters):
+    def __init__(self, source, role, queue_size=None):
+        queue_size = CAPTURE_QUEUE_SIZE if queue_size is None else queue_size
+        super().__init__(daemon=True)
+        self.source = source
+        self.role = role
+        self.name = f"{role} #{source}"
+        self.cap = source if hasattr(source, "read") else cv2.VideoCapture(source)
+        self.frames = deque(maxlen=queue_size)
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.init_counters()
+
+    def run(self):
+        failed = False
+        while not self.stopped.is_set():
+            # Waiting for the next frame is not part of the read stage, only decoding it is
+            ret, frame = self.cap.grab(), None
+            if ret:
+                with stage_timer.measure("read"):
+                    ret, frame = self.cap.retrieve()
+            captured_at = datetime.now()
+            if not ret:
+                if not failed:
+                    print(f"Error: Failed to capture frame from {self.name}. VideoCapture status:", self.cap.isOpened())
+                failed = True
+                if not self.cap.isOpened():
+                    break
+                time.sleep(0.1)
+                continue
+            failed = False
+            with self.lock:
+                if len(self.frames) == self.frames.maxlen:
+                    self.dropped += 1
+                self.frames.append((frame, captured_at))
+                self.captured += 1
+
+    # Function to take the oldest queued frame as (frame, capture time, None), returns None
+    # when the queue is empty
+    def get(self):
+        with self.lock:
+            if self.frames:
+                frame, captured_at = self.frames.popleft()
+                return frame, captured_at, None
+        return None
+
+    def depth(self):
+        return len(self.frames)
+
+    def capacity(self):
+        return self.frames.maxlen
+
+    def stop(self):
+        self.stopped.set()
+        if self.is_alive():
+            self.join(timeout=2)
+        self.cap.release()
+
+# Function to attach to an existing shared memory block without letting this process's
+# resource tracker unlink it on exit
+def attach_shared_memory(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return shm
+
+# Class to hold a ring of frames of one camera in shared memory. The camera service process
+# is the only writer; readers in any process map the slots as NumPy arrays, copy the frame
+# they need out of its slot and check the slot sequence number to detect a frame that was
+# overwritten while it was copied. Only the (bus info, sequence) reference crosses the pipe.
+class FrameBus:
+    def __init__(self, shape, slots=None, name=None, create=False):
+        slots = FRAME_BUS_SLOTS if slots is None else slots
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.owner = create
+        frame_size = int(np.prod(self.shape))
+        header_size = (8 * (1 + 2 * slots) + 63) // 64 * 64
+        if create:
+            self.shm = shared_memory.SharedMemory(create=True, size=header_size + frame_size * slots)
+        else:
+            self.shm = attach_shared_memory(name)
+        buffer = self.shm.buf
+        self.latest = np.ndarray((1,), dtype=np.int64, buffer=buffer, offset=0)
+        self.slot_seq = np.ndarray((slots,), dtype=np.int64, buffer=buffer, offset=8)
+        self.slot_time = np.ndarray((slots,), dtype=np.float64, buffer=buffer, offset=8 + 8 * slots)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=buffer, offset=header_size)
+        if create:
+            self.latest[0] = 0
+            self.slot_seq[:] = -1
+
+    def info(self):
+        return self.shm.name, self.shape, self.slots
+
+    def publish(self, frame, captured_at):
+        seq = int(self.latest[0]) + 1
+        slot = seq % self.slots
+        self.slot_seq[slot] = -1
+        self.frames[slot] = frame
+        self.slot_time[slot] = captured_at
+        self.slot_seq[slot] = seq
+        self.latest[0] = seq
+
+    def latest_seq(self):
+        return int(self.latest[0])
+
+    def valid(self, seq):
+        return int(self.slot_seq[seq % self.slots]) == seq
+
+    # Function to return the slot of a frame, None if it has been overwritten. The slot is
+    # reused when the ring wraps, so callers copy it and check valid(seq) afterwards
+    def view(self, seq):
+        if not self.valid(seq):
+            return None
+        return self.frames[seq % self.slots]
+
+    def capture_time(self, seq):
+        return datetime.fromtimestamp(float(self.slot_time[seq % self.slots]))
+
+    # Function to copy the newest frame, returns (seq, frame) or None if nothing was published
+    def read_latest(self):
+        for _ in range(3):
+            seq = self.latest_seq()
+            if seq == 0:
+                return None
+            frame = self.view(seq)
+            if frame is not None:
+                frame = frame.copy()
+                if self.valid(seq):
+                    return seq, frame
+        return None
+
+    def close(self):
+        self.latest = self.slot_seq = self.slot_time = self.frames = None
+        try:
+            self.shm.close()
+            if self.owner:
+                self.shm.unlink()
+        except (BufferError, FileNotFoundError):
+            pass
+
+# Function to run a camera service process: it owns the device and publishes every frame
+def camera_service_main(source, slots, connection, stop_event):
+    cap = cv2.VideoCapture(source)
+    ret, frame = cap.read() if cap.isOpened() else (False, None)
+    if not ret:
+        connection.send(None)
+        cap.release()
+        return
+    bus = FrameBus(frame.shape, slots, create=True)
+    connection.send(bus.info())
+    try:
+        bus.publish(frame, time.time())
+        while not stop_event.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                if not cap.isOpened():
+                    break
+                time.sleep(0.1)
+                continue
+            if frame.shape != bus.shape:
+                frame = cv2.resize(frame, (bus.shape[1], bus.shape[0]))
+            bus.publish(frame, time.time())
+    finally:
+        cap.release()
+        bus.close()
+
+camera_services = {}
+
+# Function to start a camera service for every source that does not have one yet, returns
+# the bus information of each source that could be opened
+def start_camera_services(sources):
+    for source in sources:
+        service = camera_services.get(source)
+        if service is not None and service[0].is_alive():
+            continue
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        stop_event = multiprocessing.Event()
+        process = multiprocessing.Process(target=camera_service_main, args=(source, FRAME_BUS_SLOTS, sender, stop_event),
+                                          daemon=True, name=f"camera {source}")
+        process.start()
+        info = receiver.recv() if receiver.poll(CAMERA_SERVICE_TIMEOUT) else None
+        if info is None:
+            print(f"Error: Camera {source} could not be opened.")
+            stop_event.set()
+            process.join(timeout=2)
+            continue
+        camera_services[source] = (process, stop_event, info)
+    return {source: camera_services[source][2] for source in sources if source in camera_services}
+
+# Function to stop all camera services and release their devices
+def stop_camera_services():
+    for process, stop_event, _ in camera_services.values():
+        stop_event.set()
+    for process, _, _ in camera_services.values():
+        process.join(timeout=2)
+        if process.is_alive():
+            process.terminate()
+    camera_services.clear()
+
+# Class to read a camera through its frame bus with the same interface as CameraReader. Frames
+# skipped because the consumer was slower than the camera count as dropped.
+class BusReader(CameraCounters):
+    def __init__(self, source, role, info):
+        name, shape, slots = info
+        self.source = source
+        self.role = role
+        self.name = f"{role} #{source}"
+        self.bus = FrameBus(shape, slots, name=name)
+        self.last_seq = self.bus.latest_seq()
+        self.init_counters()
+
+    # Function to take the newest unseen frame as (frame copy, capture time, frame reference),
+    # the reference lets recognition workers read the frame straight from shared memory
+    def get(self):
+        item = self.bus.read_latest()
+        if item is None or item[0] <= self.last_seq:
+            return None
+        seq, frame = item
+        self.captured += seq - self.last_seq
+        self.dropped += seq - self.last_seq - 1
+        self.last_seq = seq
+        return frame, self.bus.capture_time(seq), (self.bus.info(), seq)
+
+    def depth(self):
+        return min(self.bus.latest_seq() - self.last_seq, self.bus.slots)
+
+    def capacity(self):
+        return self.bus.slots
+
+    def stop(self):
+        self.bus.close()
+
+# Class to read a published camera like cv2.VideoCapture, used for the enrollment preview
+class BusCapture:
+    def __init__(self, info):
+        self.bus = FrameBus(info[1], info[2], name=info[0])
+        self.last_seq = 0
+
+    def read(self):
+        deadline = time.monotonic() + 2
+        while time.monotonic() < deadline:
+            item = self.bus.read_latest()
+            if item is not None and item[0] > self.last_seq:
+                self.last_seq = item[0]
+                return True, item[1]
+            time.sleep(0.005)
+        return False, None
+
+    def isOpened(self):
+        return True
+
+    def release(self):
+        self.bus.close()
+
+# Function to open a reader for every assigned camera. With the camera service the readers
+# subscribe to the shared frame buses, otherwise each opens its device on its own thread.
+def open_camera_readers(camera_roles):
+    readers = []
+    if CAMERA_SERVICE:
+        buses = start_camera_services([index for indices in camera_roles.values() for index in indices])
+        for role, indices in camera_roles.items():
+            for index in indices:
+                if index in buses:
+                    readers.append(BusReader(index, role, buses[index]))
+        return readers
+
+    for role, indices in camera_roles.items():
+        for index in indices:
+            reader = CameraReader(index, role)
+            if reader.cap.isOpened():
+                reader.start()
+                readers.append(reader)
+            else:
+                reader.cap.release()
+    return readers
+
+# Class to shed work in a defined order when the cameras produce more than the workers can
+# process. Latency (capture to processed) and job cost are tracked per role as moving averages.
+class LoadScheduler:
+    def __init__(self, readers):
+        self.readers = readers
+        self.level = 0
+        self.latency = {}
+        self.cost = {}
+        self.frames = {reader: 0 for reader in readers}
+        self.counts = {reader: (reader.captured, reader.processed) for reader in readers}
+        self.last_change = time.monotonic()
+
+    @staticmethod
+    def priority(role):
+        return ROLE_PRIORITIES.get(role, LOW_PRIORITY)
+
+    def observe(self, role, latency, cost=None):
+        self.latency[role] = 0.9 * self.latency.get(role, latency) + 0.1 * latency
+        if cost is not None:
+            self.cost[role] = 0.9 * self.cost.get(role, cost) + 0.1 * cost
+
+    # Function to move the shedding level one step towards what the measured latencies and
+    # frame rates need. A ratio above 1 means a role misses its target.
+    def update(self):
+        now = time.monotonic()
+        elapsed = now - self.last_change
+        if elapsed < SHED_ADJUST_SECONDS:
+            return
+        ratios = [latency / ROLE_TARGET_LATENCY.get(role, 1.0) for role, latency in self.latency.items()]
+        for reader in self.readers:
+            captured, processed = reader.captured - self.counts[reader][0], reader.processed - self.counts[reader][1]
+            self.counts[reader] = (reader.captured, reader.processed)
+            if self.priority(reader.role) >= LOW_PRIORITY or not captured:
+                continue
+            if processed >= 0.95 * captured:
+                ratios.append(0.0)
+            else:
+                wanted = min(ROLE_TARGET_FPS.get(reader.role, 1.0), captured / elapsed)
+                ratios.append(wanted / max(processed / elapsed, 1e-6))
+        if not ratios:
+            return
+        level = self.level
+        if max(ratios) > 1 and level < SHED_MAX_LEVEL:
+            level += 1
+        elif max(ratios) < 0.67 and level > 0:
+            level -= 1
+        if level != self.level:
+            print(f"Load shedding level {self.level} -> {level} (worst role at {max(ratios):.1f}x its target)")
+            self.level = level
+        self.last_change = now
+
+    # Function to tell whether a frame of this reader is skipped at the current level
+    def skip(self, reader):
+        if self.level < 2 or self.priority(reader.role) < LOW_PRIORITY:
+            return False
+        self.frames[reader] += 1
+        return self.frames[reader] % (2 ** (self.level - 1)) != 0
+
+    # Function to apply the current level to the detection settings of a role
+    def adjust(self, role, settings):
+        if self.level == 0 or self.priority(role) == 0:
+            return settings
+        settings["scale"] = settings.get("scale", 1.0) * SHED_DETECTION_SCALE
+        if self.level >= 3 and self.priority(role) >= LOW_PRIORITY and settings.get("quality"):
+            settings["quality"] = dict(settings["quality"], encode_score=1.1, max_wait=settings["quality"]["max_wait"] * 4)
+        return settings
+
+    def summary(self):
+        roles = ", ".join(f"{role} {latency * 1000:.0f}/{ROLE_TARGET_LATENCY.get(role, 1.0) * 1000:.0f} ms"
+                          f" (job {self.cost.get(role, 0) * 1000:.0f} ms)" for role, latency in sorted(self.latency.items()))
+        return f"shedding level {self.level}: {roles}"
+
+# Class to collect the live metrics of the recognition pipeline and publish them as a JSON
+# snapshot file and, optionally, a local HTTP endpoint
+class PipelineMetrics:
+    def __init__(self):
+        self.faces = {}
+        self.intruders = 0
+        self.counts = {}
+        self.started = time.time()
+        self.latest = {}
+        self.server = None
+        self.lock = threading.Lock()
+
+    # Function to count the known and unknown faces recognized in one frame
+    def count_faces(self, camera, matches):
+        unknown = sum(1 for name, _, _ in matches if name == "Unknown")
+        counts = self.faces.setdefault(camera, [0, 0])
+        counts[0] += len(matches) - unknown
+        counts[1] += unknown
+
+    def count_intruder(self):
+        self.intruders += 1
+
+    # Function to build a snapshot; frame rates are averaged since the previous snapshot
+    def snapshot(self, readers, scheduler=None):
+        now = time.monotonic()
+        cameras = {}
+        for reader in readers:
+            then, captured, processed = self.counts.get(reader.name, (now, 0, 0))
+            elapsed = max(now - then, 1e-6)
+            self.counts[reader.name] = (now, reader.captured, reader.processed)
+            known, unknown = self.faces.get(reader.name, (0, 0))
+            cameras[reader.name] = {
+                "role": reader.role,
+                "capture_fps": round((reader.captured - captured) / elapsed, 2),
+                "processed_fps": round((reader.processed - processed) / elapsed, 2),
+                "queue": reader.depth(),
+                "queue_capacity": reader.capacity(),
+                "dropped": reader.dropped,
+                "shed": reader.shed,
+                "motion_skipped": reader.skipped,
+                "known_faces": known,
+                "unknown_faces": unknown
+            }
+        stages = stage_timer.summary()
+        return {
+            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "uptime_s": round(time.time() - self.started, 1),
+            "cameras": cameras,
+            "stages": stages,
+            "intruders": self.intruders,
+            "record_write": stages.get("record", {}),
+            "alerts_dropped": alert_dispatcher.dropped if alert_dispatcher is not None else 0,
+            "alerts_rate_limited": alert_dispatcher.rate_limited if alert_dispatcher is not None else 0,
+            "shedding_level": scheduler.level if scheduler is not None else 0
+        }
+
+    # Function to render a snapshot in the Prometheus text format
+    @staticmethod
+    def prometheus(snapshot):
+        lines = []
+        for camera, values in snapshot["cameras"].items():
+            label = 'camera="{}",role="{}"'.format(*(value.replace("\\", "\\\\").replace('"', '\\"') for value in (camera, values["role"])))
+            lines.append(f'campus_guardian_camera_fps{{{label},kind="capture"}} {values["capture_fps"]}')
+            lines.append(f'campus_guardian_camera_fps{{{label},kind="processed"}} {values["processed_fps"]}')
+            lines.append(f'campus_guardian_camera_queue_depth{{{label}}} {values["queue"]}')
+            for counter in ("dropped", "shed", "motion_skipped"):
+                lines.append(f'campus_guardian_camera_{counter}_frames_total{{{label}}} {values[counter]}')
+            lines.append(f'campus_guardian_faces_total{{{label},result="known"}} {values["known_faces"]}')
+            lines.append(f'campus_guardian_faces_total{{{label},result="unknown"}} {values["unknown_faces"]}')
+        for stage, values in snapshot["stages"].items():
+            for quantile in ("50", "95", "99"):
+                lines.append(f'campus_guardian_stage_latency_ms{{stage="{stage}",quantile="0.{quantile}"}} {values[f"p{quantile}_ms"]}')
+            lines.append(f'campus_guardian_stage_samples{{stage="{stage}"}} {values["count"]}')
+        lines.append(f'campus_guardian_intruders_total {snapshot["intruders"]}')
+        lines.append(f'campus_guardian_alerts_dropped_total {snapshot["alerts_dropped"]}')
+        lines.append(f'campus_guardian_alerts_rate_limited_total {snapshot["alerts_rate_limited"]}')
+        lines.append(f'campus_guardian_shedding_level {snapshot["shedding_level"]}')
+        lines.append(f'campus_guardian_uptime_seconds {snapshot["uptime_s"]}')
+        return "\n".join(lines) + "\n"
+
+    def publish(self, readers, scheduler=None):
+        snapshot = self.snapshot(readers, scheduler)
+        with self.lock:
+            self.latest = snapshot
+        if METRICS_FILE:
+            with open(METRICS_FILE + ".tmp", 'w') as f:
+                json.dump(snapshot, f, indent=1)
+            os.replace(METRICS_FILE + ".tmp", METRICS_FILE)
+
+    # Function to serve the latest snapshot on localhost, started once per process
+    def serve(self, port):
+        if self.server is not None:
+            return
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with metrics.lock:
+                    snapshot = metrics.latest
+                if self.path == "/metrics":
+                    body, content_type = metrics.prometheus(snapshot).encode() if snapshot else b"", "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = json.dumps(snapshot).encode(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self.server = ThreadingHTTPServer(("127.0.0.1", port), MetricsHandler)
+        except OSError as e:
+            print(f"Error: Metrics endpoint could not listen on port {port}: {e}")
+            return
+        threading.Thread(target=self.server.serve_forever, daemon=True, name="metrics").start()
+        print(f"Metrics at http://127.0.0.1:{port}/metrics")
+
+pipeline_metrics = PipelineMetrics()
+
+# Class to show all cameras in one downscaled window, redrawn at most MOSAIC_FPS times per second.
+# Frames are kept clean; the faces of the latest frame of each camera are drawn onto its tile
+# at redraw time, so frames that are never shown are never annotated.
+class MosaicView:
+    def __init__(self, title, readers, width=None, fps=None):
+        width = MOSAIC_WIDTH if width is None else width
+        fps = MOSAIC_FPS if fps is None else fps
+        self.title = title
+        self.names = [reader.name for reader in readers]
+        self.columns = int(np.ceil(np.sqrt(len(self.names)))) or 1
+        self.rows = int(np.ceil(len(self.names) / self.columns)) or 1
+        self.tile = (width // self.columns, width // self.columns * 9 // 16)
+        self.interval = 1.0 / fps
+        self.frames = {}
+        self.next_draw = 0
+
+    # Function to take the latest frame of a camera with its (face locations, matches)
+    def update(self, name, frame, faces=None):
+        self.frames[name] = (frame, faces)
+        now = time.monotonic()
+        if now < self.next_draw:
+            return
+        self.next_draw = now + self.interval
+        cv2.imshow(self.title, self.render())
+
+    # Function to draw the mosaic, with the faces of every camera scaled onto its tile
+    def render(self):
+        tile_width, tile_height = self.tile
+        mosaic = np.zeros((tile_height * self.rows, tile_width * self.columns, 3), dtype=np.uint8)
+        tracked = watchlist.identities if watchlist is not None else set()
+        for i, name in enumerate(self.names):
+            frame, faces = self.frames.get(name, (None, None))
+            if frame is None:
+                continue
+            y, x = (i // self.columns) * tile_height, (i % self.columns) * tile_width
+            tile = mosaic[y:y + tile_height, x:x + tile_width]
+            tile[:] = cv2.resize(frame, (tile_width, tile_height), interpolation=cv2.INTER_AREA)
+            if faces is not None:
+                with stage_timer.measure("annotate"):
+                    scale_x, scale_y = tile_width / frame.shape[1], tile_height / frame.shape[0]
+                    for (top, right, bottom, left), (face_name, designation, _) in zip(*faces):
+                        color = (0, 0, 255) if (face_name, designation) in tracked else (0, 255, 0)
+                        top, right = int(top * scale_y), int(right * scale_x)
+                        bottom, left = int(bottom * scale_y), int(left * scale_x)
+                        cv2.rectangle(tile, (left, top), (right, bottom), color, 1)
+                        cv2.putText(tile, face_name, (left + 2, bottom - 4), cv2.FONT_HERSHEY_SIMPLEX, 0.35, color, 1)
+            cv2.putText(mosaic, name, (x + 6, y + 18), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+        return mosaic
+
+# Function to print frame rate and queue depth for every camera
+def print_camera_stats(readers):
+    for reader in readers:
+        capture_fps, processed_fps = reader.rates()
+        print(f"[{reader.name}] capture {capture_fps:.1f} fps, processed {processed_fps:.1f} fps, "
+              f"queue {reader.depth()}/{reader.capacity()}, dropped {reader.dropped}, shed {reader.shed}, "
+              f"motion skipped {reader.skipped / max(reader.processed, 1):.0%}")
+
+# Function to run detection and encoding for all cameras on a process pool. Each camera has
+# at most RECOGNITION_IN_FLIGHT frames in flight, so a single busy camera can use more than
+# one worker. Results are handled and displayed on the main thread in capture order: frames
+# that need no detection wait behind the camera's pending jobs. handle_faces returns the
+# matches of the faces, which the mosaic draws when it is redrawn.
+def run_camera_pipeline(readers, handle_faces, window_title, matcher=None, display=True, duration=None):
+    display = display and DISPLAY_MODE != "off"
+    mosaic = MosaicView(window_title, readers) if display and DISPLAY_MODE == "mosaic" else None
+    scheduler = LoadScheduler(readers) if LOAD_SHEDDING else None
+    if scheduler is not None:
+        # Higher priority cameras get their jobs submitted first
+        readers = sorted(readers, key=lambda reader: scheduler.priority(reader.role))
+    pending = {reader: deque() for reader in readers}
+    started = time.monotonic()
+    last_stats = started
+    face_tracks = {reader: FaceTracks() for reader in readers} if TRACKING_MODE and matcher is not None else {}
+    motion_gates = {reader: MotionGate(get_motion_settings(reader.role)) for reader in readers} if MOTION_GATING else {}
+    deferred_faces = {reader: DeferredFaces() for reader in readers}
+    last_faces = {}
+
+    def finish_frame(reader, frame, captured_at, cost=None, faces=None):
+        reader.processed += 1
+        latency = (datetime.now() - captured_at).total_seconds()
+        stage_timer.add("latency", latency)
+        if scheduler is not None:
+            scheduler.observe(reader.role, latency, cost)
+        if display:
+            with stage_timer.measure("display"):
+                if mosaic is not None:
+                    mosaic.update(reader.name, frame, faces)
+                else:
+                    cv2.imshow(f'{window_title} - {reader.name}', frame)
+
+    # Function to handle a frame without detection, moving the tracks or reusing the faces
+    # of the last detection when nothing moved
+    def reuse_faces(reader, frame, captured_at, kind):
+        tracks = face_tracks.get(reader)
+        if kind == "track":
+            tracks.propagate(frame)
+            faces = tracks.faces()
+        else:
+            reader.skipped += 1
+            faces = tracks.faces() if tracks is not None else last_faces.get(reader, ([], []))
+        matches = handle_faces(frame, reader.name, reader.role, captured_at, *faces)
+        finish_frame(reader, frame, captured_at, faces=(faces[0], matches) if matches is not None else None)
+
+    # Function to handle the result of a recognition job
+    def finish_job(reader, future, frame, captured_at, submitted, previous_tracks):
+        try:
+            result, timings = future.result()
+        except Exception as e:
+            print(f"Error: Recognition failed for {reader.name}: {e}")
+            return
+        stage_timer.merge(timings)
+        if result is None:
+            reader.dropped += 1
+            return
+        face_locations, face_encodings, assignments, waiting = result
+        deferred_faces[reader].update(waiting, time.monotonic())
+        tracks = face_tracks.get(reader)
+        if tracks is not None:
+            tracks.apply_detections(frame, face_locations, face_encodings, assignments, matcher, previous_tracks)
+            faces = tracks.faces()
+            face_locations = faces[0]
+            matches = handle_faces(frame, reader.name, reader.role, captured_at, *faces)
+        else:
+            matches = handle_faces(frame, reader.name, reader.role, captured_at, face_locations, face_encodings)
+            last_faces[reader] = (face_locations, face_encodings)
+        finish_frame(reader, frame, captured_at, time.monotonic() - submitted,
+                     (face_locations, matches) if matches is not None else None)
+
+    if METRICS_PORT:
+        pipeline_metrics.serve(METRICS_PORT)
+    last_metrics = started
+
+    with ProcessPoolExecutor(max_workers=RECOGNITION_WORKERS, initializer=init_recognition_worker) as pool:
+        try:
+            while True:
+                for reader in readers:
+                    jobs = pending[reader]
+                    if len(jobs) >= RECOGNITION_IN_FLIGHT:
+                        continue
+                    item = reader.get()
+                    if item is None:
+                        continue
+                    frame, captured_at, frame_ref = item
+                    if scheduler is not None and scheduler.skip(reader):
+                        reader.shed += 1
+                        continue
+                    tracks = face_tracks.get(reader)
+                    if tracks is not None and not tracks.needs_detection():
+                        if jobs:
+                            jobs.append(("track", None, frame, captured_at, None, None))
+                        else:
+                            reuse_faces(reader, frame, captured_at, "track")
+                        continue
+                    settings = get_detection_settings(reader.role)
+                    if scheduler is not None:
+                        settings = scheduler.adjust(reader.role, settings)
+                    gate = motion_gates.get(reader)
+                    if gate is not None:
+                        faces = tracks.faces() if tracks is not None else last_faces.get(reader, ([], []))
+                        with stage_timer.measure("motion"):
+                            detect, roi = gate.check(frame, time.monotonic(), faces[0])
+                        if detect and roi is not None:
+                            # Motion outside the role's configured region is ignored
+                            roi = intersect_roi(settings["roi"], roi)
+                            detect = roi is not None
+                        if not detect:
+                            # Nothing moved: the faces of the last detection are still there
+                            if jobs:
+                                jobs.append(("static", None, frame, captured_at, None, None))
+                            else:
+                                reuse_faces(reader, frame, captured_at, "static")
+                            continue
+                        if roi is not None:
+                            settings["roi"] = roi
+                    if settings.get("quality"):
+                        settings["force"] = deferred_faces[reader].due(time.monotonic(), settings["quality"]["max_wait"])
+                    tracked_boxes = tracks.tracked_boxes() if tracks is not None else None
+                    job_frame = frame_ref if frame_ref is not None else frame
+                    jobs.append(("detect", pool.submit(recognition_job, job_frame, tracked_boxes, settings), frame, captured_at,
+                                 time.monotonic(), tracks.tracks if tracks is not None else None))
+
+                for reader, jobs in pending.items():
+                    # Jobs finish out of order, results are taken in the order they were submitted
+                    while jobs and (jobs[0][1] is None or jobs[0][1].done()):
+                        kind, future, frame, captured_at, submitted, previous_tracks = jobs.popleft()
+                        if kind == "detect":
+                            finish_job(reader, future, frame, captured_at, submitted, previous_tracks)
+                        else:
+                            reuse_faces(reader, frame, captured_at, kind)
+
+                if scheduler is not None:
+                    scheduler.update()
+
+                if time.monotonic() - last_stats >= CAMERA_STATS_INTERVAL:
+                    print_camera_stats(readers)
+                    if scheduler is not None:
+                        print(scheduler.summary())
+                    last_stats = time.monotonic()
+
+                if time.monotonic() - last_metrics >= METRICS_INTERVAL:
+                    pipeline_metrics.publish(readers, scheduler)
+                    last_metrics = time.monotonic()
+
+                if duration is not None and time.monotonic() - started >= duration:
+                    break
+                if display:
+                    if cv2.waitKey(1) & 0xFF == ord('q'):
+                        break
+                else:
+                    futures = [job[1] for jobs in pending.values() for job in jobs if job[1] is not None]
+                    if futures:
+                        wait(futures, timeout=0.005, return_when=FIRST_COMPLETED)
+                    else:
+                        time.sleep(0.001)
+        finally:
+            for jobs in pending.values():
+                for _, future, _, _, _, _ in jobs:
+                    if future is not None:
+                        future.cancel()
+            for reader in readers:
+                reader.stop()
+            if display:
+                cv2.destroyAllWindows()
+
+# Function to compute a content hash of an image file
+def file_digest(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# Function to compute the face encoding of a single image (None if no face is found)
+def encode_face_image(image_path):
+    image = face_recognition.load_image_file(image_path)
+    encodings = face_recognition.face_encodings(image)
+    if len(encodings) != 1:
+        print(f"Warning: {len(encodings)} faces found in {image_path}")
+    if encodings:
+        return encodings[0]
+    return None
+
+# Function to return (name, designation) of a cache key. The name is the person directory
+# for keys like "students/Alice/1.jpg" and the file name for keys like "students/Alice.jpg".
+def face_image_identity(key):
+    parts = key.split("/")
+    name = parts[1] if len(parts) > 2 else os.path.splitext(parts[1])[0]
+    return name, parts[0].capitalize()[:-1]
+
+# Function to hold the lock of the encoding cache across processes (the menu, the bulk importer
+# and the roster watcher of a running recognizer). Every read-modify-write of the cache and
+# every read of the index and its matrix runs under it.
+@contextmanager
+def encoding_cache_lock(known_faces_dir):
+    cache_dir = os.path.join(known_faces_dir, ENCODING_CACHE_DIR)
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(os.path.join(cache_dir, ENCODING_LOCK_FILE), 'a+') as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+        else:
+            import fcntl
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if os.name == "nt":
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+# Function to load the encoding cache, the encoding matrix is memory-mapped
+def load_encoding_cache(known_faces_dir):
+    cache_dir = os.path.join(known_faces_dir, ENCODING_CACHE_DIR)
+    index_path = os.path.join(cache_dir, ENCODING_INDEX_FILE)
+    empty = np.empty((0, ENCODING_SIZE))
+    if not os.path.exists(index_path):
+        return empty, {}
+    try:
+        with open(index_path, 'r') as f:
+            index = json.load(f)
+        matrix = empty
+        if index["matrix"]:
+            matrix = np.load(os.path.join(cache_dir, index["matrix"]), mmap_mode='r')
+        return matrix, index["entries"]
+    except (OSError, ValueError, KeyError):
+        print("Encoding cache is unreadable, rebuilding it.")
+        return empty, {}
+
+# Function to write the encoding cache, called with the cache lock held. A new matrix file is
+# written every time so the one still memory-mapped by a running process is never overwritten.
+def save_encoding_cache(known_faces_dir, entries, encodings):
+    cache_dir = os.path.join(known_faces_dir, ENCODING_CACHE_DIR)
+    if not os.path.exists(cache_dir):
+        os.makedirs(cache_dir)
+
+    rows = []
+    for key in sorted(entries):
+        encoding = encodings.get(key)
+        if encoding is None:
+            entries[key]["row"] = None
+        else:
+            entries[key]["row"] = len(rows)
+            rows.append(encoding)
+
+    matrix_name = None
+    if rows:
+        matrix_name = f"encodings-{time.time_ns()}.npy"
+        np.save(os.path.join(cache_dir, matrix_name), np.array(rows, dtype=np.float64))
+
+    index_path = os.path.join(cache_dir, ENCODING_INDEX_FILE)
+    with open(index_path + ".tmp", 'w') as f:
+        json.dump({"matrix": matrix_name, "entries": entries}, f)
+    os.replace(index_path + ".tmp", index_path)
+
+    # Remove the matrix files the index no longer references, files still mapped on Windows are
+    # left for the next save
+    for filename in os.listdir(cache_dir):
+        if filename.startswith("encodings-") and filename != matrix_name:
+            try:
+                os.remove(os.path.join(cache_dir, filename))
+            except OSError:
+                pass
+
+    return load_encoding_cache(known_faces_dir)
+
+# Function to refresh cache entries for the given images. An image that no longer
+# exists is dropped, an image whose mtime, size and hash are unchanged is not re-encoded.
+def refresh_cache_entries(known_faces_dir, entries, encodings, image_paths):
+    changed = False
+    for image_path in image_paths:
+        key = os.path.relpath(image_path, known_faces_dir).replace(os.sep, "/")
+
+        if not os.path.isfile(image_path):
+            if key in entries:
+                del entries[key]
+                encodings.pop(key, None)
+                changed = True
+            continue
+
+        stat = os.stat(image_path)
+        entry = entries.get(key)
+        if entry and entry["mtime"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            continue
+
+        digest = file_digest(image_path)
+        changed = True
+        if entry and entry["sha1"] == digest:
+            entry["mtime"] = stat.st_mtime_ns
+            continue
+
+        print(f"Encoding face image {key}")
+        name, designation = face_image_identity(key)
+        entries[key] = {
+            "mtime": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha1": digest,
+            "name": name,
+            "designation": designation,
+            "row": None
+        }
+        encodings[key] = encode_face_image(image_path)
+    return changed
+
+# Function to bring the encoding cache in line with the images on disk
+def sync_encoding_cache(known_faces_dir, image_paths=None):
+    with encoding_cache_lock(known_faces_dir):
+        matrix, entries = load_encoding_cache(known_faces_dir)
+        encodings = {key: matrix[entry["row"]] for key, entry in entries.items() if entry["row"] is not None}
+
+        if image_paths is None:
+            for category in FACE_CATEGORIES:
+                category_dir = os.path.join(known_faces_dir, category)
+                if not os.path.exists(category_dir):
+                    os.makedirs(category_dir)
+            # Images deleted outside the program are dropped as well
+            keys = set(scan_face_images(known_faces_dir)) | set(entries)
+            image_paths = [os.path.join(known_faces_dir, *key.split("/")) for key in sorted(keys)]
+
+        if refresh_cache_entries(known_faces_dir, entries, encodings, image_paths):
+            matrix, entries = save_encoding_cache(known_faces_dir, entries, encodings)
+        return matrix, entries
+
+# Function to update the encoding cache in place after adding or deleting face images
+def update_encoding_cache(known_faces_dir, *image_paths):
+    return sync_encoding_cache(known_faces_dir, list(image_paths))
+
 # Function to load known faces
 def load_known_faces(known_faces_dir):
-    known_face_encodings = []
-    known_face_names = []
-    known_face_designations = []
-
     if not os.path.exists(known_faces_dir):
         os.makedirs(known_faces_dir)
 
-    for category in ["students", "admins", "teachers", "guests"]:
-        category_dir = os.path.join(known_faces_dir, category)
-        if not os.path.exists(category_dir):
-            os.makedirs(category_dir)
-        for filename in os.listdir(category_dir):
-            image_path = os.path.join(category_dir, filename)
-            image = face_recognition.load_image_file(image_path)
-            encodings = face_recognition.face_encodings(image)
-            if encodings:
-                encoding = encodings[0]
-                known_face_encodings.append(encoding)
-                known_face_names.append(os.path.splitext(filename)[0])
-                known_face_designations.append(category.capitalize()[:-1])
+    return known_faces_from_cache(*sync_encoding_cache(known_faces_dir))
+
+# Function to turn the encoding cache into (encodings, names, designations)
+def known_faces_from_cache(matrix, entries):
+    known_face_encodings = matrix
+    known_face_names = [None] * len(matrix)
+    known_face_designations = [None] * len(matrix)
+    for entry in entries.values():
+        if entry["row"] is not None:
+            known_face_names[entry["row"]] = entry["name"]
+            known_face_designations[entry["row"]] = entry["designation"]
 
     return known_face_encodings, known_face_names, known_face_designations
 
-# Function to start face recognition process for multiple cameras
-def start_face_recognition(camera_roles, known_faces_dir):
-    known_face_encodings, known_face_names, known_face_designations = load_known_faces(known_faces_dir)
+# Function to list (cache key, mtime, size) of every face image, including the images in
+# person directories, using stat calls only
+def scan_face_images(known_faces_dir):
+    images = {}
+    directories = [(category, os.path.join(known_faces_dir, category)) for category in FACE_CATEGORIES]
+    while directories:
+        prefix, directory = directories.pop()
+        if not os.path.isdir(directory):
+            continue
+        with os.scandir(directory) as scan:
+            for item in scan:
+                if item.name.startswith("."):
+                    continue
+                if item.is_file():
+                    stat = item.stat()
+                    images[f"{prefix}/{item.name}"] = (stat.st_mtime_ns, stat.st_size)
+                elif item.is_dir() and prefix in FACE_CATEGORIES:
+                    directories.append((f"{prefix}/{item.name}", item.path))
+    return images
 
-    caps = []
-    for role, indices in camera_roles.items():
-        for index in indices:
-            cap = cv2.VideoCapture(index)
-            if cap.isOpened():
-                caps.append((cap, role))
+# Function to detect and encode every face in an image for the bulk importer, runs in a worker
+# process. Returns (sha1, encodings, error).
+def read_face_image(image_path):
+    try:
+        digest = file_digest(image_path)
+        image = face_recognition.load_image_file(image_path)
+        return digest, face_recognition.face_encodings(image), None
+    except Exception as e:
+        return None, [], str(e)
+
+# Function to map a category given as plural, singular or designation to a FACE_CATEGORIES entry
+def normalize_category(category):
+    category = (category or "").strip().lower()
+    if category + "s" in FACE_CATEGORIES:
+        category += "s"
+    return category if category in FACE_CATEGORIES else None
+
+# Function to list (image path, category, name) to import from a CSV manifest with path, name
+# and category columns, or from a directory laid out like known_faces. With a category, the
+# directory holds <name>.jpg files and <name>/ directories directly.
+def plan_face_import(source, category=None):
+    plan = []
+    if os.path.isfile(source):
+        base_dir = os.path.dirname(os.path.abspath(source))
+        with open(source, newline='') as f:
+            for row in csv.DictReader(f):
+                image_path = os.path.join(base_dir, row.get("path", "").strip())
+                plan.append((image_path, row.get("category") or category, row.get("name", "")))
+        return plan
+
+    if category:
+        category_dirs = [(category, source)]
+    else:
+        category_dirs = [(item, os.path.join(source, item)) for item in sorted(os.listdir(source))
+                         if os.path.isdir(os.path.join(source, item))]
+    for category_name, category_dir in category_dirs:
+        for item in sorted(os.listdir(category_dir)):
+            path = os.path.join(category_dir, item)
+            if os.path.isdir(path):
+                plan += [(os.path.join(path, filename), category_name, item) for filename in sorted(os.listdir(path))
+                         if filename.lower().endswith(IMAGE_EXTENSIONS)]
+            elif item.lower().endswith(IMAGE_EXTENSIONS):
+                plan.append((path, category_name, os.path.splitext(item)[0]))
+    return plan
+
+# Function to enroll face images in bulk. Images are detected and encoded in a process pool;
+# every image with exactly one face is copied to known_faces/<category>/<name>/ and written
+# straight into the encoding cache, so several reference images of a person are all matched.
+# Images with no face, several faces or an unknown category are reported instead. The new
+# entries are merged into the cache as it is at the end of the import, under the cache lock, so
+# images encoded meanwhile by a running recognizer are kept. Returns None if the source does
+# not exist.
+def import_faces(source, known_faces_dir, category=None, workers=None, report_path=None):
+    workers = RECOGNITION_WORKERS if workers is None else workers
+    if not os.path.exists(source):
+        print(f"Error: Import source {source} does not exist")
+        return None
+    plan = []
+    problems = []
+    for image_path, image_category, name in plan_face_import(source, category):
+        image_category = normalize_category(image_category)
+        name = name.strip()
+        if image_category is None:
+            problems.append((image_path, name, "unknown category"))
+        elif not name or name.startswith(".") or "/" in name or os.sep in name:
+            problems.append((image_path, name, "invalid name"))
+        else:
+            plan.append((image_path, image_category, name))
+    print(f"Importing {len(plan)} images with {workers} workers")
+
+    with encoding_cache_lock(known_faces_dir):
+        enrolled = {entry["sha1"] for entry in load_encoding_cache(known_faces_dir)[1].values()}
+    new_entries, new_encodings = {}, {}
+    imported = duplicates = 0
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(read_face_image, [image_path for image_path, _, _ in plan], chunksize=8)
+        for (image_path, image_category, name), (digest, face_encodings, error) in zip(plan, results):
+            if error:
+                problems.append((image_path, name, f"unreadable: {error}"))
+                continue
+            if len(face_encodings) != 1:
+                problems.append((image_path, name, f"{len(face_encodings)} faces found"))
+                continue
+            if digest in enrolled:
+                duplicates += 1
+                continue
+
+            person_dir = os.path.join(known_faces_dir, image_category, name)
+            if not os.path.exists(person_dir):
+                os.makedirs(person_dir)
+            filename = digest[:16] + os.path.splitext(image_path)[1].lower()
+            shutil.copyfile(image_path, os.path.join(person_dir, filename))
+            stat = os.stat(os.path.join(person_dir, filename))
+            key = f"{image_category}/{name}/{filename}"
+            name, designation = face_image_identity(key)
+            new_entries[key] = {
+                "mtime": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "sha1": digest,
+                "name": name,
+                "designation": designation,
+                "row": None
+            }
+            new_encodings[key] = face_encodings[0]
+            enrolled.add(digest)
+            imported += 1
+
+    if imported:
+        with encoding_cache_lock(known_faces_dir):
+            matrix, entries = load_encoding_cache(known_faces_dir)
+            encodings = {key: matrix[entry["row"]] for key, entry in entries.items() if entry["row"] is not None}
+            entries.update(new_entries)
+            encodings.update(new_encodings)
+            save_encoding_cache(known_faces_dir, entries, encodings)
+    notify_roster_change()
 
-    if not caps:
+    elapsed = time.perf_counter() - start
+    print(f"Imported {imported} images, skipped {duplicates} already enrolled, {len(problems)} problems "
+          f"({elapsed:.1f}s, {len(plan) / max(elapsed, 1e-9):.1f} images/s)")
+    for image_path, name, problem in problems:
+        print(f"  {image_path} ({name or '-'}): {problem}")
+    if report_path:
+        with open(report_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["path", "name", "problem"])
+            writer.writerows(problems)
+        print(f"Import problems written to {report_path}")
+    return {"imported": imported, "duplicates": duplicates, "problems": problems}
+
+# Class to keep the roster of a running recognizer up to date. It polls known_faces/ with stat
+# calls (or takes explicit reload requests), re-encodes only the changed images in a separate
+# process so the vision loop keeps its CPU and GIL, and then swaps in a new FaceMatcher in one
+# assignment. It can be used anywhere a FaceMatcher is expected.
+class RosterWatcher(threading.Thread):
+    def __init__(self, known_faces_dir, matcher, interval=None):
+        interval = ROSTER_POLL_SECONDS if interval is None else interval
+        super().__init__(daemon=True, name="roster")
+        self.known_faces_dir = known_faces_dir
+        self.matcher = matcher
+        self.interval = interval
+        self.images = scan_face_images(known_faces_dir)
+        self.requested = set()
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopped = False
+        self.encoder = None
+
+    def match(self, face_encodings):
+        return self.matcher.match(face_encodings)
+
+    def __len__(self):
+        return len(self.matcher)
+
+    # Function to ask for specific images to be re-read, e.g. right after add_face or delete_face
+    def reload(self, *image_paths):
+        with self.lock:
+            self.requested.update(image_paths)
+        self.wake.set()
+
+    def run(self):
+        while not self.stopped:
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            if self.stopped:
+                break
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error: Roster reload failed: {e}")
+
+    def refresh(self):
+        images = scan_face_images(self.known_faces_dir)
+        changed = {key for key in images.keys() | self.images.keys() if images.get(key) != self.images.get(key)}
+        image_paths = {os.path.join(self.known_faces_dir, *key.split("/")) for key in changed}
+        with self.lock:
+            image_paths |= {os.path.normpath(path) for path in self.requested}
+            self.requested = set()
+        if not image_paths:
+            return
+
+        if self.encoder is None:
+            self.encoder = ProcessPoolExecutor(max_workers=1)
+        self.encoder.submit(update_encoding_cache, self.known_faces_dir, *image_paths).result()
+        with encoding_cache_lock(self.known_faces_dir):
+            known_faces = known_faces_from_cache(*load_encoding_cache(self.known_faces_dir))
+        self.matcher = FaceMatcher(*known_faces)
+        self.images = images
+        print(f"Roster reloaded: {len(self.matcher)} known faces ({len(image_paths)} images checked)")
+
+    def stop(self):
+        self.stopped = True
+        self.wake.set()
+        if self.is_alive():
+            self.join(timeout=5)
+        if self.encoder is not None:
+            self.encoder.shutdown()
+
+roster_watcher = None
+
+# Function to tell a running recognizer that face images were added or deleted
+def notify_roster_change(*image_paths):
+    if roster_watcher is not None:
+        roster_watcher.reload(*image_paths)
+
+# Function to start face recognition process for multiple cameras. Every subscriber is called
+# with (frame, camera, role, captured_at, face_locations, face_encodings, matches) for each
+# processed frame, so other features reuse the detection and encoding of this pass.
+def start_face_recognition(camera_roles, known_faces_dir, known_faces=None, subscribers=(), window_title='Face Recognition',
+                           display=True):
+    global roster_watcher
+    if known_faces is None:
+        known_faces = load_known_faces(known_faces_dir)
+
+    readers = open_camera_readers(camera_roles)
+    if not readers:
         print("No cameras assigned. Please assign cameras before starting face recognition.")
         return
 
-    while True:
-        for cap, role in caps:
+    matcher = roster_watcher = RosterWatcher(known_faces_dir, FaceMatcher(*known_faces))
+    matcher.start()
+
+    presence_trackers = {reader.name: PresenceTracker() for reader in readers}
+
+    def handle_faces(frame, camera, role, captured_at, face_locations, face_encodings, matches=None):
+        matches = handle_recognized_faces(frame, camera, role, captured_at, face_locations, face_encodings, matcher,
+                                          presence_trackers[camera], matches, annotate=display and DISPLAY_MODE == "windows")
+        for subscriber in subscribers:
+            subscriber(frame, camera, role, captured_at, face_locations, face_encodings, matches)
+        return matches
+
+    try:
+        run_camera_pipeline(readers, handle_faces, window_title, matcher, display)
+    finally:
+        matcher.stop()
+        roster_watcher = None
+        close_intruder_registry()
+    export_excel_report()
+
+batch_matcher = None
+
+# Function to prepare a batch worker process with the known faces
+def init_batch_worker(known_faces):
+    global batch_matcher
+    batch_matcher = FaceMatcher(*known_faces)
+
+# Function to recognize the faces in frames [start_frame, end_frame) of a recording, runs in a
+# batch worker. Crops of unknown faces are returned for intruder snapshots.
+def process_video_chunk(source, role, start_frame, end_frame, frame_step):
+    cap = cv2.VideoCapture(source)
+    if start_frame:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    settings = get_detection_settings(role)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25
+    deferred = DeferredFaces()
+    results = []
+    index = start_frame
+    while end_frame is None or index < end_frame:
+        if index % frame_step:
+            if not cap.grab():
+                break
+            index += 1
+            continue
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if settings.get("quality"):
+            settings["force"] = deferred.due(index / fps, settings["quality"]["max_wait"])
+        face_locations, face_encodings, _, waiting = detect_and_encode(frame, None, settings)
+        deferred.update(waiting, index / fps)
+        matches = batch_matcher.match(face_encodings)
+        crops = {
+            i: frame[top:bottom, left:right].copy()
+            for i, ((top, right, bottom, left), (name, _, _)) in enumerate(zip(face_locations, matches))
+            if name == "Unknown"
+        }
+        results.append((index, face_locations, face_encodings, matches, crops))
+        index += 1
+    cap.release()
+    return results
+
+# Function to expand files, directories of footage and stream URLs into video sources
+def find_video_sources(paths):
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, filenames in sorted(os.walk(path)):
+                for filename in sorted(filenames):
+                    if filename.lower().endswith(VIDEO_EXTENSIONS):
+                        sources.append(os.path.join(root, filename))
+        else:
+            sources.append(path)
+    return sources
+
+# Function to split a recording into frame ranges, streams are processed as one range
+def plan_video_chunks(source, chunk_frames):
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        return None
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    if os.path.isfile(source) and frames > 0:
+        return fps, frames, [(start, min(start + chunk_frames, frames)) for start in range(0, frames, chunk_frames)]
+    return fps, 0, [(0, None)]
+
+# Function to run recognition and records over recorded footage without cameras or windows.
+# Chunks of every file are recognized in parallel and then replayed in order through the same
+# presence and event logic as the live pipeline. Frame times count from start_time, or from
+# the file modification time minus its duration.
+def process_recordings(paths, role, known_faces_dir, start_time=None, workers=None,
+                       chunk_frames=None, frame_step=1):
+    workers = RECOGNITION_WORKERS if workers is None else workers
+    chunk_frames = BATCH_CHUNK_FRAMES if chunk_frames is None else chunk_frames
+    known_faces = load_known_faces(known_faces_dir)
+    sources = find_video_sources(paths)
+    if not sources:
+        print("No video files found.")
+        return
+
+    started = time.monotonic()
+    processed_frames = 0
+    events = 0
+    days = set()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_batch_worker, initargs=(known_faces,)) as pool:
+        jobs = []
+        for source in sources:
+            plan = plan_video_chunks(source, chunk_frames)
+            if plan is None:
+                print(f"Error: Could not open {source}")
+                continue
+            fps, frames, chunks = plan
+            begin = start_time
+            if begin is None:
+                begin = datetime.now()
+                if os.path.isfile(source):
+                    begin = datetime.fromtimestamp(os.path.getmtime(source)) - timedelta(seconds=frames / fps)
+            futures = [pool.submit(process_video_chunk, source, role, start, end, frame_step) for start, end in chunks]
+            jobs.append((source, fps, begin, futures))
+
+        # Events of all sources are merged and written in capture-time order
+        arrivals = []
+        for source, fps, begin, futures in jobs:
+            presence = PresenceTracker()
+            for future in futures:
+                for index, face_locations, face_encodings, matches, crops in future.result():
+                    processed_frames += 1
+                    captured_at = begin + timedelta(seconds=index / fps)
+                    for i in presence_arrivals(presence, captured_at, face_encodings, matches):
+                        frame, box = None, face_locations[i]
+                        if i in crops:
+                            frame = crops[i]
+                            box = (0, frame.shape[1], frame.shape[0], 0)
+                        arrivals.append((captured_at, len(arrivals), source, matches[i], frame, box, face_encodings[i]))
+            print(f"Processed {source}")
+
+    for captured_at, _, source, (name, designation, distance), frame, box, face_encoding in sorted(arrivals, key=lambda a: a[:2]):
+        handle_presence_event(frame, source, role, captured_at, name, designation, box, face_encoding, distance, replayed=True)
+        events += 1
+        days.add(captured_at.date())
+
+    close_snapshot_writer()
+    close_intruder_registry()
+    for day in sorted(days):
+        export_excel_report(datetime.combine(day, datetime.min.time()))
+    elapsed = time.monotonic() - started
+    print(f"Processed {processed_frames} frames from {len(jobs)} sources in {elapsed:.1f}s "
+          f"({processed_frames / max(elapsed, 1e-6):.1f} fps), {events} presence events")
+
+# Class to replay a list of frames like a camera at a fixed frame rate, used for benchmarks.
+# Like cv2.VideoCapture, grab waits for the next frame and retrieve returns it.
+class LoopingCapture:
+    def __init__(self, frames, fps):
+        self.frames = frames
+        self.interval = 1.0 / fps
+        self.position = 0
+        self.next_frame = time.monotonic()
+
+    def grab(self):
+        delay = self.next_frame - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self.next_frame = max(self.next_frame + self.interval, time.monotonic() - self.interval)
+        self.position += 1
+        return True
+
+    def retrieve(self):
+        return True, self.frames[(self.position - 1) % len(self.frames)].copy()
+
+    def read(self):
+        self.grab()
+        return self.retrieve()
+
+    def isOpened(self):
+        return True
+
+    def release(self):
+        pass
+
+# Function to load benchmark frames from a recording, or to synthesize frames that contain
+# the enrolled face images when no recording is given
+def load_benchmark_frames(video_path, resolution, known_faces_dir, count=None):
+    count = BENCHMARK_FRAMES if count is None else count
+    frames = []
+    if video_path:
+        cap = cv2.VideoCapture(video_path)
+        while len(frames) < count:
             ret, frame = cap.read()
             if not ret:
-                print(f"Error: Failed to capture frame from {role}. VideoCapture status:", cap.isOpened())
-                continue
+                break
+            frames.append(frame)
+        cap.release()
+        if not frames:
+            print(f"Error: No frames could be read from {video_path}")
+        return frames
 
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            face_locations = face_recognition.face_locations(rgb_frame)
-            face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
-
-            for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
-                name, designation = recognize_face(face_encoding, known_face_encodings, known_face_names, known_face_designations)
-                cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
-                cv2.putText(frame, f"{name} ({designation})", (left + 6, bottom - 6), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
-
-                now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-                if role == "entry gate" and name != "Unknown":
-                    update_entry_exit_records(name, designation, now)
-                elif role == "exit gate" and name != "Unknown":
-                    update_entry_exit_records(name, designation, None, now)
-                elif role == "restricted area":
-                    if name == "Unknown" or not restricted_area_access.get(designation.lower(), False):
-                        print(f"Warning: Unauthorized access attempt by {name} ({designation})")
-                        play_warning(f"You are unauthorized to enter this section, {name}")
-                if name == "Unknown" and not any(face_recognition.compare_faces([data[0] for data in intruder_data], face_encoding)):
-                    save_intruder_face(frame, top, right, bottom, left, face_encoding)
-                    play_warning("Intruder Detected")
-            window_name = f'Face Recognition - {role}'
-            cv2.imshow(window_name, frame)
+    width, height = resolution
+    faces = []
+    for category in FACE_CATEGORIES:
+        category_dir = os.path.join(known_faces_dir, category)
+        if os.path.isdir(category_dir):
+            for filename in sorted(os.listdir(category_dir))[:4 - len(faces)]:
+                image = cv2.imread(os.path.join(category_dir, filename))
+                if image is not None:
+                    faces.append(cv2.resize(image, (height // 3, height // 3)))
 
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            for cap, _ in caps:
-                cap.release()
-            cv2.destroyAllWindows()
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    for i in range(count):
+        frame = background.copy()
+        for j, face in enumerate(faces):
+            x = (j * width // max(len(faces), 1) + i * 4) % (width - face.shape[1])
+            y = height // 3
+            frame[y:y + face.shape[0], x:x + face.shape[1]] = face
+        frames.append(frame)
+    return frames
+
+# Function to return the peak resident memory of this process in MB (None where unsupported)
+def peak_memory_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+# Function to benchmark the live pipeline without cameras. Every roster size and camera count
+# runs the real capture, recognition, matching, records and alert path for `duration` seconds
+# on replayed frames, and the per-stage latency percentiles, FPS per camera and memory usage
+# are printed and optionally written to a JSON file.
+def run_benchmark(roster_sizes=(100, 1000, 10000), camera_counts=(1, 2, 4), duration=20, video_path=None,
+                  fps=25, resolution=(1280, 720), role="entry gate", known_faces_dir='known_faces', output=None,
+                  gated=False):
+    frames = load_benchmark_frames(video_path, resolution, known_faces_dir)
+    if not frames:
+        return None
+
+    # Records, intruders, snapshots, alerts and metrics of the benchmark go to a temporary
+    # directory. Unless gated is set, motion gating, tracking and load shedding are off so
+    # every frame is detected and encoded.
+    temp_dir = tempfile.mkdtemp(prefix="campus-guardian-benchmark-")
+    overrides = {
+        "record_store": SQLiteRecordStore(os.path.join(temp_dir, "records.db")),
+        "alert_dispatcher": AlertDispatcher([]),
+        "intruder_registry": None,
+        "snapshot_writer": None,
+        "pipeline_metrics": PipelineMetrics(),
+        "INTRUDER_DIR": os.path.join(temp_dir, "intruder"),
+        "METRICS_FILE": os.path.join(temp_dir, "metrics.json")
+    }
+    if not gated:
+        overrides.update(MOTION_GATING=False, TRACKING_MODE=False, LOAD_SHEDDING=False)
+    saved = {name: globals()[name] for name in overrides}
+    globals().update(overrides)
+    alert_dispatcher.start()
+
+    start = time.perf_counter()
+    known_encodings, known_names, known_designations = load_known_faces(known_faces_dir)
+    load_seconds = time.perf_counter() - start
+
+    report = {
+        "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "workers": RECOGNITION_WORKERS,
+        "source": video_path or "synthetic",
+        "resolution": list(frames[0].shape[1::-1]),
+        "camera_fps": fps,
+        "motion_gating": MOTION_GATING,
+        "tracking_mode": TRACKING_MODE,
+        "load_shedding": LOAD_SHEDDING,
+        "load_known_faces_ms": round(load_seconds * 1000, 3),
+        "runs": []
+    }
+    rng = np.random.default_rng(0)
+    try:
+        for roster_size in roster_sizes:
+            padding = max(0, roster_size - len(known_encodings))
+            matcher = FaceMatcher(
+                np.vstack([np.asarray(known_encodings).reshape(-1, ENCODING_SIZE),
+                           rng.normal(0, 0.09, (padding, ENCODING_SIZE))]),
+                list(known_names) + [f"benchmark-{i}" for i in range(padding)],
+                list(known_designations) + ["Student"] * padding)
+
+            for camera_count in camera_counts:
+                stage_timer.drain()
+                readers = []
+                for i in range(camera_count):
+                    reader = CameraReader(LoopingCapture(frames, fps), role)
+                    reader.name = f"{role} #benchmark-{i}"
+                    reader.start()
+                    readers.append(reader)
+                presence_trackers = {reader.name: PresenceTracker() for reader in readers}
+
+                def handle_faces(frame, camera, role, captured_at, face_locations, face_encodings, matches=None):
+                    return handle_recognized_faces(frame, camera, role, captured_at, face_locations, face_encodings,
+                                                   matcher, presence_trackers[camera], matches)
+
+                run_camera_pipeline(readers, handle_faces, 'Benchmark', matcher, display=False, duration=duration)
+
+                run = {
+                    "roster_size": len(matcher),
+                    "cameras": camera_count,
+                    "duration_s": duration,
+                    "stages": stage_timer.summary(),
+                    "cameras_detail": [{
+                        "camera": reader.name,
+                        "capture_fps": round(reader.captured / duration, 2),
+                        "processed_fps": round(reader.processed / duration, 2),
+                        "dropped": reader.dropped
+                    } for reader in readers],
+                    "peak_memory_mb": peak_memory_mb()
+                }
+                report["runs"].append(run)
+                processed_fps = np.mean([camera["processed_fps"] for camera in run["cameras_detail"]])
+                latency = run["stages"].get("latency", {})
+                print(f"roster {run['roster_size']:>7}  cameras {camera_count:>2}  "
+                      f"{processed_fps:6.2f} fps/camera  latency p50 {latency.get('p50_ms', 0):8.1f} ms  "
+                      f"p95 {latency.get('p95_ms', 0):8.1f} ms  memory {run['peak_memory_mb']} MB")
+                for stage, stats in sorted(run["stages"].items()):
+                    print(f"    {stage:>9}: n={stats['count']:<6} p50 {stats['p50_ms']:9.3f} ms  "
+                          f"p95 {stats['p95_ms']:9.3f} ms  p99 {stats['p99_ms']:9.3f} ms")
+    finally:
+        alert_dispatcher.stop()
+        record_store.conn.close()
+        close_snapshot_writer()
+        close_intruder_registry()
+        globals().update(saved)
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Benchmark results written to {output}")
+    return report
+
+# Function to turn a camera source given as text into a device index, stream URL or file path
+def parse_camera_source(source):
+    source = str(source).strip()
+    return int(source) if source.isdigit() else source
+
+# Function to open a camera source and read one frame, returns its description or None
+def probe_camera(source):
+    cap = cv2.VideoCapture(source)
+    try:
+        ret, frame = cap.read() if cap.isOpened() else (False, None)
+        if not ret:
+            return None
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        return {"source": source, "width": frame.shape[1], "height": frame.shape[0],
+                "fps": round(fps, 1) if fps and fps > 0 else None}
+    finally:
+        cap.release()
+
+# Function to probe camera sources in parallel. Every source gets its own daemon thread, so a
+# backend that blocks on a missing device is abandoned after the timeout instead of stalling.
+def probe_cameras(sources, timeout=None):
+    timeout = CAMERA_PROBE_TIMEOUT if timeout is None else timeout
+    results = {}
+
+    def probe(source):
+        try:
+            results[source] = probe_camera(source)
+        except Exception:
+            results[source] = None
+
+    threads = [threading.Thread(target=probe, args=(source,), daemon=True, name=f"probe {source}") for source in sources]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + timeout
+    for source, thread in zip(sources, threads):
+        thread.join(max(0, deadline - time.monotonic()))
+        if thread.is_alive():
+            print(f"Warning: Camera {source} did not respond within {timeout} seconds.")
+    return [results[source] for source in sources if results.get(source)]
+
+# Class to keep the camera inventory and the camera setup across runs. Loading it restores
+# camera_roles and restricted_area_access; devices are only probed when nothing is cached or
+# a refresh is asked for.
+class CameraInventory:
+    def __init__(self, path=None):
+        path = CAMERA_CONFIG_FILE if path is None else path
+        self.path = path
+        self.devices = []
+        self.sources = []
+        self.probed_at = None
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                config = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error: Could not read {self.path}: {e}")
             return
+        self.devices = config.get("devices", [])
+        self.sources = config.get("sources", [])
+        self.probed_at = config.get("probed_at")
+        for role in camera_roles:
+            camera_roles[role] = list(config.get("camera_roles", {}).get(role, []))
+        restricted_area_access.update(config.get("restricted_area_access", {}))
 
-# Function to detect available cameras
-def detect_cameras():
-    index = 0
-    arr = []
-    while True:
-        cap = cv2.VideoCapture(index)
-        if not cap.isOpened():  
-            # If the camera is not opened and the index is 0, it means no cameras are available
-            if index == 0:
-                print("No cameras detected.")
-            break
-        else:
-            arr.append(index)
-            cap.release()
-        index += 1
-    return arr
+    def save(self):
+        with open(self.path + ".tmp", 'w') as f:
+            json.dump({
+                "devices": self.devices,
+                "sources": self.sources,
+                "probed_at": self.probed_at,
+                "camera_roles": camera_roles,
+                "restricted_area_access": restricted_area_access
+            }, f, indent=2)
+        os.replace(self.path + ".tmp", self.path)
+
+    # Function to return the known devices, probing them first if there are none or on refresh.
+    # Devices owned by a running camera service are in use and are not probed again.
+    def discover(self, refresh=False):
+        if self.devices and not refresh:
+            return self.devices
+        sources = list(range(CAMERA_PROBE_INDICES)) + [source for source in self.sources if source not in range(CAMERA_PROBE_INDICES)]
+        known = {device["source"]: device for device in self.devices}
+        probed = {device["source"]: device for device in probe_cameras([source for source in sources if source not in camera_services])}
+        self.devices = [probed.get(source) or known.get(source, {"source": source}) for source in sources
+                        if source in probed or source in camera_services]
+        self.probed_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.save()
+        return self.devices
+
+    # Function to add a stream URL or video file to the sources that are probed
+    def add_source(self, source):
+        source = parse_camera_source(source)
+        if source not in self.sources:
+            self.sources.append(source)
+        return source
+
+    # Function to describe a source with its resolution and frame rate
+    def describe(self, source):
+        for device in self.devices:
+            if device["source"] == source and device.get("width"):
+                fps = f" @ {device['fps']} fps" if device.get("fps") else ""
+                return f"Camera {source} ({device['width']}x{device['height']}{fps})"
+        return f"Camera {source}"
+
+camera_inventory = None
+
+# Function to return the camera inventory, loaded from CAMERA_CONFIG_FILE on first use
+def get_camera_inventory():
+    global camera_inventory
+    if camera_inventory is None:
+        camera_inventory = CameraInventory()
+    return camera_inventory
+
+# Function to detect available cameras, from the cached inventory unless refresh is set
+def detect_cameras(refresh=False):
+    devices = get_camera_inventory().discover(refresh)
+    if not devices:
+        print("No cameras detected.")
+    return [device["source"] for device in devices]
+
+# Function to print the camera inventory and role assignments
+def show_cameras(refresh=False, add_sources=()):
+    inventory = get_camera_inventory()
+    for source in add_sources:
+        inventory.add_source(source)
+    devices = inventory.discover(refresh or bool(add_sources))
+    print(f"{len(devices)} cameras (probed {inventory.probed_at})")
+    for device in devices:
+        roles = [role for role, sources in camera_roles.items() if device["source"] in sources]
+        print(f"  {inventory.describe(device['source'])}: {', '.join(roles) or 'unassigned'}")
 
 # Function to add a new face
 def add_face(known_faces_dir):
@@ -285,10 +3574,13 @@ def add_face(known_faces_dir):
   
     for i, cam in enumerate(available_cameras):
         #print(f"{i + 1}. Camera {cam}")
-        print_centered_text(f"{i + 1}. Camera {cam}")
+        print_centered_text(f"{i + 1}. {get_camera_inventory().describe(cam)}")
                             
     cam_index = int(input("Select camera number to capture new face: ")) - 1
-    cap = cv2.VideoCapture(available_cameras[cam_index])
+    if available_cameras[cam_index] in camera_services:
+        cap = BusCapture(camera_services[available_cameras[cam_index]][2])
+    else:
+        cap = cv2.VideoCapture(available_cameras[cam_index])
 
     print("Press 'c' to capture a face for a new entry.")
     while True:
@@ -334,6 +3626,8 @@ def add_face(known_faces_dir):
     filename = f"{face_name}.jpg"
     filepath = os.path.join(category_dir, filename)
     cv2.imwrite(filepath, frame)
+    update_encoding_cache(known_faces_dir, filepath)
+    notify_roster_change(filepath)
     print(f"Face for {face_name} saved at {filepath}")
 
 # Function to delete a face
@@ -371,8 +3665,18 @@ def delete_face(known_faces_dir):
     face_index = int(input("Enter the number corresponding to the face to delete: ")) - 1
     face_name = os.path.splitext(faces[face_index])[0]
     filepath = os.path.join(category_dir, f"{face_name}.jpg")
-    if os.path.exists(filepath):
+    person_dir = os.path.join(category_dir, faces[face_index])
+    if os.path.isdir(person_dir):
+        # A person enrolled with several reference images is deleted with all of them
+        image_paths = [os.path.join(person_dir, filename) for filename in os.listdir(person_dir)]
+        shutil.rmtree(person_dir)
+        update_encoding_cache(known_faces_dir, *image_paths)
+        notify_roster_change(*image_paths)
+        print(f"Face {face_name} deleted ({len(image_paths)} images).")
+    elif os.path.exists(filepath):
         os.remove(filepath)
+        update_encoding_cache(known_faces_dir, filepath)
+        notify_roster_change(filepath)
         print(f"Face {face_name} deleted.")
     else:
         print(f"Face {face_name} not found in category {category}.")
@@ -382,7 +3686,9 @@ def delete_face(known_faces_dir):
 def assign_camera():
     for key in camera_roles:
         camera_roles[key] = []
-    available_cameras = detect_cameras()
+    stop_camera_services()
+    rescan = input("Scan for cameras again? (y/N): ").strip().lower() == 'y'
+    available_cameras = detect_cameras(rescan)
     
     if not available_cameras:
         print("No cameras detected. Please connect a camera.")
@@ -408,7 +3714,7 @@ def assign_camera():
         os.system('cls')
         print_centered_text(art)
         print("\n")
-        print_centered_text(f"Assign a role to camera {available_cameras[i]}")
+        print_centered_text(f"Assign a role to {get_camera_inventory().describe(available_cameras[i])}")
         print_centered_text("1. Entry Gate     ")
         print_centered_text("2. Exit Gate      ")
         print_centered_text("3. Restricted Area")
@@ -421,6 +3727,7 @@ def assign_camera():
             print("Invalid choice. Please try again.")
             time.sleep(1.5)
             assign_camera()
+            return
         
         if role == 3:
             os.system('cls')
@@ -435,79 +3742,223 @@ def assign_camera():
             access = access_info.split()
             access_map = {1: "student", 2: "admin", 3: "teacher", 4: "guest"}
             for j in range(1, 5):
-                restricted_area_access[access_map[i]] = str(i) in access
+                restricted_area_access[access_map[j]] = str(j) in access
 
         role_name = role_map[role]
         camera_roles[role_name].append(available_cameras[i])
         print(f"Camera {available_cameras[i]} assigned to {role_name}")
+    get_camera_inventory().save()
+
+# Class to track many identities across all cameras at once. It subscribes to the recognition
+# pass, keeps the last camera, time and box of every watched identity and only reports a
+# sighting when the identity shows up at a different camera. Last known locations are kept in
+# WATCHLIST_FILE so "where is X" can be answered without opening cameras.
+class Watchlist:
+    def __init__(self, path=None):
+        path = WATCHLIST_FILE if path is None else path
+        self.path = path
+        self.identities = set()
+        self.last_seen = {}
+        self.lock = threading.Lock()
+        self.last_save = 0
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            print("Watchlist file is unreadable, starting an empty watchlist.")
+            return
+        self.identities = {tuple(identity) for identity in data["identities"]}
+        self.last_seen = {(entry["name"], entry["designation"]): entry for entry in data["last_seen"]}
+
+    def save(self):
+        self.last_save = time.monotonic()
+        with self.lock:
+            data = {"identities": sorted(self.identities), "last_seen": list(self.last_seen.values())}
+        with open(self.path + ".tmp", 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(self.path + ".tmp", self.path)
+
+    def add(self, name, designation):
+        self.identities.add((name, designation))
+        self.save()
+
+    def clear(self):
+        self.identities = set()
+        self.save()
+
+    # Function to take the recognition results of a frame, used as a recognition subscriber.
+    # The file is written when someone moves to another camera and every WATCHLIST_SAVE_SECONDS
+    # while tracked people are in view, so "where is" sees the last time they were seen.
+    def observe(self, frame, camera, role, captured_at, face_locations, face_encodings, matches):
+        moved = []
+        seen = False
+        for (top, right, bottom, left), (name, designation, _) in zip(face_locations, matches):
+            key = (name, designation)
+            if key not in self.identities:
+                continue
+            seen = True
+            # The mosaic draws tracked people itself when it is redrawn
+            if DISPLAY_MODE == "windows":
+                cv2.rectangle(frame, (left, top), (right, bottom), (0, 0, 255), 2)
+            with self.lock:
+                previous = self.last_seen.get(key)
+                self.last_seen[key] = {
+                    "name": name,
+                    "designation": designation,
+                    "camera": camera,
+                    "role": role,
+                    "time": captured_at.strftime("%Y-%m-%d %H:%M:%S"),
+                    "box": [top, right, bottom, left]
+                }
+            if previous is None or previous["camera"] != camera:
+                moved.append((name, role, camera))
+
+        for name, role, camera in moved:
+            print(f"{name} located at {role}")
+            play_warning(f"{name} located at {role}", camera, ALERT_PRIORITY_LOW)
+        if moved or (seen and time.monotonic() - self.last_save >= WATCHLIST_SAVE_SECONDS):
+            self.save()
+
+    # Function to return the last known locations of everyone whose name contains the query
+    def where_is(self, query):
+        with self.lock:
+            return [entry for key, entry in sorted(self.last_seen.items()) if query.lower() in key[0].lower()]
+
+watchlist = None
+
+# Function to return the watchlist, loaded on first use
+def get_watchlist():
+    global watchlist
+    if watchlist is None:
+        watchlist = Watchlist()
+    return watchlist
+
+# Function to print where a person was seen last, without opening any camera
+def where_is(query):
+    entries = get_watchlist().where_is(query)
+    if not entries:
+        print(f"No sightings of {query}.")
+    for entry in entries:
+        print(f"{entry['name']} ({entry['designation']}) last seen at {entry['role']} ({entry['camera']}) on {entry['time']}")
+    return entries
 
 def track_person(known_faces_dir):
     known_face_encodings, known_face_names, known_face_designations = load_known_faces(known_faces_dir)
+    people = sorted(set(zip(known_face_names, known_face_designations)))
     os.system('cls')
     print_centered_text(art)
     print("\n")
     print_centered_text("Available Faces to Track ")
-    av=1
-    for i, name in enumerate(known_face_names):
-        print_centered_text(f"{i + 1}. {name} ({known_face_designations[i]})")
-        av+=i
-    print_centered_text(f"{av+1}. Back to Main Menu")
-    
-    person_index = int(input("Enter the number corresponding to the person to track: ")) - 1
+    for i, (name, designation) in enumerate(people):
+        print_centered_text(f"{i + 1}. {name} ({designation})")
+    print_centered_text(f"{len(people) + 1}. Back to Main Menu")
+
+    selection = input("Enter the numbers of the people to track separated by space: ").split()
     print()
-    if person_index < 0 or person_index >= len(known_face_encodings):
+    try:
+        person_indices = [int(number) - 1 for number in selection]
+    except ValueError:
+        person_indices = [-1]
+    if len(people) in person_indices:
+        return
+    if not person_indices or any(i < 0 or i >= len(people) for i in person_indices):
         print("Invalid selection.")
         time.sleep(1.5)
-        track_person()
-
-    person_encoding = known_face_encodings[person_index]
-    person_name = known_face_names[person_index]
+        return track_person(known_faces_dir)
 
-    caps = []
-    for role, indices in camera_roles.items():
-        for index in indices:
-            cap = cv2.VideoCapture(index)
-            if cap.isOpened():
-                caps.append((cap, role))
-
-    if not caps:
+    if not any(camera_roles.values()):
         print("No cameras assigned. Please assign cameras before tracking a person.")
         time.sleep(3)
         return
 
-    while True:
-        found = False
-        for cap, role in caps:
-            ret, frame = cap.read()
-            if not ret:
-                print(f"Error: Failed to capture frame from {role}. VideoCapture status:", cap.isOpened())
-                time.sleep(2)
-                continue
+    tracked = get_watchlist()
+    tracked.clear()
+    for i in person_indices:
+        tracked.add(*people[i])
+        where_is(people[i][0])
 
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            face_locations = face_recognition.face_locations(rgb_frame)
-            face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
+    # Tracking subscribes to the recognition pass instead of detecting faces again
+    start_face_recognition(camera_roles, known_faces_dir, (known_face_encodings, known_face_names, known_face_designations),
+                           [tracked.observe], 'Track Person')
+
+# Function to read the service configuration. "settings" overrides module settings by name
+# (e.g. "RECOGNITION_WORKERS"); settings used as defaults are looked up when a function is
+# called, not bound when it is defined, so every override takes effect. "camera_roles" and
+# "restricted_area_access" replace the saved camera setup from cameras.json.
+def load_service_config(path):
+    config = {}
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            config = json.load(f)
+    else:
+        print(f"No service configuration at {path}, using defaults.")
+    for name, value in config.get("settings", {}).items():
+        if name.isupper() and name in globals():
+            globals()[name] = value
+        else:
+            print(f"Warning: Unknown setting {name} in {path}")
+    get_camera_inventory()
+    if "camera_roles" in config:
+        for role in camera_roles:
+            camera_roles[role] = list(config["camera_roles"].get(role, []))
+    restricted_area_access.update(config.get("restricted_area_access", {}))
+    return config
 
-            for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
-                matches = face_recognition.compare_faces([person_encoding], face_encoding)
-                if True in matches:
-                    cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
-                    cv2.putText(frame, f"{person_name}", (left + 6, bottom - 6), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
-                    print(f"{person_name} located at {role}")
+# Function to run recognition as a long-lived service without the password prompt or menu.
+# The encoding cache is used as it is on disk and reconciled with known_faces/ in the
+# background after the first frame; the time to the first processed frame is printed and
+# appended to STARTUP_LOG_FILE.
+def run_service(config_path=SERVICE_CONFIG_FILE):
+    timings = {"imports": time.perf_counter() - STARTED_AT}
+    service_pid = os.getpid()
 
-                    play_warning(f"{person_name} located at {role}")
+    # SIGTERM stops the service like Ctrl+C; worker and camera processes inherit the handler
+    # and exit quietly, releasing their camera and shared memory on the way out
+    def terminate(signum, frame):
+        if os.getpid() == service_pid:
+            raise KeyboardInterrupt
+        sys.exit(0)
 
-                    found = True
-                    break
+    signal.signal(signal.SIGTERM, terminate)
 
-            window_name = f'Track Person - {role}'
-            cv2.imshow(window_name, frame)
+    config = load_service_config(config_path)
+    known_faces_dir = config.get("known_faces_dir", "known_faces")
+    timings["config"] = time.perf_counter() - STARTED_AT
 
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            for cap, _ in caps:
-                cap.release()
-            cv2.destroyAllWindows()
-            break
+    with encoding_cache_lock(known_faces_dir):
+        matrix, entries = load_encoding_cache(known_faces_dir)
+    known_faces = known_faces_from_cache(matrix, entries) if entries else load_known_faces(known_faces_dir)
+    timings["cache"] = time.perf_counter() - STARTED_AT
+
+    def first_frame(*args):
+        if "first_frame" in timings:
+            return
+        timings["first_frame"] = time.perf_counter() - STARTED_AT
+        print("Startup: " + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items()))
+        with open(STARTUP_LOG_FILE, 'a') as f:
+            f.write(json.dumps(dict({"time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "known_faces": len(known_faces[0])},
+                                    **{stage: round(seconds, 3) for stage, seconds in timings.items()})) + "\n")
+        # Images changed while the service was down are picked up by the roster watcher
+        notify_roster_change(*[os.path.join(known_faces_dir, *key.split("/"))
+                               for key in set(scan_face_images(known_faces_dir)) | set(entries)])
+
+    print(f"Campus Guardian service: {len(known_faces[0])} known faces, "
+          f"{sum(len(sources) for sources in camera_roles.values())} cameras")
+    try:
+        start_face_recognition(camera_roles, known_faces_dir, known_faces, [first_frame],
+                               display=config.get("display", False))
+    except KeyboardInterrupt:
+        print("Stopping service.")
+        export_excel_report()
+    finally:
+        stop_camera_services()
+        if alert_dispatcher is not None:
+            alert_dispatcher.stop()
 
 PASSWORD_FILE = "admin_password.hash"
 
@@ -562,7 +4013,8 @@ def change_password():
 
 
 def main_menu():
-    
+    # Restore the camera setup of the last run
+    get_camera_inventory()
     while True:
         os.system('color 2')
         os.system('cls')
@@ -575,7 +4027,9 @@ def main_menu():
         print_centered_text("4. Start Face Recognition")
         print_centered_text("5. Track Person          ")
         print_centered_text("6. Change Admin Password ")
-        print_centered_text("7. Exit                  ")
+        print_centered_text("7. Export Today's Report ")
+        print_centered_text("8. Where Is Person       ")
+        print_centered_text("9. Exit                  ")
         print()
         choice = input("Enter your choice: ")
         
@@ -586,9 +4040,9 @@ def main_menu():
         elif choice == '3':
             assign_camera()
         elif choice == '4':
-            known_face_encodings, known_face_names, known_face_designations = load_known_faces('known_faces')
-            if known_face_encodings:
-                start_face_recognition(camera_roles, 'known_faces')
+            known_faces = load_known_faces('known_faces')
+            if len(known_faces[0]):
+                start_face_recognition(camera_roles, 'known_faces', known_faces)
             else:
                 print_centered_text("No known faces loaded. Please add faces before starting face recognition.")
         elif choice == '5':
@@ -596,6 +4050,13 @@ def main_menu():
         elif choice == '6':
             change_password()
         elif choice == '7':
+            export_excel_report()
+            time.sleep(1.5)
+        elif choice == '8':
+            where_is(input("Enter the name to look up: "))
+            input("Press Enter to return to the main menu.")
+        elif choice == '9':
+            stop_camera_services()
             os.system('exit')
             break
             
@@ -603,5 +4064,88 @@ def main_menu():
             print("Invalid choice. Please try again.")
 
 if __name__ == "__main__":
-    if verify_password():
+    parser = argparse.ArgumentParser(description="Campus Guardian face recognition attendance system")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("benchmark-matcher", help="measure per-frame face matching cost for 100, 10k and 100k identities")
+    benchmark_parser = commands.add_parser("benchmark", help="profile the recognition pipeline on synthetic or recorded frames")
+    benchmark_parser.add_argument("--video", help="recorded video to replay (default: synthetic frames with the enrolled faces)")
+    benchmark_parser.add_argument("--rosters", default="100,1000,10000", help="comma-separated roster sizes")
+    benchmark_parser.add_argument("--cameras", default="1,2,4", help="comma-separated camera counts")
+    benchmark_parser.add_argument("--duration", type=float, default=20, help="seconds per run")
+    benchmark_parser.add_argument("--fps", type=float, default=25, help="frame rate of each simulated camera")
+    benchmark_parser.add_argument("--role", default="entry gate", choices=list(camera_roles), help="camera role of the simulated cameras")
+    benchmark_parser.add_argument("--output", help="write machine-readable results to this JSON file")
+    benchmark_parser.add_argument("--gated", action="store_true",
+                                  help="keep motion gating, tracking mode and load shedding as configured (default: detect every frame)")
+    tracking_parser = commands.add_parser("benchmark-tracking", help="compare per-frame recognition with tracking mode on a recorded video")
+    tracking_parser.add_argument("video", help="path of the recorded video")
+    tracking_parser.add_argument("--role", default="entry gate", choices=list(camera_roles), help="camera role whose detection settings are used")
+    batch_parser = commands.add_parser("batch", help="run recognition and records over recorded video files, directories or stream URLs")
+    batch_parser.add_argument("paths", nargs="+", help="video files, directories of footage or stream URLs")
+    batch_parser.add_argument("--role", default="entry gate", choices=list(camera_roles), help="camera role the footage was recorded at")
+    batch_parser.add_argument("--start-time", help="capture time of the first frame as YYYY-MM-DD HH:MM:SS (default: file mtime minus duration)")
+    batch_parser.add_argument("--workers", type=int, default=RECOGNITION_WORKERS, help="number of worker processes")
+    batch_parser.add_argument("--chunk-frames", type=int, default=BATCH_CHUNK_FRAMES, help="frames per parallel chunk")
+    batch_parser.add_argument("--frame-step", type=int, default=1, help="process every Nth frame")
+    batch_parser.add_argument("--known-faces", default="known_faces", help="known faces directory")
+    where_parser = commands.add_parser("where-is", help="show where a tracked person was seen last")
+    where_parser.add_argument("name", help="name (or part of it) to look up")
+    import_parser = commands.add_parser("import-faces", help="enroll face images in bulk from a directory or CSV manifest")
+    import_parser.add_argument("source", help="directory laid out like known_faces, or CSV manifest with path, name and category columns")
+    import_parser.add_argument("--category", choices=FACE_CATEGORIES, help="category of every image (source then holds <name>.jpg files and <name>/ directories)")
+    import_parser.add_argument("--workers", type=int, default=RECOGNITION_WORKERS, help="number of worker processes")
+    import_parser.add_argument("--report", help="write images that could not be enrolled to this CSV file")
+    import_parser.add_argument("--known-faces", default="known_faces", help="known faces directory")
+    export_parser = commands.add_parser("export-report", help="write the Excel entry/exit report of a day from the records store")
+    export_parser.add_argument("--date", help="day to export as DD-MM-YYYY (default: today)")
+    attendance_parser = commands.add_parser("attendance-report", help="summarize time on campus, first in/last out and headcount over a date range")
+    attendance_parser.add_argument("--from", dest="start", required=True, help="first day as DD-MM-YYYY")
+    attendance_parser.add_argument("--to", dest="end", help="last day as DD-MM-YYYY (default: today)")
+    attendance_parser.add_argument("--interval", default=HEADCOUNT_INTERVAL, help="headcount interval as a pandas frequency, e.g. 15min or 1h")
+    attendance_parser.add_argument("--output", help="write the report to this Excel file")
+    archive_parser = commands.add_parser("archive", help="compact finished days of the records store into the Parquet archive")
+    archive_parser.add_argument("--import-excel", nargs="+", metavar="PATH", help="also import existing entry_exit_records_*.xlsx files or directories")
+    archive_parser.add_argument("--from", dest="start", help="print archived events per day and role from this day (DD-MM-YYYY)")
+    archive_parser.add_argument("--to", dest="end", help="last day to print (default: today)")
+    cameras_parser = commands.add_parser("cameras", help="show the camera inventory and role assignments")
+    cameras_parser.add_argument("--probe", action="store_true", help="probe the devices again instead of using the cached inventory")
+    cameras_parser.add_argument("--add-source", nargs="+", default=[], metavar="SOURCE", help="add stream URLs or video files to the inventory")
+    serve_parser = commands.add_parser("serve", help="run recognition headless as a service, configured from a JSON file")
+    serve_parser.add_argument("--config", default=SERVICE_CONFIG_FILE, help="service configuration file")
+    args = parser.parse_args()
+
+    if args.command == "benchmark-matcher":
+        benchmark_matcher()
+    elif args.command == "benchmark":
+        run_benchmark([int(size) for size in args.rosters.split(",")], [int(count) for count in args.cameras.split(",")],
+                      args.duration, args.video, args.fps, role=args.role, output=args.output, gated=args.gated)
+    elif args.command == "benchmark-tracking":
+        benchmark_tracking(args.video, args.role)
+    elif args.command == "batch":
+        ALERT_SINKS = [sink for sink in ALERT_SINKS if sink != "tts"]
+        start_time = datetime.strptime(args.start_time, "%Y-%m-%d %H:%M:%S") if args.start_time else None
+        process_recordings(args.paths, args.role, args.known_faces, start_time, args.workers, args.chunk_frames, args.frame_step)
+    elif args.command == "where-is":
+        where_is(args.name)
+    elif args.command == "import-faces":
+        if import_faces(args.source, args.known_faces, args.category, args.workers, args.report) is None:
+            sys.exit(1)
+    elif args.command == "attendance-report":
+        attendance_report(datetime.strptime(args.start, "%d-%m-%Y"),
+                          datetime.strptime(args.end, "%d-%m-%Y") if args.end else datetime.now(),
+                          args.output, args.interval)
+    elif args.command == "archive":
+        if args.import_excel:
+            import_excel_records(args.import_excel)
+        archive_records()
+        if args.start:
+            show_archive(datetime.strptime(args.start, "%d-%m-%Y"),
+                         datetime.strptime(args.end, "%d-%m-%Y") if args.end else datetime.now())
+    elif args.command == "cameras":
+        show_cameras(args.probe, args.add_source)
+    elif args.command == "serve":
+        run_service(args.config)
+    elif args.command == "export-report":
+        export_excel_report(datetime.strptime(args.date, "%d-%m-%Y") if args.date else None)
+    elif verify_password():
         main_menu()
\ No newline at end of file
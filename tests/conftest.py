@@ -0,0 +1,16 @@
+import importlib.util
+import os
+
+import pytest
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Campus-Guardian.py")
+
+
+# Fixture to load Campus-Guardian.py as a module, so its classes and functions can be tested
+# without the menu or a camera
+@pytest.fixture(scope="session")
+def guardian():
+    spec = importlib.util.spec_from_file_location("campus_guardian", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
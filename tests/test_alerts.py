@@ -0,0 +1,49 @@
+def test_repeated_alerts_are_merged(guardian, monkeypatch):
+    monkeypatch.setattr(guardian, "ALERT_MESSAGE_INTERVAL", 60)
+    monkeypatch.setattr(guardian, "ALERT_CAMERA_INTERVAL", 0)
+    dispatcher = guardian.AlertDispatcher([], queue_size=4)
+
+    assert dispatcher.submit("Intruder Detected", "gate")
+    assert not dispatcher.submit("Intruder Detected", "gate")
+    assert dispatcher.queued["Intruder Detected"]["count"] == 2
+    assert len(dispatcher.queue) == 1
+
+
+def test_least_urgent_alert_is_dropped_when_full(guardian, monkeypatch):
+    monkeypatch.setattr(guardian, "ALERT_MESSAGE_INTERVAL", 0)
+    monkeypatch.setattr(guardian, "ALERT_CAMERA_INTERVAL", 0)
+    dispatcher = guardian.AlertDispatcher([], queue_size=2)
+
+    assert dispatcher.submit("low", priority=guardian.ALERT_PRIORITY_LOW)
+    assert dispatcher.submit("normal", priority=guardian.ALERT_PRIORITY_NORMAL)
+    assert dispatcher.submit("high", priority=guardian.ALERT_PRIORITY_HIGH)
+    assert not dispatcher.submit("another low", priority=guardian.ALERT_PRIORITY_LOW)
+
+    assert sorted(dispatcher.queued) == ["high", "normal"]
+    assert dispatcher.dropped == 2
+
+
+def test_low_priority_alert_does_not_hold_back_a_high_priority_one(guardian, monkeypatch):
+    monkeypatch.setattr(guardian, "ALERT_MESSAGE_INTERVAL", 0)
+    monkeypatch.setattr(guardian, "ALERT_CAMERA_INTERVAL", 60)
+    dispatcher = guardian.AlertDispatcher([], queue_size=4)
+
+    assert dispatcher.submit("Alice located at classroom", "lab-1", guardian.ALERT_PRIORITY_LOW)
+    assert dispatcher.submit("Intruder Detected", "lab-1", guardian.ALERT_PRIORITY_HIGH)
+    assert not dispatcher.submit("Bob located at classroom", "lab-1", guardian.ALERT_PRIORITY_LOW)
+    assert not dispatcher.submit("Unauthorized access", "lab-1", guardian.ALERT_PRIORITY_HIGH)
+    assert dispatcher.rate_limited == 2
+
+
+def test_rate_limited_alerts_are_exported(guardian, monkeypatch):
+    monkeypatch.setattr(guardian, "ALERT_MESSAGE_INTERVAL", 60)
+    dispatcher = guardian.AlertDispatcher([], queue_size=4)
+    monkeypatch.setattr(guardian, "alert_dispatcher", dispatcher)
+    dispatcher.submit("Intruder Detected", "gate")
+    # Once spoken, the same message is no longer merged but rate-limited
+    dispatcher.queued.clear()
+    dispatcher.submit("Intruder Detected", "gate")
+
+    snapshot = guardian.PipelineMetrics().snapshot([])
+    assert snapshot["alerts_rate_limited"] == 1
+    assert "campus_guardian_alerts_rate_limited_total 1" in guardian.PipelineMetrics.prometheus(snapshot).splitlines()
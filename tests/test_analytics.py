@@ -0,0 +1,64 @@
+from datetime import datetime
+
+import pandas as pd
+
+
+def events(rows):
+    return pd.DataFrame(
+        [(i, time[:10], kind, name, "Student", pd.Timestamp(time)) for i, (kind, name, time) in enumerate(rows)],
+        columns=["id", "day", "kind", "name", "designation", "time"])
+
+
+def test_pair_sessions(guardian):
+    sessions, unmatched_exits = guardian.pair_sessions(events([
+        ("entry", "Alice", "2026-10-01 08:00:00"),
+        ("exit", "Alice", "2026-10-01 12:00:00"),
+        ("entry", "Alice", "2026-10-01 13:00:00"),
+        ("exit", "Bob", "2026-10-01 10:00:00"),
+        ("exit", "Alice", "2026-10-01 17:30:00"),
+    ]))
+
+    alice = sessions[sessions["name"] == "Alice"]
+    assert list(alice["dwell"].dt.total_seconds() / 3600) == [4.0, 4.5]
+    assert list(unmatched_exits["name"]) == ["Bob"]
+
+
+def test_summarize_attendance(guardian):
+    sessions, _ = guardian.pair_sessions(events([
+        ("entry", "Alice", "2026-10-01 08:00:00"),
+        ("exit", "Alice", "2026-10-01 12:00:00"),
+        ("entry", "Alice", "2026-10-02 09:00:00"),
+        ("exit", "Alice", "2026-10-02 11:00:00"),
+    ]))
+    daily, summary = guardian.summarize_attendance(sessions)
+
+    assert list(daily["hours"]) == [4.0, 2.0]
+    row = summary.iloc[0]
+    assert (row["days"], row["hours"], row["mean_first_in"], row["mean_last_out"]) == (2, 6.0, "08:30", "11:30")
+
+
+def test_attendance_report_for_a_range_without_events(guardian, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = guardian.SQLiteRecordStore(str(tmp_path / "records.db"))
+    monkeypatch.setattr(guardian, "record_store", store)
+    try:
+        sessions, unmatched_exits = guardian.load_attendance(datetime(2020, 1, 1), datetime(2020, 1, 5))
+        assert sessions.empty and unmatched_exits.empty
+        summary = guardian.attendance_report(datetime(2020, 1, 1), datetime(2020, 1, 5))
+        assert summary.empty
+    finally:
+        store.conn.close()
+
+
+def test_summarize_attendance_counts_open_sessions_until_the_end_of_the_day(guardian):
+    sessions, _ = guardian.pair_sessions(events([
+        ("entry", "Alice", "2026-10-01 18:00:00"),
+        ("entry", "Bob", "2026-10-01 08:00:00"),
+        ("exit", "Bob", "2026-10-01 10:00:00"),
+        ("entry", "Bob", "2026-10-01 22:00:00"),
+    ]))
+    daily, summary = guardian.summarize_attendance(sessions)
+
+    hours = dict(zip(daily["name"], daily["hours"]))
+    assert hours == {"Alice": 6.0, "Bob": 4.0}
+    assert list(summary.set_index("name").loc[["Alice", "Bob"], "hours"]) == [6.0, 4.0]
@@ -0,0 +1,56 @@
+import os
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture
+def store(guardian, tmp_path, monkeypatch):
+    # The store writes the Excel report of a day when the next day starts
+    monkeypatch.chdir(tmp_path)
+    store = guardian.SQLiteRecordStore(str(tmp_path / "records.db"))
+    store.record_entry("Alice", "Student", "2020-01-01 08:00:00")
+    store.record_exit("Alice", "Student", "2020-01-01 12:00:00")
+    store.record_entry("Bob", "Teacher", "2020-01-02 09:00:00")
+    yield store
+    store.conn.close()
+
+
+def test_finished_days_round_trip_through_the_archive(guardian, tmp_path, store):
+    archive = guardian.RecordsArchive(str(tmp_path / "archive"))
+    assert guardian.archive_records(store, archive) == 2
+
+    reloaded = guardian.RecordsArchive(str(tmp_path / "archive"))
+    events = reloaded.events(["2020-01-01", "2020-01-02"]).sort_values("time")
+    assert list(events["name"].astype(str)) == ["Alice", "Alice", "Bob"]
+    assert list(events["kind"].astype(str)) == ["entry", "exit", "entry"]
+    assert list(events["time"].astype(str)) == ["2020-01-01 08:00:00", "2020-01-01 12:00:00", "2020-01-02 09:00:00"]
+
+    names = reloaded.query("2020-01-02", "2020-01-02", columns=["name"])
+    assert list(names.columns) == ["name"] and list(names["name"].astype(str)) == ["Bob"]
+
+
+def test_only_changed_days_are_archived_again(guardian, tmp_path, store):
+    archive = guardian.RecordsArchive(str(tmp_path / "archive"))
+    guardian.archive_records(store, archive)
+    assert guardian.archive_records(store, archive) == 0
+
+    store.record_exit("Bob", "Teacher", "2020-01-02 17:00:00")
+    assert guardian.archive_records(store, archive) == 1
+    assert archive.days["2020-01-02"]["rows"] == 2
+    assert len(archive.events(["2020-01-02"])) == 2
+
+
+def test_archive_is_partitioned_by_day_and_filters_by_kind(guardian, tmp_path, store, capsys, monkeypatch):
+    archive = guardian.RecordsArchive(str(tmp_path / "archive"))
+    guardian.archive_records(store, archive)
+
+    assert sorted(os.listdir(tmp_path / "archive" / "day=2020-01-01")) == ["part-0.parquet"]
+    exits = archive.query("2020-01-01", "2020-01-02", columns=["name", "kind"], kinds=["exit"])
+    assert list(exits["name"].astype(str)) == ["Alice"]
+
+    monkeypatch.setattr(guardian, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    guardian.show_archive(datetime(2020, 1, 1), datetime(2020, 1, 2))
+    assert "entry" in capsys.readouterr().out
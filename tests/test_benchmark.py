@@ -0,0 +1,34 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+def test_benchmark_detects_every_frame_and_writes_nothing_outside_its_temp_dir(guardian, tmp_path, monkeypatch):
+    cwd = tmp_path / "cwd"
+    cwd.mkdir()
+    monkeypatch.chdir(cwd)
+    monkeypatch.setattr(guardian, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(guardian, "METRICS_INTERVAL", 0)
+    saved = {name: getattr(guardian, name) for name in
+             ("record_store", "intruder_registry", "snapshot_writer", "pipeline_metrics", "INTRUDER_DIR", "METRICS_FILE",
+              "MOTION_GATING", "TRACKING_MODE", "LOAD_SHEDDING")}
+    submitted = []
+
+    # Every frame shows the same stranger
+    def recognition_job(frame, tracked_boxes, settings):
+        submitted.append(frame)
+        return ([(0, 20, 20, 0)], [np.full(guardian.ENCODING_SIZE, 9.0)], [None], []), {}
+
+    monkeypatch.setattr(guardian, "recognition_job", recognition_job)
+
+    report = guardian.run_benchmark((100,), (1,), duration=0.5, fps=50, resolution=(64, 36),
+                                    known_faces_dir=str(tmp_path / "known_faces"))
+
+    assert os.listdir(cwd) == []
+    assert {name: getattr(guardian, name) for name in saved} == saved
+    assert (report["motion_gating"], report["tracking_mode"], report["load_shedding"]) == (False, False, False)
+    run = report["runs"][0]
+    assert len(submitted) >= run["cameras_detail"][0]["processed_fps"] * 0.5 > 0
+    # Frames arrive every 20 ms; the read stage only covers taking the frame
+    assert run["stages"]["read"]["p50_ms"] < 10
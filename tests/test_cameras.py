@@ -0,0 +1,43 @@
+import pytest
+
+
+# Fixture to give the inventory its own role assignments and a fake probe that counts calls
+@pytest.fixture
+def probes(guardian, monkeypatch):
+    probes = []
+
+    def probe_cameras(sources):
+        probes.append(list(sources))
+        return [{"source": source, "width": 640, "height": 480, "fps": 30.0} for source in sources
+                if source in (0, "rtsp://gate/stream")]
+
+    monkeypatch.setattr(guardian, "probe_cameras", probe_cameras)
+    monkeypatch.setattr(guardian, "CAMERA_PROBE_INDICES", 2)
+    monkeypatch.setattr(guardian, "camera_roles", {role: [] for role in guardian.camera_roles})
+    monkeypatch.setattr(guardian, "restricted_area_access", {})
+    return probes
+
+
+def test_parse_camera_source(guardian):
+    assert guardian.parse_camera_source(" 2 ") == 2
+    assert guardian.parse_camera_source("rtsp://gate/stream") == "rtsp://gate/stream"
+
+
+def test_inventory_is_probed_once_and_restored_with_the_roles(guardian, tmp_path, probes):
+    path = str(tmp_path / "cameras.json")
+    inventory = guardian.CameraInventory(path)
+    assert inventory.add_source("rtsp://gate/stream") == "rtsp://gate/stream"
+    assert [device["source"] for device in inventory.discover()] == [0, "rtsp://gate/stream"]
+    role = next(iter(guardian.camera_roles))
+    guardian.camera_roles[role].append("rtsp://gate/stream")
+    inventory.save()
+
+    guardian.camera_roles[role].clear()
+    reloaded = guardian.CameraInventory(path)
+    assert [device["source"] for device in reloaded.discover()] == [0, "rtsp://gate/stream"]
+    assert len(probes) == 1
+    assert guardian.camera_roles[role] == ["rtsp://gate/stream"]
+    assert reloaded.describe(0) == "Camera 0 (640x480 @ 30.0 fps)"
+
+    reloaded.discover(refresh=True)
+    assert probes[-1] == [0, 1, "rtsp://gate/stream"]
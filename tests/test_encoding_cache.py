@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+import pytest
+
+
+# Fixture to replace the face encoder with one that encodes an image as its file size
+@pytest.fixture
+def encoded(guardian, monkeypatch):
+    encoded = []
+
+    def encode_face_image(image_path):
+        encoded.append(os.path.basename(image_path))
+        return np.full(guardian.ENCODING_SIZE, float(os.path.getsize(image_path)))
+
+    monkeypatch.setattr(guardian, "encode_face_image", encode_face_image)
+    return encoded
+
+
+def write_image(path, size):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+
+
+def test_unchanged_images_are_not_encoded_again(guardian, tmp_path, encoded):
+    write_image(tmp_path / "students" / "Alice.jpg", 10)
+    write_image(tmp_path / "teachers" / "Bob.jpg", 20)
+
+    _, names, designations = guardian.load_known_faces(str(tmp_path))
+    assert sorted(zip(names, designations)) == [("Alice", "Student"), ("Bob", "Teacher")]
+    assert sorted(encoded) == ["Alice.jpg", "Bob.jpg"]
+
+    encoded.clear()
+    guardian.load_known_faces(str(tmp_path))
+    assert encoded == []
+
+
+def test_touched_image_with_the_same_content_is_not_encoded_again(guardian, tmp_path, encoded):
+    image = tmp_path / "students" / "Alice.jpg"
+    write_image(image, 10)
+    guardian.load_known_faces(str(tmp_path))
+
+    encoded.clear()
+    os.utime(image, ns=(image.stat().st_atime_ns, image.stat().st_mtime_ns + 10 ** 9))
+    guardian.load_known_faces(str(tmp_path))
+    assert encoded == []
+
+
+def test_changed_and_deleted_images_invalidate_the_cache(guardian, tmp_path, encoded):
+    write_image(tmp_path / "students" / "Alice.jpg", 10)
+    write_image(tmp_path / "teachers" / "Bob.jpg", 20)
+    guardian.load_known_faces(str(tmp_path))
+
+    encoded.clear()
+    write_image(tmp_path / "students" / "Alice.jpg", 30)
+    os.remove(tmp_path / "teachers" / "Bob.jpg")
+    encodings, names, _ = guardian.load_known_faces(str(tmp_path))
+
+    assert encoded == ["Alice.jpg"]
+    assert names == ["Alice"]
+    assert encodings[0][0] == 30.0
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def bus(guardian):
+    bus = guardian.FrameBus((4, 6, 3), slots=2, create=True)
+    yield bus
+    bus.close()
+
+
+def frame(value):
+    return np.full((4, 6, 3), value, dtype=np.uint8)
+
+
+def test_reader_gets_the_newest_frame(guardian, bus):
+    assert bus.read_latest() is None
+    bus.publish(frame(1), 100.0)
+    bus.publish(frame(2), 101.0)
+
+    name, shape, slots = bus.info()
+    reader = guardian.FrameBus(shape, slots, name=name)
+    try:
+        seq, latest = reader.read_latest()
+        assert seq == 2 and latest[0, 0, 0] == 2
+        assert reader.capture_time(seq).timestamp() == 101.0
+        del latest
+    finally:
+        reader.close()
+
+
+def test_overwritten_frames_are_detected(bus):
+    bus.publish(frame(1), 100.0)
+    assert bus.valid(1) and bus.view(1)[0, 0, 0] == 1
+
+    # With two slots, the third frame reuses the slot of the first
+    bus.publish(frame(2), 101.0)
+    bus.publish(frame(3), 102.0)
+    assert not bus.valid(1)
+    assert bus.view(1) is None
+    assert bus.view(3)[0, 0, 0] == 3
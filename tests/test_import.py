@@ -0,0 +1,84 @@
+import csv
+import os
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+
+# Fixture to run the importer in threads with a face encoder that reads the face count from
+# the file content
+@pytest.fixture
+def importer(guardian, monkeypatch):
+    def load_image_file(image_path):
+        with open(image_path) as f:
+            return f.read()
+
+    def face_encodings(image):
+        if image == "broken":
+            raise ValueError("not an image")
+        return [np.full(guardian.ENCODING_SIZE, float(i)) for i in range(int(image))]
+
+    monkeypatch.setattr(guardian, "face_recognition",
+                        types.SimpleNamespace(load_image_file=load_image_file, face_encodings=face_encodings))
+    monkeypatch.setattr(guardian, "ProcessPoolExecutor", ThreadPoolExecutor)
+    return guardian.import_faces
+
+
+def write_source(tmp_path, images):
+    for relative_path, content in images.items():
+        path = tmp_path / "source" / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    return str(tmp_path / "source")
+
+
+def test_face_image_identity(guardian):
+    assert guardian.face_image_identity("students/Alice.jpg") == ("Alice", "Student")
+    assert guardian.face_image_identity("teachers/Bob/front.png") == ("Bob", "Teacher")
+
+
+def test_import_enrolls_single_faces_and_reports_the_rest(guardian, tmp_path, importer):
+    source = write_source(tmp_path, {
+        "students/Alice/front.jpg": "1",
+        "students/Alice/side.jpg": "1 ",
+        "students/Group.jpg": "2",
+        "teachers/Blank.jpg": "0",
+        "teachers/Broken.jpg": "broken",
+        "pets/Rex.jpg": "1",
+    })
+    known_faces_dir = str(tmp_path / "known_faces")
+    report_path = str(tmp_path / "report.csv")
+
+    result = importer(source, known_faces_dir, workers=2, report_path=report_path)
+
+    assert (result["imported"], result["duplicates"]) == (2, 0)
+    assert len(os.listdir(os.path.join(known_faces_dir, "students", "Alice"))) == 2
+    _, names, designations = guardian.known_faces_from_cache(*guardian.load_encoding_cache(known_faces_dir))
+    assert sorted(zip(names, designations)) == [("Alice", "Student"), ("Alice", "Student")]
+
+    with open(report_path, newline='') as f:
+        report = {os.path.basename(row["path"]): row["problem"] for row in csv.DictReader(f)}
+    assert report["Group.jpg"] == "2 faces found"
+    assert report["Blank.jpg"] == "0 faces found"
+    assert report["Broken.jpg"] == "unreadable: not an image"
+    assert report["Rex.jpg"] == "unknown category"
+
+
+def test_images_already_enrolled_are_skipped(tmp_path, importer):
+    source = write_source(tmp_path, {"students/Alice.jpg": "1"})
+    known_faces_dir = str(tmp_path / "known_faces")
+
+    assert importer(source, known_faces_dir, workers=1)["imported"] == 1
+    again = importer(source, known_faces_dir, workers=1)
+    assert (again["imported"], again["duplicates"]) == (0, 1)
+
+
+def test_import_of_a_missing_source_reports_an_error(guardian, tmp_path, importer, capsys):
+    known_faces_dir = tmp_path / "known_faces"
+
+    assert importer(str(tmp_path / "missing"), str(known_faces_dir)) is None
+
+    assert "does not exist" in capsys.readouterr().out
+    assert not known_faces_dir.exists()
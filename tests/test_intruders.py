@@ -0,0 +1,68 @@
+import os
+from datetime import datetime
+
+import numpy as np
+
+
+def face(guardian, value):
+    encoding = np.zeros(guardian.ENCODING_SIZE)
+    encoding[0] = value
+    return encoding
+
+
+def test_repeat_sightings_merge_into_one_entry(guardian, tmp_path):
+    registry = guardian.IntruderRegistry(str(tmp_path), max_entries=10, ttl_hours=1)
+
+    entry, is_new = registry.sight(face(guardian, 0.0), 100.0)
+    again, again_new = registry.sight(face(guardian, 0.1), 110.0)
+    other, other_new = registry.sight(face(guardian, 5.0), 120.0)
+    registry.close()
+
+    assert is_new and not again_new and other_new
+    assert again is entry and entry["count"] == 2 and entry["last_seen"] == 110.0
+    assert other["id"] != entry["id"]
+
+
+def test_entries_expire_and_are_evicted(guardian, tmp_path):
+    registry = guardian.IntruderRegistry(str(tmp_path), max_entries=2, ttl_hours=1)
+
+    registry.sight(face(guardian, 0.0), 0.0)
+    registry.sight(face(guardian, 5.0), 10.0)
+    registry.sight(face(guardian, 10.0), 20.0)
+    assert sorted(entry["last_seen"] for entry in registry.entries) == [10.0, 20.0]
+
+    registry.sight(face(guardian, 15.0), 20.0 + 3600 + 1)
+    registry.close()
+    assert [entry["last_seen"] for entry in registry.entries] == [3621.0]
+
+
+def test_registry_is_written_on_close(guardian, tmp_path):
+    registry = guardian.IntruderRegistry(str(tmp_path), max_entries=10, ttl_hours=1)
+    entry, _ = registry.sight(face(guardian, 0.0), 100.0)
+    registry.set_crop(entry, "crop.jpg", 0.8)
+    registry.close()
+
+    reloaded = guardian.IntruderRegistry(str(tmp_path), max_entries=10, ttl_hours=1)
+    assert [e["best_crop"] for e in reloaded.entries] == ["crop.jpg"]
+    assert reloaded.lookup(face(guardian, 0.05)) == 0
+
+
+def test_intruder_boxes_are_clipped_to_the_frame(guardian, tmp_path, monkeypatch):
+    registry = guardian.IntruderRegistry(str(tmp_path), max_entries=10, ttl_hours=1)
+    writer = guardian.SnapshotWriter(str(tmp_path), workers=1, daily_dirs=False)
+    monkeypatch.setattr(guardian, "intruder_registry", registry)
+    monkeypatch.setattr(guardian, "snapshot_writer", writer)
+    monkeypatch.setattr(guardian, "play_warning", lambda *args: None)
+    frame = np.random.default_rng(0).integers(0, 255, (100, 100, 3), dtype=np.uint8)
+    captured_at = datetime(2026, 10, 1, 8, 0)
+
+    guardian.handle_presence_event(frame, "lab-1", "classroom", captured_at, "Unknown", "",
+                                   (-20, 60, 40, -10), face(guardian, 0.0))
+    guardian.handle_presence_event(frame, "lab-1", "classroom", captured_at, "Unknown", "",
+                                   (120, 160, 160, 120), face(guardian, 5.0))
+    writer.close()
+    registry.close()
+
+    with_crop, without_crop = registry.entries
+    assert os.path.isfile(with_crop["best_crop"])
+    assert without_crop["best_crop"] is None
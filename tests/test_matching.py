@@ -0,0 +1,34 @@
+import numpy as np
+
+
+def test_match_returns_known_and_unknown_faces(guardian):
+    known = np.zeros((2, guardian.ENCODING_SIZE))
+    known[1, 0] = 1.0
+    matcher = guardian.FaceMatcher(known, ["Alice", "Bob"], ["Student", "Teacher"], tolerance=0.5)
+
+    far = np.full(guardian.ENCODING_SIZE, 5.0)
+    matches = matcher.match([known[1] + 0.01, far])
+
+    assert matches[0][:2] == ("Bob", "Teacher")
+    assert matches[1][:2] == ("Unknown", "")
+
+
+def test_match_with_empty_roster(guardian):
+    matcher = guardian.FaceMatcher(np.empty((0, guardian.ENCODING_SIZE)), [], [])
+    assert matcher.match([]) == []
+    assert matcher.match([np.zeros(guardian.ENCODING_SIZE)])[0][0] == "Unknown"
+
+
+def test_cluster_index_agrees_with_exact_search(guardian):
+    rng = np.random.default_rng(1)
+    known = rng.normal(0, 0.09, (2000, guardian.ENCODING_SIZE)).astype(np.float32)
+    names = [f"person-{i}" for i in range(len(known))]
+    queries = known[rng.integers(0, len(known), 50)] + rng.normal(0, 0.01, (50, guardian.ENCODING_SIZE))
+
+    exact = guardian.FaceMatcher(known, names, names, index="exact")
+    cluster = guardian.FaceMatcher(known, names, names, index="cluster")
+
+    assert cluster.index is not None
+    agree = np.mean(exact.nearest(queries)[0] == cluster.nearest(queries)[0])
+    assert agree >= 0.95
+
@@ -0,0 +1,60 @@
+import json
+import urllib.request
+
+import pytest
+
+
+class Reader:
+    def __init__(self, name, role):
+        self.name = name
+        self.role = role
+        self.captured = self.processed = self.dropped = self.shed = self.skipped = 0
+
+    def depth(self):
+        return 1
+
+    def capacity(self):
+        return 2
+
+
+@pytest.fixture
+def metrics(guardian, tmp_path, monkeypatch):
+    monkeypatch.setattr(guardian, "METRICS_FILE", str(tmp_path / "metrics.json"))
+    metrics = guardian.PipelineMetrics()
+    yield metrics
+    if metrics.server is not None:
+        metrics.server.shutdown()
+        metrics.server.server_close()
+
+
+def test_snapshot_counts_faces_and_frames(guardian, tmp_path, metrics):
+    reader = Reader('gate "A"', "entry gate")
+    metrics.snapshot([reader])
+    reader.captured, reader.processed, reader.dropped = 10, 8, 2
+    metrics.count_faces('gate "A"', [("Alice", "Student", 0.3), ("Unknown", "", 0.9)])
+    metrics.count_intruder()
+
+    metrics.publish([reader])
+    with open(tmp_path / "metrics.json") as f:
+        snapshot = json.load(f)
+    camera = snapshot["cameras"]['gate "A"']
+    assert (camera["known_faces"], camera["unknown_faces"], camera["dropped"]) == (1, 1, 2)
+    assert camera["capture_fps"] > 0 and snapshot["intruders"] == 1
+
+    text = guardian.PipelineMetrics.prometheus(snapshot)
+    label = 'camera="gate \\"A\\"",role="entry gate"'
+    assert f'campus_guardian_faces_total{{{label},result="unknown"}} 1' in text.splitlines()
+    assert f'campus_guardian_camera_dropped_frames_total{{{label}}} 2' in text.splitlines()
+    assert "campus_guardian_intruders_total 1" in text.splitlines()
+
+
+def test_latest_snapshot_is_served_over_http(metrics):
+    metrics.publish([Reader("gate-0", "entry gate")])
+    metrics.serve(0)
+    port = metrics.server.server_address[1]
+
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+        text = response.read().decode()
+    assert 'campus_guardian_camera_queue_depth{camera="gate-0",role="entry gate"} 1' in text
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics.json") as response:
+        assert json.load(response)["cameras"]["gate-0"]["queue_capacity"] == 2
@@ -0,0 +1,36 @@
+import numpy as np
+
+
+def test_intersect_roi(guardian):
+    assert guardian.intersect_roi(None, (0, 0, 0.5, 0.5)) == (0, 0, 0.5, 0.5)
+    assert guardian.intersect_roi((0, 0, 0.5, 0.5), (0.25, 0.25, 1, 1)) == (0.25, 0.25, 0.5, 0.5)
+    assert guardian.intersect_roi((0, 0, 0.2, 0.2), (0.5, 0.5, 1, 1)) is None
+
+
+def test_static_frames_skip_detection_until_the_keyframe(guardian):
+    gate = guardian.MotionGate(dict(guardian.DEFAULT_MOTION_SETTINGS, keyframe_seconds=5.0))
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+
+    assert gate.check(frame, 0.0) == (True, None)
+    assert gate.check(frame, 1.0) == (False, None)
+    assert gate.check(frame, 6.0) == (True, None)
+    assert gate.check(frame, 7.0) == (False, None)
+
+
+def test_motion_region_covers_the_change_and_the_known_faces(guardian):
+    gate = guardian.MotionGate(dict(guardian.DEFAULT_MOTION_SETTINGS, margin=0.0))
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+    gate.check(frame, 0.0)
+
+    moved = frame.copy()
+    moved[20:60, 20:60] = 255
+    detect, roi = gate.check(moved, 0.5, [(100, 140, 140, 100)])
+    assert detect
+    left, top, right, bottom = roi
+    assert left < 20 / 320 and top < 20 / 240
+    assert right >= 140 / 320 and bottom >= 140 / 240
+
+    gate = guardian.MotionGate(dict(guardian.DEFAULT_MOTION_SETTINGS, margin=0.0))
+    gate.check(frame, 0.0)
+    left, top, right, bottom = gate.check(moved, 0.5)[1]
+    assert right < 0.3 and bottom < 0.4
@@ -0,0 +1,94 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+
+class Reader:
+    def __init__(self, frames):
+        self.name = "gate-0"
+        self.role = "entry gate"
+        self.frames = list(frames)
+        self.captured = self.processed = self.dropped = self.skipped = self.shed = 0
+
+    def get(self):
+        if not self.frames:
+            return None
+        self.captured += 1
+        return self.frames.pop(0), datetime.now(), None
+
+    def rates(self):
+        return 0.0, 0.0
+
+    def depth(self):
+        return len(self.frames)
+
+    def capacity(self):
+        return len(self.frames)
+
+    def stop(self):
+        pass
+
+
+def test_frames_of_one_camera_overlap_but_are_handled_in_order(guardian, monkeypatch):
+    for name, value in (("TRACKING_MODE", False), ("MOTION_GATING", False), ("LOAD_SHEDDING", False),
+                        ("RECOGNITION_WORKERS", 4), ("RECOGNITION_IN_FLIGHT", 2), ("METRICS_INTERVAL", 3600)):
+        monkeypatch.setattr(guardian, name, value)
+    monkeypatch.setattr(guardian, "ProcessPoolExecutor", ThreadPoolExecutor)
+    lock = threading.Lock()
+    running = [0, 0]
+
+    # Even frames take longer, so the job of the next frame finishes first
+    def recognition_job(frame, tracked_boxes, settings):
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        time.sleep(0.05 if frame[0, 0, 0] % 2 == 0 else 0.0)
+        with lock:
+            running[0] -= 1
+        return ([(0, 1, 1, 0)], [np.full(4, float(frame[0, 0, 0]))], [None], []), {}
+
+    monkeypatch.setattr(guardian, "recognition_job", recognition_job)
+    handled = []
+    reader = Reader(np.full((2, 2, 3), i, dtype=np.uint8) for i in range(6))
+
+    guardian.run_camera_pipeline([reader], lambda frame, *args: handled.append(int(frame[0, 0, 0])), "test",
+                                 display=False, duration=1.0)
+
+    assert handled == list(range(6))
+    assert running[1] == 2
+
+
+def test_mosaic_draws_faces_on_its_tiles_only(guardian, monkeypatch):
+    monkeypatch.setattr(guardian, "watchlist", None)
+    frame = np.zeros((360, 640, 3), dtype=np.uint8)
+    mosaic = guardian.MosaicView("test", [Reader([])], width=320)
+
+    mosaic.frames["gate-0"] = (frame, ([(90, 320, 270, 160)], [("Alice", "Student", 0.3)]))
+    tile = mosaic.render()
+
+    assert not frame.any()
+    # The box is scaled to the half-size tile
+    assert tuple(tile[45, 100]) == (0, 255, 0) and tuple(tile[100, 80]) == (0, 255, 0)
+    assert not tile[100, 120].any()
+
+
+def test_pipeline_hands_the_matches_to_the_mosaic(guardian, monkeypatch):
+    for name, value in (("TRACKING_MODE", False), ("MOTION_GATING", False), ("LOAD_SHEDDING", False),
+                        ("DISPLAY_MODE", "mosaic"), ("METRICS_INTERVAL", 3600)):
+        monkeypatch.setattr(guardian, name, value)
+    monkeypatch.setattr(guardian, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(guardian, "recognition_job",
+                        lambda frame, tracked_boxes, settings: (([(0, 1, 1, 0)], [np.zeros(4)], [None], []), {}))
+    for name in ("imshow", "destroyAllWindows"):
+        monkeypatch.setattr(guardian.cv2, name, lambda *args: None)
+    monkeypatch.setattr(guardian.cv2, "waitKey", lambda delay: -1)
+    updates = []
+    monkeypatch.setattr(guardian.MosaicView, "update", lambda self, name, frame, faces=None: updates.append(faces))
+
+    guardian.run_camera_pipeline([Reader([np.zeros((2, 2, 3), dtype=np.uint8)])],
+                                 lambda *args: [("Alice", "Student", 0.3)], "test", duration=0.5)
+
+    assert updates == [([(0, 1, 1, 0)], [("Alice", "Student", 0.3)])]
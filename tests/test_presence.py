@@ -0,0 +1,20 @@
+def test_identity_becomes_present_after_enough_frames(guardian):
+    presence = guardian.PresenceTracker(enter_frames=3, leave_seconds=5)
+    key = ("Alice", "Student")
+
+    assert presence.update([(key, None)], 0.0) == []
+    assert presence.update([(key, None)], 0.1) == []
+    assert presence.update([(key, None)], 0.2) == [key]
+    assert presence.update([(key, None)], 0.3) == []
+
+
+def test_identity_arrives_again_after_leaving(guardian):
+    presence = guardian.PresenceTracker(enter_frames=1, leave_seconds=5)
+    alice, bob = ("Alice", "Student"), ("Bob", "Teacher")
+
+    assert presence.update([(alice, None)], 0.0) == [alice]
+    assert presence.update([(bob, None)], 3.0) == [bob]
+    # Alice was gone for less than leave_seconds when she is seen again
+    assert presence.update([(alice, None)], 4.0) == []
+    assert presence.update([(bob, None)], 10.0) == []
+    assert presence.update([(alice, None)], 10.5) == [alice]
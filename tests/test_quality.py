@@ -0,0 +1,91 @@
+import types
+
+import numpy as np
+import pytest
+
+FRONTAL = {"left_eye": [(30, 40)], "right_eye": [(70, 40)], "nose_tip": [(50, 60)]}
+TURNED = {"left_eye": [(30, 40)], "right_eye": [(70, 40)], "nose_tip": [(32, 60)]}
+
+
+def textured(size, seed=0):
+    return np.random.default_rng(seed).integers(60, 200, (size, size), dtype=np.uint8)
+
+
+def test_face_quality_rejects_unusable_crops(guardian):
+    assert guardian.face_quality(textured(20)) == (0.0, "too small")
+    assert guardian.face_quality(np.full((100, 100), 10, dtype=np.uint8)) == (0.0, "too dark")
+    assert guardian.face_quality(np.full((100, 100), 128, dtype=np.uint8)) == (0.0, "blurred")
+    assert guardian.face_quality(textured(100), TURNED) == (0.0, "turned away")
+
+
+def test_face_quality_scores_frontal_faces_higher(guardian):
+    frontal, reason = guardian.face_quality(textured(100), FRONTAL)
+    slightly_turned, _ = guardian.face_quality(textured(100), dict(FRONTAL, nose_tip=[(56, 60)]))
+    assert reason is None
+    assert 0 < slightly_turned < frontal <= 1
+
+
+def test_deferred_face_is_due_after_max_wait(guardian):
+    deferred = guardian.DeferredFaces()
+    deferred.update([(10, 60, 60, 10)], 0.0)
+    # The same person, slightly moved, keeps the time it started waiting
+    deferred.update([(12, 62, 62, 12)], 1.0)
+    assert deferred.due(1.0, 1.5) == []
+    assert deferred.due(2.0, 1.5) == [(12, 62, 62, 12)]
+
+    deferred.update([], 3.0)
+    assert deferred.due(10.0, 1.5) == []
+
+
+@pytest.fixture
+def landmarks(guardian, monkeypatch):
+    landmarks = []
+    monkeypatch.setattr(guardian, "face_recognition", types.SimpleNamespace(
+        face_landmarks=lambda image, face_locations, model: landmarks[:len(face_locations)]))
+    return landmarks
+
+
+def test_gate_face_quality_decisions(guardian, landmarks):
+    frame = np.zeros((100, 200, 3), dtype=np.uint8)
+    frame[:, :100] = textured(100)[:, :, None]
+    frame[:, 100:] = textured(100, seed=1)[:, :, None]
+    faces = [(0, 100, 100, 0), (0, 200, 100, 100)]
+    landmarks += [FRONTAL, TURNED]
+
+    settings = {"quality": dict(guardian.DEFAULT_QUALITY_SETTINGS, encode_score=0.0)}
+    assert guardian.gate_face_quality(frame, faces, settings) == ["encode", "drop"]
+
+    settings["quality"]["encode_score"] = 1.01
+    assert guardian.gate_face_quality(frame, faces, settings) == ["wait", "drop"]
+    settings["force"] = [(0, 100, 100, 0)]
+    assert guardian.gate_face_quality(frame, faces, settings) == ["encode", "drop"]
+
+
+def test_detect_and_encode_finds_landmarks_once(guardian, monkeypatch):
+    points = {"frontal": [(70, 40), (60, 40), (30, 40), (40, 40), (50, 60)],
+              "turned": [(70, 40), (60, 40), (30, 40), (40, 40), (32, 60)]}
+    calls = []
+
+    def shape(kind):
+        return types.SimpleNamespace(kind=kind, parts=lambda: [types.SimpleNamespace(x=x, y=y) for x, y in points[kind]])
+
+    def raw_face_landmarks(image, face_locations, model):
+        calls.append(list(face_locations))
+        return [shape("frontal" if left == 0 else "turned") for _, _, _, left in face_locations]
+
+    encoder = types.SimpleNamespace(compute_face_descriptor=lambda image, shape, jitters: [len(shape.kind)])
+    monkeypatch.setattr(guardian, "face_recognition", types.SimpleNamespace(
+        face_locations=lambda image, number_of_times_to_upsample, model: [(0, 100, 100, 0), (0, 200, 100, 100)],
+        api=types.SimpleNamespace(_raw_face_landmarks=raw_face_landmarks, face_encoder=encoder)))
+
+    frame = np.zeros((100, 200, 3), dtype=np.uint8)
+    frame[:, :100] = textured(100)[:, :, None]
+    frame[:, 100:] = textured(100, seed=1)[:, :, None]
+    settings = dict(guardian.DEFAULT_DETECTION_SETTINGS, scale=1.0,
+                    quality=dict(guardian.DEFAULT_QUALITY_SETTINGS, encode_score=0.0))
+
+    face_locations, face_encodings, _, waiting = guardian.detect_and_encode(frame, [], settings)
+
+    assert len(calls) == 1
+    assert face_locations == [(0, 100, 100, 0)] and waiting == []
+    assert [list(encoding) for encoding in face_encodings] == [[len("frontal")]]
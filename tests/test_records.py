@@ -0,0 +1,69 @@
+import warnings
+
+import pytest
+
+
+@pytest.fixture
+def store(guardian, tmp_path):
+    store = guardian.SQLiteRecordStore(str(tmp_path / "records.db"))
+    yield store
+    store.conn.close()
+
+
+def test_entries_and_exits_pair_into_sessions(store):
+    assert store.record_entry("Alice", "Student", "2026-10-01 08:00:00")
+    assert not store.record_entry("Alice", "Student", "2026-10-01 08:05:00")
+    assert not store.record_exit("Bob", "Teacher", "2026-10-01 09:00:00")
+    assert store.record_exit("Alice", "Student", "2026-10-01 12:00:00")
+    assert store.record_entry("Alice", "Student", "2026-10-01 13:00:00")
+
+    first, second = store.sessions("2026-10-01")
+    assert first == ["Alice", "Student", "2026-10-01 08:00:00", "2026-10-01 12:00:00"]
+    assert second[:3] == ["Alice", "Student", "2026-10-01 13:00:00"]
+    assert store.day_versions("2026-10-01", "2026-10-01")["2026-10-01"][0] == 3
+
+
+def test_replayed_events_already_recorded_are_skipped(store):
+    store.record_entry("Alice", "Student", "2026-10-01 08:00:00")
+    store.record_exit("Alice", "Student", "2026-10-01 12:00:00")
+
+    assert not store.record_replayed("entry", "Alice", "Student", "2026-10-01 08:00:01")
+    assert not store.record_replayed("exit", "Alice", "Student", "2026-10-01 11:59:58")
+    assert len(store.sessions("2026-10-01")) == 1
+
+
+def test_replayed_exit_before_entry_pairs_in_time_order(store):
+    assert store.record_replayed("exit", "Bob", "Teacher", "2026-10-01 17:00:00")
+    assert store.record_replayed("entry", "Bob", "Teacher", "2026-10-01 09:00:00")
+
+    assert store.sessions("2026-10-01") == [["Bob", "Teacher", "2026-10-01 09:00:00", "2026-10-01 17:00:00"]]
+    assert not store.record_exit("Bob", "Teacher", "2026-10-01 18:00:00")
+
+
+def test_events_of_selected_days(store, tmp_path, monkeypatch):
+    # The store writes the Excel report of a day when the next day starts
+    monkeypatch.chdir(tmp_path)
+    for day in ("2026-10-01", "2026-10-02", "2026-10-03"):
+        store.record_entry("Alice", "Student", f"{day} 08:00:00")
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        events = store.events(["2026-10-03", "2026-10-01"])
+    assert [w for w in caught if "SettingWithCopy" in type(w.message).__name__] == []
+    assert list(events["day"]) == ["2026-10-01", "2026-10-03"]
+    assert str(events["time"].iloc[1]) == "2026-10-03 08:00:00"
+
+
+def test_replayed_events_go_to_the_workbook_of_their_day(guardian, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = guardian.ExcelRecordStore()
+
+    assert store.record_replayed("entry", "Alice", "Student", "2020-01-01 08:00:00")
+    assert not store.record_replayed("entry", "Alice", "Student", "2020-01-01 08:00:00")
+    assert store.record_replayed("exit", "Alice", "Student", "2020-01-01 12:00:00")
+    assert not store.record_replayed("exit", "Alice", "Student", "2020-01-01 12:00:00")
+
+    assert [path.name for path in tmp_path.iterdir()] == ["entry_exit_records_01-01-2020.xlsx"]
+    events = store.events(["2020-01-01"])
+    assert sorted(zip(events["kind"], events["time"].astype(str))) == [
+        ("entry", "2020-01-01 08:00:00"), ("exit", "2020-01-01 12:00:00")]
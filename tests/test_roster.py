@@ -0,0 +1,32 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+def write_image(path, size):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+
+
+def test_added_and_deleted_images_are_picked_up_while_running(guardian, tmp_path, monkeypatch):
+    monkeypatch.setattr(guardian, "encode_face_image",
+                        lambda image_path: np.full(guardian.ENCODING_SIZE, float(os.path.getsize(image_path))))
+    write_image(tmp_path / "students" / "Alice.jpg", 10)
+    watcher = guardian.RosterWatcher(str(tmp_path), guardian.FaceMatcher(*guardian.load_known_faces(str(tmp_path))))
+    watcher.encoder = ThreadPoolExecutor(max_workers=1)
+    try:
+        bob = np.full(guardian.ENCODING_SIZE, 20.0)
+        assert watcher.match([bob])[0][0] == "Unknown"
+
+        write_image(tmp_path / "teachers" / "Bob.jpg", 20)
+        watcher.refresh()
+        assert len(watcher) == 2
+        assert watcher.match([bob])[0][:2] == ("Bob", "Teacher")
+
+        os.remove(tmp_path / "students" / "Alice.jpg")
+        watcher.refresh()
+        assert len(watcher) == 1
+        assert watcher.match([np.full(guardian.ENCODING_SIZE, 10.0)])[0][0] == "Unknown"
+    finally:
+        watcher.stop()
@@ -0,0 +1,50 @@
+import pytest
+
+
+class Reader:
+    def __init__(self, role):
+        self.role = role
+        self.captured = 0
+        self.processed = 0
+
+
+@pytest.fixture
+def scheduler(guardian, monkeypatch):
+    monkeypatch.setattr(guardian, "SHED_ADJUST_SECONDS", 0)
+    return guardian.LoadScheduler([Reader("restricted area"), Reader("classroom")])
+
+
+def overload(scheduler, levels):
+    for _ in range(levels):
+        scheduler.observe("restricted area", 1.0)
+        scheduler.update()
+
+
+def test_level_rises_with_latency_and_falls_when_it_recovers(guardian, scheduler):
+    overload(scheduler, guardian.SHED_MAX_LEVEL + 2)
+    assert scheduler.level == guardian.SHED_MAX_LEVEL
+
+    scheduler.latency = {"restricted area": 0.01}
+    scheduler.update()
+    assert scheduler.level == guardian.SHED_MAX_LEVEL - 1
+
+
+def test_low_priority_frames_are_shed_first(guardian, scheduler):
+    restricted, classroom = scheduler.readers
+    overload(scheduler, 1)
+    assert not any(scheduler.skip(classroom) for _ in range(4))
+
+    overload(scheduler, 2)
+    assert scheduler.level == 3
+    assert [scheduler.skip(classroom) for _ in range(4)] == [True, True, True, False]
+    assert not any(scheduler.skip(restricted) for _ in range(4))
+
+
+def test_detection_is_reduced_for_all_but_the_restricted_area(guardian, scheduler):
+    overload(scheduler, 3)
+    quality = dict(guardian.DEFAULT_QUALITY_SETTINGS)
+
+    assert scheduler.adjust("restricted area", {"scale": 0.5, "quality": quality}) == {"scale": 0.5, "quality": quality}
+    classroom = scheduler.adjust("classroom", {"scale": 0.5, "quality": quality})
+    assert classroom["scale"] == pytest.approx(0.5 * guardian.SHED_DETECTION_SCALE)
+    assert classroom["quality"]["encode_score"] > 1
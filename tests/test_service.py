@@ -0,0 +1,25 @@
+import json
+
+import numpy as np
+
+
+def test_service_settings_apply_to_defaulted_arguments(guardian, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # Register the globals with monkeypatch so the overrides are undone after the test
+    for name in ("MATCH_TOLERANCE", "RECORDS_DB", "camera_inventory"):
+        monkeypatch.setattr(guardian, name, getattr(guardian, name))
+    monkeypatch.setattr(guardian, "camera_roles", {role: [] for role in guardian.camera_roles})
+    monkeypatch.setattr(guardian, "restricted_area_access", {})
+    config_path = tmp_path / "service.json"
+    config_path.write_text(json.dumps({"settings": {"MATCH_TOLERANCE": 0.2, "RECORDS_DB": "service.db"}}))
+
+    guardian.load_service_config(str(config_path))
+
+    known = np.zeros((1, guardian.ENCODING_SIZE))
+    matcher = guardian.FaceMatcher(known, ["Alice"], ["Student"])
+    near = known[0].copy()
+    near[0] = 0.3
+    assert matcher.match([near])[0][0] == "Unknown"
+    store = guardian.SQLiteRecordStore()
+    store.conn.close()
+    assert (tmp_path / "service.db").exists()
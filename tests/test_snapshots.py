@@ -0,0 +1,33 @@
+import csv
+import os
+from datetime import datetime
+
+import numpy as np
+
+
+def test_snapshots_are_written_and_indexed(guardian, tmp_path):
+    writer = guardian.SnapshotWriter(str(tmp_path), workers=1, queue_size=4, daily_dirs=True)
+    crop = np.full((40, 30, 3), 128, dtype=np.uint8)
+    captured_at = datetime(2026, 10, 1, 8, 30, 0, 250000)
+
+    filename = writer.submit(crop, captured_at, {"intruder": "intruder-1", "camera": "gate-0", "role": "entry gate"})
+    writer.close()
+
+    assert os.path.dirname(filename) == str(tmp_path / "2026-10-01")
+    assert os.path.isfile(filename)
+    with open(tmp_path / guardian.SNAPSHOT_INDEX_FILE, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 1
+    assert (rows[0]["file"], rows[0]["camera"], rows[0]["time"]) == (filename, "gate-0", "2026-10-01 08:30:00.250000")
+
+
+def test_snapshot_is_dropped_when_the_queue_is_full(guardian, tmp_path):
+    writer = guardian.SnapshotWriter(str(tmp_path), workers=1, queue_size=1)
+    # Hold the only queue slot as if a snapshot were still being written
+    writer.slots.acquire()
+
+    assert writer.submit(np.zeros((4, 4, 3), dtype=np.uint8), datetime(2026, 10, 1), {}) is None
+    assert writer.dropped == 1
+    writer.slots.release()
+    writer.close()
+    assert not os.path.exists(tmp_path / guardian.SNAPSHOT_INDEX_FILE)
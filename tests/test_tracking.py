@@ -0,0 +1,55 @@
+import numpy as np
+
+
+def test_box_iou(guardian):
+    assert guardian.box_iou((0, 10, 10, 0), (0, 10, 10, 0)) == 1.0
+    assert guardian.box_iou((0, 10, 10, 0), (20, 30, 30, 20)) == 0.0
+    assert abs(guardian.box_iou((0, 10, 10, 0), (0, 15, 10, 5)) - 50 / 150) < 1e-9
+
+
+def test_associate_boxes_pairs_greedily_by_overlap(guardian):
+    detections = [(0, 10, 10, 0), (0, 42, 10, 32), (50, 60, 60, 50)]
+    tracked = [(0, 41, 10, 31), None, (0, 11, 10, 1)]
+    assert guardian.associate_boxes(detections, tracked, threshold=0.3) == [2, 0, None]
+
+
+class FixedTracker:
+    def __init__(self, box):
+        self.box = box
+
+    def update(self, frame):
+        return True, self.box
+
+
+def test_tracked_boxes_are_clipped_to_the_frame(guardian):
+    tracks = guardian.FaceTracks(detect_interval=5)
+    tracks.tracks = [{"tracker": FixedTracker((-10, 50, 40, 80)), "box": None, "encoding": None,
+                      "match": ("Alice", "Student", 0.3)}]
+    tracks.lost = False
+    frame = np.zeros((100, 200, 3), dtype=np.uint8)
+
+    tracks.propagate(frame)
+    assert tracks.tracks[0]["box"] == (50, 30, 100, 0)
+    assert not tracks.lost
+
+    tracks.tracks[0]["tracker"] = FixedTracker((250, 10, 20, 20))
+    tracks.propagate(frame)
+    assert tracks.lost
+
+
+def test_detections_are_assigned_to_the_tracks_they_were_submitted_with(guardian, monkeypatch):
+    monkeypatch.setattr(guardian, "create_box_tracker", lambda: None)
+    matcher = guardian.FaceMatcher(np.zeros((0, guardian.ENCODING_SIZE)), [], [])
+    tracks = guardian.FaceTracks(detect_interval=5)
+    alice = {"box": (0, 10, 10, 0), "encoding": None, "match": ("Alice", "Student", 0.3)}
+    bob = {"box": (0, 40, 10, 30), "encoding": None, "match": ("Bob", "Teacher", 0.3)}
+    tracks.tracks = [alice, bob]
+    submitted = tracks.tracks
+    frame = np.zeros((50, 50, 3), dtype=np.uint8)
+
+    # An earlier detection only found Bob
+    tracks.apply_detections(frame, [(0, 41, 10, 31)], [None], [1], matcher)
+    # A later one, submitted before that was applied, found both
+    tracks.apply_detections(frame, [(0, 11, 10, 1), (0, 42, 10, 32)], [None, None], [0, 1], matcher, submitted)
+
+    assert [match[0] for match in tracks.faces()[2]] == ["Alice", "Bob"]
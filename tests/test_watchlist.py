@@ -0,0 +1,48 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def warnings(guardian, monkeypatch):
+    warnings = []
+    monkeypatch.setattr(guardian, "play_warning", lambda message, *args: warnings.append(message))
+    return warnings
+
+
+def observe(watchlist, camera, role, captured_at, *matches):
+    frame = np.zeros((100, 100, 3), dtype=np.uint8)
+    locations = [(10, 40, 40, 10)] * len(matches)
+    watchlist.observe(frame, camera, role, captured_at, locations, [None] * len(matches), list(matches))
+
+
+def test_tracked_person_is_located_across_cameras(guardian, tmp_path, warnings):
+    path = str(tmp_path / "watchlist.json")
+    watchlist = guardian.Watchlist(path)
+    watchlist.add("Alice", "Student")
+
+    observe(watchlist, "gate-0", "entry gate", datetime(2026, 10, 1, 8, 0),
+            ("Alice", "Student", 0.3), ("Bob", "Teacher", 0.3))
+    observe(watchlist, "gate-0", "entry gate", datetime(2026, 10, 1, 8, 1), ("Alice", "Student", 0.3))
+    observe(watchlist, "lab-1", "classroom", datetime(2026, 10, 1, 9, 0), ("Alice", "Student", 0.3))
+
+    assert warnings == ["Alice located at entry gate", "Alice located at classroom"]
+    # Another process reads the last known location from the file
+    entries = guardian.Watchlist(path).where_is("ali")
+    assert [(e["name"], e["camera"], e["time"]) for e in entries] == [("Alice", "lab-1", "2026-10-01 09:00:00")]
+    assert guardian.Watchlist(path).where_is("Bob") == []
+
+
+def test_last_seen_time_is_saved_while_at_the_same_camera(guardian, tmp_path, warnings, monkeypatch):
+    path = str(tmp_path / "watchlist.json")
+    watchlist = guardian.Watchlist(path)
+    watchlist.add("Alice", "Student")
+
+    observe(watchlist, "gate-0", "entry gate", datetime(2026, 10, 1, 8, 0), ("Alice", "Student", 0.3))
+    observe(watchlist, "gate-0", "entry gate", datetime(2026, 10, 1, 8, 1), ("Alice", "Student", 0.3))
+    assert guardian.Watchlist(path).where_is("Alice")[0]["time"] == "2026-10-01 08:00:00"
+
+    monkeypatch.setattr(guardian, "WATCHLIST_SAVE_SECONDS", 0)
+    observe(watchlist, "gate-0", "entry gate", datetime(2026, 10, 1, 8, 2), ("Alice", "Student", 0.3))
+    assert guardian.Watchlist(path).where_is("Alice")[0]["time"] == "2026-10-01 08:02:00"